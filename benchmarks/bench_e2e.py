@@ -0,0 +1,329 @@
+"""
+End-to-end benchmarks of the bot's ClickUp-heavy code paths against the local fake ClickUp.
+
+Scenarios (each run from cold caches):
+- quotafetch:         quotafetch.get_roblox_user_task_counts for the whole roster
+- check:              `--check-users` concurrent /check invocations (Clickup.check)
+- quota_reminders:    one Reminders quota reminder run on a reminder day, DMs included
+- training_reminders: one Reminders.refresh_training_reminders pass (25h window)
+
+For each it reports wall-clock latency, ClickUp API calls (and 429s) and peak Python memory
+(tracemalloc, measured in a second run so tracing doesn't skew the timing). `--json` writes
+the same numbers to a file to compare runs for regressions.
+
+The cog scenarios need the bot's full requirements (discord.py, aiomysql) importable; the
+database itself is never contacted, the user directory is seeded with synthetic users.
+
+`--record PATH` writes all ClickUp traffic of the run to a cassette; `--replay PATH` then serves
+the run from that cassette instead of the fake server (same workspace arguments, and within the
+same month, since quota queries are bounded by month). Replayed runs only report total calls.
+
+Usage: python -m benchmarks.bench_e2e [--lists 4] [--tasks-per-list 3000] [--roster 300]
+           [--latency 0.05] [--rate-limit 0] [--check-users 20] [--scenarios quotafetch,check] [--json out.json]
+           [--record cassette.jsonl.gz | --replay cassette.jsonl.gz [--replay-latency recorded]]
+"""
+import os
+import gc
+import sys
+import json
+import time
+import asyncio
+import argparse
+import calendar
+import tempfile
+import tracemalloc
+import contextlib
+import io
+from datetime import datetime, timezone
+from unittest import mock
+from benchmarks.fake_clickup import FakeClickUp, generate_workspace, member_email
+from bot.utils.roblox_users import ROBLOX_USERS
+
+DEPARTMENTS = ['Driving Department', 'Dispatching Department', 'Guarding Department', 'Signalling Department']
+
+
+def list_env_key(department: str) -> str:
+    return f"CLICKUP_LIST_ID_{department.upper().replace(' ', '_')}"
+
+
+def synthetic_users(roster):
+    return [
+        {
+            'discord_id': 1000 + i,
+            'clickup_email': member_email(name),
+            'roblox_username': name,
+            'timezone': 'UTC',
+            'primary_department': DEPARTMENTS[i % len(DEPARTMENTS)],
+            'secondary_department': DEPARTMENTS[(i + 1) % len(DEPARTMENTS)] if i % 3 == 0 else 'None',
+            'reminder_preferences': 'quota, training',
+        }
+        for i, name in enumerate(roster)
+    ]
+
+
+class FakeUser:
+    def __init__(self, bot, user_id):
+        self.bot = bot
+        self.id = user_id
+        self.name = f"user{user_id}"
+
+    async def send(self, *args, **kwargs):
+        self.bot.dms_sent += 1
+
+
+class FakeBot:
+    """Just enough of commands.Bot for the cogs: users, no channels, never ready."""
+
+    def __init__(self):
+        # Cogs schedule their start-up through bot.loop; keep the tasks so they can be cancelled
+        self.loop = self
+        self.tasks = []
+        self.dms_sent = 0
+        self.guilds = []
+
+    def create_task(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self.tasks.append(task)
+        return task
+
+    async def cancel_tasks(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def wait_until_ready(self):
+        await asyncio.Event().wait()
+
+    def get_user(self, user_id):
+        return FakeUser(self, user_id)
+
+    async def fetch_user(self, user_id):
+        return FakeUser(self, user_id)
+
+    def get_channel(self, channel_id):
+        return None
+
+
+class FakeInteraction:
+    class _Response:
+        async def send_message(self, *args, **kwargs):
+            pass
+
+    class _Followup:
+        async def send(self, *args, **kwargs):
+            pass
+
+    def __init__(self, user_id):
+        self.user = type('User', (), {'id': user_id})()
+        self.response = self._Response()
+        self.followup = self._Followup()
+
+    async def edit_original_response(self, *args, **kwargs):
+        pass
+
+
+def reset_state(workdir: str):
+    """Drop every cache and local store so each run starts cold."""
+    from bot.utils import clickup_api, quota_engine, quota_store, task_mirror, reminder_store, clickup_members
+    clickup_api.get_client().list_cache.clear()
+    quota_engine._snapshots.clear()
+    quota_store._store = None
+    task_mirror._mirror = None
+    reminder_store._store = None
+    clickup_members._members = None
+    for name in ('quota.sqlite3', 'task_mirror.sqlite3', 'reminders.sqlite3'):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(workdir, name))
+
+
+async def seed_directory(users):
+    from bot.utils import db
+    from bot.utils.user_directory import get_user_directory
+
+    async def fetch_all_users():
+        return [dict(user) for user in users]
+
+    with mock.patch.object(db, 'fetch_all_users', fetch_all_users):
+        await get_user_directory().load()
+
+
+class ReplayCounts:
+    """Stands in for FakeClickUp's counters when the run is served from a cassette."""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.throttled = 0
+
+    @property
+    def requests(self):
+        return {'replayed': self.transport.served, 'not in cassette': self.transport.misses}
+
+    def reset_counts(self):
+        self.transport.served = self.transport.misses = 0
+
+
+# --- Scenarios ---
+
+async def scenario_quotafetch(ctx):
+    from bot.utils.quotafetch import get_roblox_user_task_counts
+    await get_roblox_user_task_counts(ctx['roster'])
+
+
+async def scenario_check(ctx):
+    from bot.cogs.clickup import Clickup
+    await seed_directory(ctx['users'])
+    cog = Clickup(ctx['bot'])
+    users = ctx['users'][:ctx['check_users']]
+    await asyncio.gather(*(cog.check.callback(cog, FakeInteraction(user['discord_id'])) for user in users))
+
+
+class _ReminderDay(datetime):
+    # Three days before the end of the month, the quota reminder day that DMs the most people
+    @classmethod
+    def now(cls, tz=None):
+        real = datetime.now(tz)
+        return real.replace(day=calendar.monthrange(real.year, real.month)[1] - 3)
+
+
+async def _reminders_cog(ctx):
+    from bot.cogs import reminders
+    await seed_directory(ctx['users'])
+    return reminders, reminders.Reminders(ctx['bot'])
+
+
+async def scenario_quota_reminders(ctx):
+    reminders, cog = await _reminders_cog(ctx)
+    with mock.patch.object(reminders, 'datetime', _ReminderDay):
+        await cog._run_quota_reminders()
+    await cog.dms.join()
+    await cog.log_sink.close()
+
+
+async def scenario_training_reminders(ctx):
+    _, cog = await _reminders_cog(ctx)
+    await cog.refresh_training_reminders.coro(cog)
+    ctx['extra'] = f"{len(cog.training_schedule)} reminder jobs"
+    await cog.log_sink.close()
+
+
+SCENARIOS = {
+    'quotafetch': scenario_quotafetch,
+    'check': scenario_check,
+    'quota_reminders': scenario_quota_reminders,
+    'training_reminders': scenario_training_reminders,
+}
+
+
+async def run_once(scenario, ctx, server, workdir, trace: bool):
+    reset_state(workdir)
+    gc.collect()
+    server.reset_counts()
+    ctx['bot'].dms_sent = 0
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            await scenario(ctx)
+        finally:
+            await ctx['bot'].cancel_tasks()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, dict(server.requests), server.throttled, peak
+
+
+async def main(args):
+    workdir = tempfile.mkdtemp(prefix='bench_e2e_')
+    os.environ['QUOTA_STORE_PATH'] = os.path.join(workdir, 'quota.sqlite3')
+    os.environ['TASK_MIRROR_PATH'] = os.path.join(workdir, 'task_mirror.sqlite3')
+    os.environ['REMINDER_STORE_PATH'] = os.path.join(workdir, 'reminders.sqlite3')
+    os.environ['LOG_DIR'] = workdir
+    os.environ['CLICKUP_WORKSPACE_ID'] = 'bench'
+    # Let the fake server (or --rate-limit) be the only throttle
+    os.environ.setdefault('CLICKUP_RATE_LIMIT', str(args.rate_limit or 100000))
+
+    now = datetime.now(timezone.utc)
+    start_ms = int(datetime(now.year, now.month, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    end_ms = start_ms + 28 * 86400000
+    list_ids, roster, tasks = generate_workspace(args.lists, args.tasks_per_list, args.roster, start_ms + 1, end_ms,
+                                                 base_roster=ROBLOX_USERS)
+    for department, list_id in zip(DEPARTMENTS, list_ids):
+        os.environ[list_env_key(department)] = list_id
+    if args.record or args.replay:
+        os.environ['CLICKUP_CASSETTE'] = args.record or args.replay
+        os.environ['CLICKUP_CASSETTE_MODE'] = 'record' if args.record else 'replay'
+        os.environ['CLICKUP_REPLAY_LATENCY'] = args.replay_latency
+
+    from bot.utils.clickup_api import get_client
+    if args.replay:
+        server = ReplayCounts(get_client().transport)
+    else:
+        server = FakeClickUp(tasks, latency=args.latency, rate_limit=args.rate_limit or None)
+        os.environ['CLICKUP_API_URL'] = await server.start()
+    ctx = {'roster': roster, 'users': synthetic_users(roster), 'bot': FakeBot(), 'check_users': args.check_users}
+    results = {}
+    try:
+        for name in args.scenarios:
+            ctx['extra'] = None
+            try:
+                elapsed, requests, throttled, _ = await run_once(SCENARIOS[name], ctx, server, workdir, trace=False)
+                peak = None
+                if not args.no_memory:
+                    _, _, _, peak = await run_once(SCENARIOS[name], ctx, server, workdir, trace=True)
+            except ImportError as e:
+                results[name] = {'skipped': f"missing dependency: {e.name}"}
+                continue
+            results[name] = {
+                'seconds': round(elapsed, 3),
+                'api_calls': sum(requests.values()),
+                'api_calls_by_endpoint': requests,
+                'throttled': throttled,
+                'peak_mib': round(peak / 2 ** 20, 2) if peak is not None else None,
+                'dms': ctx['bot'].dms_sent,
+                'note': ctx['extra'],
+            }
+    finally:
+        await get_client().close()
+        if not args.replay:
+            await server.stop()
+
+    source = (f"replayed from {args.replay} ({args.replay_latency} latency)" if args.replay else
+              f"{args.latency * 1000:.0f}ms latency, rate limit {args.rate_limit or 'off'}")
+    print(f"{args.lists} lists x {args.tasks_per_list} tasks, roster {args.roster}, {source}")
+    print(f"{'scenario':<20} {'seconds':>8} {'api calls':>10} {'429s':>6} {'peak MiB':>9} {'DMs':>6}")
+    for name, result in results.items():
+        if 'skipped' in result:
+            print(f"{name:<20} skipped ({result['skipped']})")
+            continue
+        peak = f"{result['peak_mib']:.2f}" if result['peak_mib'] is not None else '-'
+        line = f"{name:<20} {result['seconds']:>8.2f} {result['api_calls']:>10} {result['throttled']:>6} {peak:>9} {result['dms']:>6}"
+        print(line + (f"  {result['note']}" if result['note'] else ''))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'params': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lists', type=int, default=4, choices=range(1, len(DEPARTMENTS) + 1), help="department lists")
+    parser.add_argument('--tasks-per-list', type=int, default=3000)
+    parser.add_argument('--roster', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--rate-limit', type=int, default=0, help="requests per minute the fake server allows (0 = unlimited)")
+    parser.add_argument('--check-users', type=int, default=20)
+    parser.add_argument('--scenarios', type=lambda s: s.split(','), default=list(SCENARIOS))
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc run")
+    parser.add_argument('--json', help="also write the results to this file")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument('--record', metavar='PATH', help="record the ClickUp traffic to this cassette")
+    cassette.add_argument('--replay', metavar='PATH', help="serve ClickUp from this cassette instead of the fake server")
+    parser.add_argument('--replay-latency', default='recorded', help="seconds per replayed request, or 'recorded'")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    asyncio.run(main(args))
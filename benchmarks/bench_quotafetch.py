@@ -0,0 +1,101 @@
+"""
+Wall-clock comparison of sequential vs concurrent pagination behind `get_roblox_user_task_counts`.
+
+Usage: python -m benchmarks.bench_quotafetch [--tasks-per-list 3000] [--latency 0.05] [--concurrency 4]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+import tempfile
+from datetime import datetime, timezone
+from benchmarks.fake_clickup import FakeClickUp, generate_tasks
+from bot.utils.roblox_users import ROBLOX_USERS
+
+LIST_ENV_KEYS = [
+    'CLICKUP_LIST_ID_DRIVING_DEPARTMENT',
+    'CLICKUP_LIST_ID_DISPATCHING_DEPARTMENT',
+    'CLICKUP_LIST_ID_GUARDING_DEPARTMENT',
+    'CLICKUP_LIST_ID_SIGNALLING_DEPARTMENT',
+]
+
+
+async def sequential_pages(client, list_ids, first_of_month_unix_ms):
+    # The pre-engine behaviour: one list, one archived value, one page at a time
+    count = 0
+    for list_id in list_ids:
+        for archived in (False, True):
+            async for _, tasks in client.iter_list_tasks(list_id, archived=archived, statuses=['concluded'],
+                                                         include_closed=True, due_date_gt=first_of_month_unix_ms):
+                count += len(tasks)
+    return count
+
+
+async def concurrent_pages(list_ids, first_of_month_unix_ms, concurrency):
+    from bot.utils.task_streams import iter_task_streams
+    count = 0
+    streams = [(list_id, archived) for list_id in list_ids for archived in (False, True)]
+    async for result in iter_task_streams(streams, concurrency=concurrency, statuses=['concluded'],
+                                          include_closed=True, due_date_gt=first_of_month_unix_ms):
+        count += len(result.tasks or [])
+    return count
+
+
+async def timed(server, coro):
+    from bot.utils.clickup_api import get_client
+    # Each phase should pay for its own requests, not reuse the previous phase's pages
+    get_client().list_cache.clear()
+    server.request_count = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await coro
+    return time.perf_counter() - start, server.request_count
+
+
+async def main(tasks_per_list, latency, concurrency):
+    # The full quota path writes the quota store and task mirror; keep them out of the working directory
+    with tempfile.TemporaryDirectory(prefix='bench_quotafetch_') as workdir:
+        os.environ['QUOTA_STORE_PATH'] = os.path.join(workdir, 'quota.sqlite3')
+        os.environ['TASK_MIRROR_PATH'] = os.path.join(workdir, 'task_mirror.sqlite3')
+        await run(tasks_per_list, latency, concurrency)
+
+
+async def run(tasks_per_list, latency, concurrency):
+    now = datetime.now(timezone.utc)
+    first_of_month_unix_ms = int(datetime(now.year, now.month, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    list_ids = [f"list{i}" for i in range(len(LIST_ENV_KEYS))]
+    tasks = generate_tasks(list_ids, tasks_per_list, ROBLOX_USERS, first_of_month_unix_ms + 1, first_of_month_unix_ms + 27 * 86400000)
+    server = FakeClickUp(tasks, latency=latency)
+    os.environ['CLICKUP_API_URL'] = await server.start()
+    for key, list_id in zip(LIST_ENV_KEYS, list_ids):
+        os.environ[key] = list_id
+    # The fake server doesn't rate limit, so don't let the scheduler's default budget skew timings
+    os.environ.setdefault('CLICKUP_RATE_LIMIT', '100000')
+
+    from bot.utils.clickup_api import get_client
+    from bot.utils.quotafetch import get_roblox_user_task_counts
+    client = get_client()
+    try:
+        sequential, sequential_requests = await timed(server, sequential_pages(client, list_ids, first_of_month_unix_ms))
+        concurrent, concurrent_requests = await timed(server, concurrent_pages(list_ids, first_of_month_unix_ms, concurrency))
+        full, _ = await timed(server, get_roblox_user_task_counts(ROBLOX_USERS, concurrency=concurrency))
+    finally:
+        await client.close()
+        await server.stop()
+
+    print(f"{len(list_ids)} lists x {tasks_per_list} tasks, {latency * 1000:.0f}ms latency per request")
+    print(f"sequential pagination: {sequential:.2f}s ({sequential_requests} requests)")
+    print(f"concurrent pagination: {concurrent:.2f}s ({concurrent_requests} requests, concurrency={concurrency})")
+    print(f"speedup:               {sequential / concurrent:.1f}x")
+    print(f"full get_roblox_user_task_counts (pagination + counting): {full:.2f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tasks-per-list', type=int, default=3000)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks_per_list, args.latency, args.concurrency))
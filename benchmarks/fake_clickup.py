@@ -0,0 +1,267 @@
+"""
+Local stand-in for the parts of the ClickUp API the bot uses.
+
+Serves, each after an artificial per-request latency:
+- `GET /list/{list_id}/task` with the archived, statuses[], assignees[], due_date_gt/lt, date_updated_gt
+  and page filters, 100 tasks per page and a `last_page` flag
+- `GET /task/{task_id}` (with `markdown_description`), `GET /task/{task_id}/comment`,
+  `GET /task/{task_id}/history` and `PUT /task/{task_id}` (due_date, assignees.add, markdown_content)
+- `POST /list/{list_id}/taskTemplate/{template_id}`
+- `GET /team/{team_id}/user`
+
+Every response carries X-RateLimit-Limit/Remaining/Reset; with `rate_limit` set, requests past
+the per-minute budget get a 429 like the real API.
+Point the bot at it with CLICKUP_API_URL=http://127.0.0.1:<port>.
+"""
+import time
+import asyncio
+import random
+from collections import Counter
+from aiohttp import web
+
+PAGE_SIZE = 100
+
+STATUSES = ['concluded', 'concluded', 'scheduled', 'pending staff']
+
+TEMPLATE_MARKDOWN = "#### Assessment Track A\n\nAssessor: \n\n#### Assessment Track B\n\nAssessor: "
+
+
+def member_id(name: str) -> int:
+    """The fake ClickUp user id of a roster name (stable across runs)."""
+    return sum(ord(c) * 31 ** i for i, c in enumerate(name.lower())) % 10_000_000
+
+
+def member_email(name: str) -> str:
+    return f"{name.lower()}@example.com"
+
+
+def generate_roster(size: int, base=()) -> list:
+    """`size` ROBLOX-style usernames, taken from `base` first and then made up."""
+    roster = list(dict.fromkeys(base))[:size]
+    i = 0
+    while len(roster) < size:
+        roster.append(f"Synthetic_User{i}")
+        i += 1
+    return roster
+
+
+def generate_tasks(list_ids, tasks_per_list, roster, start_ms, end_ms, seed=0):
+    """Build synthetic tasks spread across `list_ids`, hosted and co-hosted by names from `roster`."""
+    rng = random.Random(seed)
+    tasks = {list_id: [] for list_id in list_ids}
+    for list_id in list_ids:
+        for i in range(tasks_per_list):
+            host = rng.choice(roster)
+            cohosts = rng.sample(roster, k=min(3, len(roster)))
+            tasks[list_id].append({
+                'id': f"{list_id}-{i}",
+                'name': f"01/01/2025 - Monday - 18:00 GMT - {host}",
+                'description': "Assessment Track A\nAssessor: " + "\nAssessor: ".join(cohosts),
+                'status': {'status': rng.choice(STATUSES)},
+                'archived': rng.random() < 0.3,
+                'due_date': str(rng.randint(start_ms, end_ms)),
+                'date_updated': str(start_ms + i),
+                'assignees': [{'id': member_id(name), 'email': member_email(name)} for name in [host] + cohosts],
+                'url': f"https://app.clickup.com/t/{list_id}-{i}",
+            })
+    return tasks
+
+
+def generate_workspace(n_lists: int, tasks_per_list: int, roster_size: int, start_ms: int, end_ms: int,
+                       base_roster=(), seed=0):
+    """Return (list_ids, roster, tasks) for a synthetic workspace of `n_lists` department lists."""
+    list_ids = [f"list{i}" for i in range(n_lists)]
+    roster = generate_roster(roster_size, base_roster)
+    return list_ids, roster, generate_tasks(list_ids, tasks_per_list, roster, start_ms, end_ms, seed=seed)
+
+
+class FakeClickUp:
+    def __init__(self, tasks, latency: float = 0.05, rate_limit: int = None):
+        self.tasks = tasks
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.request_count = 0
+        # 'GET /list/{list_id}/task' -> count, for per-endpoint call counts
+        self.requests = Counter()
+        self.throttled = 0
+        self._window_start = time.time()
+        self._window_count = 0
+        self._by_id = {task['id']: (list_id, task) for list_id, list_tasks in tasks.items() for task in list_tasks}
+        self._created = 0
+        self._runner = None
+        self.url = None
+
+    def reset_counts(self):
+        self.request_count = 0
+        self.requests.clear()
+        self.throttled = 0
+
+    def _app(self):
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get('/list/{list_id}/task', self.list_tasks)
+        app.router.add_post('/list/{list_id}/taskTemplate/{template_id}', self.create_from_template)
+        app.router.add_get('/task/{task_id}', self.get_task)
+        app.router.add_put('/task/{task_id}', self.update_task)
+        app.router.add_get('/task/{task_id}/comment', self.task_comments)
+        app.router.add_get('/task/{task_id}/history', self.task_history)
+        app.router.add_get('/team/{team_id}/user', self.team_users)
+        return app
+
+    def _rate_headers(self):
+        limit = self.rate_limit or 10_000
+        return {
+            'X-RateLimit-Limit': str(limit),
+            'X-RateLimit-Remaining': str(max(limit - self._window_count, 0)),
+            'X-RateLimit-Reset': str(int(self._window_start + 60)),
+        }
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        self.request_count += 1
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        self.requests[f"{request.method} {route}"] += 1
+        now = time.time()
+        if now - self._window_start >= 60:
+            self._window_start, self._window_count = now, 0
+        self._window_count += 1
+        if self.rate_limit and self._window_count > self.rate_limit:
+            self.throttled += 1
+            return web.json_response({'err': 'Rate limit reached', 'ECODE': 'APP_002'}, status=429, headers=self._rate_headers())
+        await asyncio.sleep(self.latency)
+        response = await handler(request)
+        response.headers.update(self._rate_headers())
+        return response
+
+    def find_task(self, task_id):
+        return self._by_id.get(task_id, (None, None))
+
+    @staticmethod
+    def _not_found():
+        return web.json_response({'err': 'Task not found', 'ECODE': 'ITEM_015'}, status=404)
+
+    async def get_task(self, request):
+        list_id, task = self.find_task(request.match_info['task_id'])
+        if task is None:
+            return self._not_found()
+        body = dict(task, list={'id': list_id})
+        if request.query.get('include_markdown_description') == 'true':
+            body['markdown_description'] = task.get('markdown_description', task.get('description', ''))
+        return web.json_response(body)
+
+    async def update_task(self, request):
+        _, task = self.find_task(request.match_info['task_id'])
+        if task is None:
+            return self._not_found()
+        payload = await request.json()
+        if 'due_date' in payload:
+            task['due_date'] = str(payload['due_date'])
+        for user_id in (payload.get('assignees') or {}).get('add', []):
+            task['assignees'].append({'id': user_id, 'email': None})
+        if 'markdown_content' in payload:
+            task['markdown_description'] = task['description'] = payload['markdown_content']
+        task['date_updated'] = str(int(time.time() * 1000))
+        return web.json_response(task)
+
+    async def create_from_template(self, request):
+        list_id = request.match_info['list_id']
+        payload = await request.json()
+        self._created += 1
+        task_id = f"{list_id}-new{self._created}"
+        now_ms = str(int(time.time() * 1000))
+        task = {
+            'id': task_id,
+            'name': payload.get('name', ''),
+            'description': TEMPLATE_MARKDOWN,
+            'markdown_description': TEMPLATE_MARKDOWN,
+            'status': {'status': 'request'},
+            'archived': False,
+            'due_date': None,
+            'date_created': now_ms,
+            'date_updated': now_ms,
+            'assignees': [],
+            'url': f"https://app.clickup.com/t/{task_id}",
+        }
+        self.tasks.setdefault(list_id, []).append(task)
+        self._by_id[task_id] = (list_id, task)
+        return web.json_response({'id': task_id, 'task': task})
+
+    def _activity(self, task_id):
+        # Deterministic per task, so repeated fetches see the same comments and history
+        rng = random.Random(task_id)
+        _, task = self.find_task(task_id)
+        people = [a['email'] or str(a['id']) for a in task['assignees']] or ['someone@example.com']
+        base = int(task.get('date_updated') or 0)
+        comments = [
+            {'id': f"{task_id}-c{i}", 'comment_text': f"Comment {i} on {task_id}",
+             'user': {'username': rng.choice(people)}, 'date': str(base + i * 60000)}
+            for i in range(rng.randint(0, 8))
+        ]
+        history = [
+            {'id': f"{task_id}-h{i}", 'type': rng.choice(['status', 'assignee_add', 'due_date']),
+             'field': 'status', 'after': rng.choice(STATUSES), 'user': {'username': rng.choice(people)},
+             'date': str(base + i * 30000)}
+            for i in range(rng.randint(1, 25))
+        ]
+        return comments, history
+
+    async def task_comments(self, request):
+        task_id = request.match_info['task_id']
+        if self.find_task(task_id)[1] is None:
+            return self._not_found()
+        return web.json_response({'comments': self._activity(task_id)[0]})
+
+    async def task_history(self, request):
+        task_id = request.match_info['task_id']
+        if self.find_task(task_id)[1] is None:
+            return self._not_found()
+        return web.json_response({'history': self._activity(task_id)[1]})
+
+    async def team_users(self, request):
+        members = {}
+        for tasks in self.tasks.values():
+            for task in tasks:
+                for assignee in task['assignees']:
+                    if assignee.get('email'):
+                        members[assignee['id']] = assignee
+        return web.json_response({'users': list(members.values())})
+
+    async def list_tasks(self, request):
+        query = request.query
+        archived = query.get('archived', 'false') == 'true'
+        statuses = set(query.getall('statuses[]', []))
+        assignees = {int(a) for a in query.getall('assignees[]', [])}
+        due_gt = int(query['due_date_gt']) if 'due_date_gt' in query else None
+        due_lt = int(query['due_date_lt']) if 'due_date_lt' in query else None
+        updated_gt = int(query['date_updated_gt']) if 'date_updated_gt' in query else None
+        page = int(query.get('page', 0))
+        matching = []
+        for task in self.tasks.get(request.match_info['list_id'], []):
+            if task['archived'] != archived:
+                continue
+            if statuses and task['status']['status'] not in statuses:
+                continue
+            if assignees and not assignees & {a['id'] for a in task['assignees']}:
+                continue
+            due = int(task['due_date']) if task.get('due_date') else None
+            if due_gt is not None and (due is None or due <= due_gt):
+                continue
+            if due_lt is not None and (due is None or due >= due_lt):
+                continue
+            if updated_gt is not None and int(task['date_updated']) <= updated_gt:
+                continue
+            matching.append(task)
+        chunk = matching[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+        return web.json_response({'tasks': chunk, 'last_page': (page + 1) * PAGE_SIZE >= len(matching)})
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0):
+        self._runner = web.AppRunner(self._app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
@@ -1,10 +1,13 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import requests
 import os
 from dotenv import load_dotenv
-from bot.utils.helpers import get_db_connection
+from bot.utils.user_directory import get_user_directory
+from bot.utils.clickup_api import get_client, ClickUpError
+from bot.utils.quota_engine import get_user_quota_snapshot
+from bot.utils.clickup_members import get_workspace_members
+from bot.utils.ratelimit import mark_interactive
 import datetime
 from datetime import timezone, timedelta
 import pytz
@@ -15,7 +18,7 @@ load_dotenv()
 class Clickup(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.clickup_api_token = os.getenv('CLICKUP_API_TOKEN')
+        self.clickup = get_client()
         self.clickup_list_ids = {
             "Driving Department": os.getenv('CLICKUP_LIST_ID_DRIVING_DEPARTMENT'),
             "Dispatching Department": os.getenv('CLICKUP_LIST_ID_DISPATCHING_DEPARTMENT'),
@@ -23,24 +26,15 @@ class Clickup(commands.Cog):
             "Signalling Department": os.getenv('CLICKUP_LIST_ID_SIGNALLING_DEPARTMENT')
         }
 
-    def get_clickup_headers(self):
-        return {
-            "Authorization": self.clickup_api_token,
-            "accept": "application/json"
-        }
-
     @app_commands.command(name="check", description="Check if you've reached quota.")
     async def check(self, interaction: discord.Interaction):
+        mark_interactive()
         # --- Send initial message (not ephemeral, no embed) ---
         await interaction.response.send_message(
             content="Processing your request...",
             ephemeral=False
         )
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT primary_department, secondary_department, roblox_username, clickup_email, timezone FROM users WHERE discord_id = %s", (interaction.user.id,))
-        user_data = cursor.fetchone()
-        connection.close()
+        user_data = await get_user_directory().get(interaction.user.id)
 
         if (not user_data or
             any(
@@ -61,16 +55,9 @@ class Clickup(commands.Cog):
         if user_data['secondary_department']:
             departments.append(user_data['secondary_department'])
 
-        now = datetime.datetime.now(timezone.utc)
-        first_of_month = datetime.datetime(year=now.year, month=now.month, day=1, tzinfo=timezone.utc)
-        first_of_month_unix_ms = int(first_of_month.timestamp() * 1000)
-        # Calculate last moment of the month (11:59:59.999 PM UTC)
-        if now.month == 12:
-            next_month = datetime.datetime(year=now.year+1, month=1, day=1, tzinfo=timezone.utc)
-        else:
-            next_month = datetime.datetime(year=now.year, month=now.month+1, day=1, tzinfo=timezone.utc)
-        last_of_month = next_month - timedelta(milliseconds=1)
-        last_of_month_unix_ms = int(last_of_month.timestamp() * 1000)
+        # Only this user's tasks (assignees[] filter), unless a shared month scan is already at hand
+        clickup_user_id = await get_workspace_members().user_id(clickup_email)
+        snapshot = await get_user_quota_snapshot(departments, clickup_user_id)
 
         # --- Prepare status explanation embed (for followup, ephemeral) ---
         intro_embed = discord.Embed(
@@ -92,85 +79,14 @@ class Clickup(commands.Cog):
             if not list_id:
                 await interaction.edit_original_response(content=f"Could not find {department}'s Clickup list. Please check your settings and ensure your primary department is valid.")
                 continue
-            headers = self.get_clickup_headers()
-
             # --- Gather all tasks for this department ---
-            concluded_username = 0
-            concluded_total = 0
-            scheduled_username = 0
-            scheduled_total = 0
-            scheduled_trainings_username = []
-            scheduled_trainings_total = []
-            concluded_trainings_username = []
-            concluded_trainings_total = []
-
-            # Concluded (archived true/false)
-            for archived_value in ["false", "true"]:
-                page = 0
-                while True:
-                    url_with_params = (
-                        f"https://api.clickup.com/api/v2/list/{list_id}/task?"
-                        f"archived={archived_value}&"
-                        f"statuses=concluded&"
-                        f"statuses=concluded&"
-                        f"include_closed=true&"
-                        f"due_date_gt={first_of_month_unix_ms}&"
-                        f"due_date_lt={last_of_month_unix_ms}&"
-                        f"page={page}"
-                    )
-                    response = requests.get(url_with_params, headers=headers)
-                    if response.status_code != 200:
-                        break
-                    data = response.json()
-                    tasks = data.get("tasks", [])
-                    if not tasks:
-                        break
-                    for task in tasks:
-                        assignees = [assignee['email'] for assignee in task.get('assignees', [])]
-                        if clickup_email in assignees:
-                            due_date = task.get('due_date')
-                            if due_date and int(due_date) >= first_of_month_unix_ms:
-                                concluded_total += 1
-                                concluded_trainings_total.append(task)
-                                if roblox_username in task['name']:
-                                    concluded_username += 1
-                                    concluded_trainings_username.append(task)
-                    if data.get("last_page", False):
-                        break
-                    page += 1
-
-            # Scheduled (archived false)
-            archived_value = "false"
-            page = 0
-            while True:
-                url_with_params = (
-                    f"https://api.clickup.com/api/v2/list/{list_id}/task?"
-                    f"archived={archived_value}&"
-                    f"statuses=pending%20staff&"
-                    f"statuses=scheduled&"
-                    f"include_closed=true&"
-                    f"due_date_gt={first_of_month_unix_ms}&"
-                    f"due_date_lt={last_of_month_unix_ms}&"
-                    f"page={page}"
-                )
-                response = requests.get(url_with_params, headers=headers)
-                if response.status_code != 200:
-                    break
-                data = response.json()
-                tasks = data.get("tasks", [])
-                if not tasks:
-                    break
-                for task in tasks:
-                    assignees = [assignee['email'] for assignee in task.get('assignees', [])]
-                    if clickup_email in assignees:
-                        scheduled_total += 1
-                        scheduled_trainings_total.append(task)
-                        if roblox_username in task['name']:
-                            scheduled_username += 1
-                            scheduled_trainings_username.append(task)
-                if data.get("last_page", False):
-                    break
-                page += 1
+            counts = snapshot.user_counts(clickup_email, roblox_username, department)
+            concluded_username = counts['concluded_host']
+            concluded_total = counts['concluded_total']
+            scheduled_username = counts['scheduled_host']
+            scheduled_total = counts['scheduled_total']
+            scheduled_trainings_username = counts['scheduled_host_tasks']
+            scheduled_trainings_total = counts['scheduled_tasks']
 
             department_colors = {
                 "Driving Department": 0xE43D2E,  # Red
@@ -210,8 +126,8 @@ class Clickup(commands.Cog):
                     tz = pytz.UTC
                 scheduled_list = []
                 for t in scheduled_trainings_username:
-                    due = t.get('due_date')
-                    url = t.get('url')
+                    due = t.due_date
+                    url = t.url
                     if due:
                         dt_utc = datetime.datetime.utcfromtimestamp(int(due)/1000).replace(tzinfo=pytz.UTC)
                         dt_local = dt_utc.astimezone(tz)
@@ -296,8 +212,8 @@ class Clickup(commands.Cog):
                     tz = pytz.UTC
                 scheduled_list = []
                 for t in scheduled_trainings_total:
-                    due = t.get('due_date')
-                    url = t.get('url')
+                    due = t.due_date
+                    url = t.url
                     if due:
                         dt_utc = datetime.datetime.utcfromtimestamp(int(due)/1000).replace(tzinfo=pytz.UTC)
                         dt_local = dt_utc.astimezone(tz)
@@ -377,11 +293,8 @@ class Clickup(commands.Cog):
         department="Defaults to your primary department"
     )
     async def create(self, interaction: discord.Interaction, date: str, time: str, department: str = None):
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT primary_department, clickup_email, timezone, roblox_username FROM users WHERE discord_id = %s", (interaction.user.id,))
-        user_data = cursor.fetchone()
-        connection.close()
+        mark_interactive()
+        user_data = await get_user_directory().get(interaction.user.id)
 
         # Immediately acknowledge the interaction
         await interaction.response.send_message("Sorry! This command is receiving an upgrade to be more convenient, along with a new command. Please manually create your training until then.", ephemeral=True)
@@ -440,21 +353,16 @@ class Clickup(commands.Cog):
             return
 
         # Query for overlapping tasks in the 5-hour window
-        url_check = (
-            f"https://api.clickup.com/api/v2/list/{list_id}/task?"
-            f"archived=false&"
-            f"statuses=request&"
-            f"statuses=pending%20staff&"
-            f"statuses=scheduled&"
-            f"due_date_gt={unix_before}&"
-            f"due_date_lt={unix_after}"
-        )
-        headers = self.get_clickup_headers()
-        response = requests.get(url_check, headers=headers)
-        if response.status_code != 200:
+        try:
+            data = await self.clickup.get_list_tasks_page(
+                list_id,
+                statuses=['request', 'pending staff', 'scheduled'],
+                due_date_gt=unix_before,
+                due_date_lt=unix_after
+            )
+        except ClickUpError:
             await interaction.edit_original_response(content="Failed to check ClickUp for overlapping tasks.")
             return
-        data = response.json()
         tasks = data.get("tasks", [])
         if tasks:
             embed = discord.Embed(title="Overlapping Training(s) Found", color=discord.Color.red())
@@ -473,68 +381,53 @@ class Clickup(commands.Cog):
             await interaction.edit_original_response(content=None, embed=embed)
             return
         training_name = f"{day}/{month}/{year} - {day_of_week} - {hour_min} {tz_label} - {roblox_username}"
-        url_create = f"https://api.clickup.com/api/v2/list/{list_id}/taskTemplate/{template_id}"
-        payload = { "name": training_name }
-        headers_create = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "Authorization": self.clickup_api_token
-        }
-        create_resp = requests.post(url_create, headers=headers_create, json=payload)
-        if create_resp.status_code == 200:
-            task = create_resp.json()
-            task_id = task.get('id')
-            if not task_id:
-                await interaction.edit_original_response(content="Training created, but could not retrieve task ID.")
-                return
-            # Set due date and assign user by email (if possible)
-            # 1. Set due date
-            url_update = f"https://api.clickup.com/api/v2/task/{task_id}"
-            payload_update = {"due_date": str(unix_central)}
-            requests.put(url_update, headers=headers_create, json=payload_update)
-            # 2. Assign user by email (requires user id)
-            # Fetch ClickUp user id by email
-            user_id = None
-            workspace_id = os.getenv('CLICKUP_WORKSPACE_ID')
-            if workspace_id and clickup_email:
-                user_search_url = f"https://api.clickup.com/api/v2/team/{workspace_id}/user"
-                user_search_resp = requests.get(user_search_url, headers=headers_create)
-                if user_search_resp.status_code == 200:
-                    users_data = user_search_resp.json().get('users', [])
-                    for u in users_data:
-                        if u.get('email', '').lower() == clickup_email.lower():
-                            user_id = u.get('id')
-                            break
-            if user_id:
-                payload_update = {"assignees": {"add": [user_id]}}
-                requests.put(url_update, headers=headers_create, json=payload_update)
-            # Step 3: Fetch the markdown description
-            url_get = f"https://api.clickup.com/api/v2/task/{task_id}?include_markdown_description=true"
-            get_resp = requests.get(url_get, headers=headers)
-            if get_resp.status_code != 200:
-                await interaction.edit_original_response(content="Training created, but failed to insert your ROBLOX username in description under Assessment Track A. Everything else is fine.")
-                return
-            task_data = get_resp.json()
-            markdown = task_data.get('markdown_description') or task_data.get('description')
-            if not markdown:
-                await interaction.edit_original_response(content="Training created, but no description found to update with your ROBLOX username under Assessment Track A. Everything else is fine.")
-                return
-            # Step 4: Insert ROBLOX username after 'Assessor: '
-            pattern = r'(#### Assessment Track A\\s+Assessor: )(.*)'
-            replacement = r'\\1' + roblox_username
-            new_markdown, count = re.subn(pattern, replacement, markdown, count=1, flags=re.MULTILINE)
-            if count == 0:
-                # Fallback: try to find 'Assessor:' line and append username
-                new_markdown = markdown.replace('Assessor: ', f'Assessor: {roblox_username}', 1)
-            # Step 5: Update the description
-            payload_update = { "markdown_content": new_markdown }
-            update_resp = requests.put(url_update, headers=headers_create, json=payload_update)
-            if update_resp.status_code == 200:
-                await interaction.edit_original_response(content=f"Training created successfully!\n{training_name}\nAssessor set to: {roblox_username}")
-            else:
-                await interaction.edit_original_response(content=f"Training created, but failed to update description. ClickUp API response: {update_resp.text}")
-        else:
-            await interaction.edit_original_response(content=f"All your information was valid, but clickup failed to create training. Loser's (ClickUp's) API response: {create_resp.text}")
+        try:
+            task = await self.clickup.create_task_from_template(list_id, template_id, training_name)
+        except ClickUpError as e:
+            await interaction.edit_original_response(content=f"All your information was valid, but clickup failed to create training. Loser's (ClickUp's) API response: {e.text}")
+            return
+        task_id = task.get('id')
+        if not task_id:
+            await interaction.edit_original_response(content="Training created, but could not retrieve task ID.")
+            return
+        # Set due date and assign user by email (if possible)
+        # 1. Set due date
+        try:
+            await self.clickup.update_task(task_id, {"due_date": str(unix_central)})
+        except ClickUpError:
+            pass
+        # 2. Assign user by email (requires user id)
+        # ClickUp user id by email, from the cached workspace member map
+        user_id = await get_workspace_members().user_id(clickup_email)
+        if user_id:
+            try:
+                await self.clickup.update_task(task_id, {"assignees": {"add": [user_id]}})
+            except ClickUpError:
+                pass
+        # Step 3: Fetch the markdown description
+        try:
+            task_data = await self.clickup.get_task(task_id, include_markdown=True)
+        except ClickUpError:
+            await interaction.edit_original_response(content="Training created, but failed to insert your ROBLOX username in description under Assessment Track A. Everything else is fine.")
+            return
+        markdown = task_data.get('markdown_description') or task_data.get('description')
+        if not markdown:
+            await interaction.edit_original_response(content="Training created, but no description found to update with your ROBLOX username under Assessment Track A. Everything else is fine.")
+            return
+        # Step 4: Insert ROBLOX username after 'Assessor: '
+        pattern = r'(#### Assessment Track A\\s+Assessor: )(.*)'
+        replacement = r'\\1' + roblox_username
+        new_markdown, count = re.subn(pattern, replacement, markdown, count=1, flags=re.MULTILINE)
+        if count == 0:
+            # Fallback: try to find 'Assessor:' line and append username
+            new_markdown = markdown.replace('Assessor: ', f'Assessor: {roblox_username}', 1)
+        # Step 5: Update the description
+        try:
+            await self.clickup.update_task(task_id, {"markdown_content": new_markdown})
+        except ClickUpError as e:
+            await interaction.edit_original_response(content=f"Training created, but failed to update description. ClickUp API response: {e.text}")
+            return
+        await interaction.edit_original_response(content=f"Training created successfully!\n{training_name}\nAssessor set to: {roblox_username}")
 
 async def setup(bot):
     await bot.add_cog(Clickup(bot))
\ No newline at end of file
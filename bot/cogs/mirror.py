@@ -0,0 +1,69 @@
+from discord.ext import commands, tasks
+from datetime import datetime, timedelta
+import pytz
+import os
+from bot.utils.task_mirror import get_mirror
+from bot.utils.quota_engine import quota_roster
+from bot.utils.webhooks import WebhookReceiver
+
+
+# Keeps the local task mirror in step with ClickUp so commands and reminders read it instead of paging the API
+class Mirror(commands.Cog):
+    # Full resyncs catch deletions and tasks moved between lists, which date_updated_gt can't see
+    FULL_SYNC_EVERY = timedelta(hours=24)
+    # With webhooks pushing changes, polling only reconciles anything they missed
+    RECONCILE_EVERY_MINUTES = 15
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.mirror = get_mirror()
+        self.webhooks = None
+        self._last_full_sync = None
+        bot.loop.create_task(self._delayed_start())
+
+    async def _delayed_start(self):
+        await self.bot.wait_until_ready()
+        port = os.getenv('CLICKUP_WEBHOOK_PORT')
+        secret = os.getenv('CLICKUP_WEBHOOK_SECRET')
+        if port and secret:
+            try:
+                self.webhooks = WebhookReceiver(secret, path=os.getenv('CLICKUP_WEBHOOK_PATH', '/clickup/webhook'), mirror=self.mirror,
+                                               on_change=self._task_changed)
+                await self.webhooks.start(host=os.getenv('CLICKUP_WEBHOOK_HOST', '0.0.0.0'), port=int(port))
+                self.sync_task_mirror.change_interval(minutes=self.RECONCILE_EVERY_MINUTES)
+            except Exception as e:
+                self.webhooks = None
+                print(f"[Mirror] Failed to start webhook receiver, polling only: {e}")
+        elif port:
+            print("[Mirror] CLICKUP_WEBHOOK_PORT is set without CLICKUP_WEBHOOK_SECRET; webhooks disabled, polling only")
+        try:
+            self.sync_task_mirror.start()
+        except Exception as e:
+            print(f"[Mirror] Failed to start sync_task_mirror: {e}")
+
+    async def cog_unload(self):
+        self.sync_task_mirror.cancel()
+        if self.webhooks:
+            await self.webhooks.stop()
+
+    def _task_changed(self, task_id, task):
+        # Other cogs (Reminders) listen for on_clickup_task_changed; task is None once it's gone
+        self.bot.dispatch('clickup_task_changed', task_id, task)
+
+    @tasks.loop(minutes=2)
+    async def sync_task_mirror(self):
+        now = datetime.now(pytz.UTC)
+        full = self._last_full_sync is None or now - self._last_full_sync >= self.FULL_SYNC_EVERY
+        # Registered users' names are mirrored too, so >user and the quota snapshot can read the mirror for them
+        self.mirror.set_roster(await quota_roster())
+        results = await self.mirror.sync(full=full)
+        failed = {list_id: e for list_id, e in results.items() if isinstance(e, Exception)}
+        for list_id, e in failed.items():
+            print(f"[Mirror] Sync failed for list {list_id}: {e}")
+        if full and not failed:
+            self._last_full_sync = now
+            print(f"[Mirror] Full sync finished: {sum(results.values())} tasks across {len(results)} lists")
+
+
+async def setup(bot):
+    await bot.add_cog(Mirror(bot))
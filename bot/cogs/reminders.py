@@ -1,17 +1,36 @@
 import discord
 import asyncio
-import requests
+import logging
 from discord.ext import commands, tasks
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta, timezone, time as dt_time
 import pytz
 import os
-import mysql.connector
+from bot.utils.user_directory import get_user_directory
+from bot.utils.clickup_api import ClickUpError
+from bot.utils.task_mirror import fetch_list_tasks, department_list_ids
+from bot.utils.quota_engine import get_quota_snapshot
+from bot.utils.reminder_schedule import ReminderSchedule, ReminderJob
+from bot.utils.reminder_store import get_reminder_store, CATCH_UP_GRACE_MS
+from bot.utils.dm_dispatch import get_dm_dispatcher
+from bot.utils.log_sink import ChannelLogSink
 
 class Reminders(commands.Cog):
+    # (offset before the due date, embed number, label); the 30m/15m last-minute reminder depends on host vs co-host
+    TRAINING_INTERVALS = [
+        (24 * 60 * 60 * 1000, 1, '24h'),
+        (10 * 60 * 60 * 1000, 2, '10h'),
+        (2 * 60 * 60 * 1000, 3, '2h'),
+    ]
     def __init__(self, bot):
         self.bot = bot
         self._quota_task_started = False
         self._training_task_started = False
+        self.training_schedule = ReminderSchedule()
+        self.reminder_store = get_reminder_store()
+        self._training_runner = None
+        self._opted_out_logged = set()
+        self.dms = get_dm_dispatcher(bot)
+        self.log_sink = ChannelLogSink(bot, self.LOG_CHANNEL_ID, 'reminders')
         # Schedule the tasks to start after cog is fully ready
         bot.loop.create_task(self._delayed_start())
 
@@ -23,181 +42,97 @@ class Reminders(commands.Cog):
         except Exception as e:
             print(f"[Reminders] Failed to start send_quota_reminders: {e}")
         try:
-            self.send_training_reminders.start()
+            self._recover_training_reminders()
+            self.refresh_training_reminders.start()
+            self._training_runner = asyncio.create_task(self.training_schedule.run(self._fire_training_reminder))
             self._training_task_started = True
         except Exception as e:
-            print(f"[Reminders] Failed to start send_training_reminders: {e}")
+            print(f"[Reminders] Failed to start training reminders: {e}")
 
-    def get_db_connection(self):
-        return mysql.connector.connect(
-            host=os.getenv('DB_HOST'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            database=os.getenv('DB_NAME')
-        )
-
-    async def get_user_reminder_pref(self, discord_id):
-        connection = self.get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT reminder_preferences FROM users WHERE discord_id = %s", (discord_id,))
-        row = cursor.fetchone()
-        connection.close()
-        if not row:
-            return None
-        return row['reminder_preferences']
-
-    async def log_to_channel(self, message, department=None, max_retries=3):
-        channel = self.bot.get_channel(self.LOG_CHANNEL_ID)
-        if channel:
-            emoji = ''
-            if department:
-                dept = department.lower()
-                if 'driving' in dept:
-                    emoji = '\U0001F534'  # Red circle
-                elif 'dispatch' in dept:
-                    emoji = '\U0001F7E0'  # Orange circle
-                elif 'guard' in dept:
-                    emoji = '\U0001F7E1'  # Yellow circle
-                elif 'signal' in dept:
-                    emoji = '\U0001F7E2'  # Green circle
-            msg = f"{emoji} {message}" if emoji else message
-            for attempt in range(1, max_retries + 1):
-                try:
-                    await channel.send(msg)
-                    break
-                except Exception as e:
-                    if isinstance(e, discord.errors.DiscordServerError):
-                        print(f"[Reminders] Discord 503 error on log_to_channel (attempt {attempt}): {e}")
-                        if attempt < max_retries:
-                            await asyncio.sleep(2 ** attempt)  # Exponential backoff
-                        else:
-                            print(f"[Reminders] Giving up after {max_retries} attempts to send log message.")
-                    else:
-                        print(f"[Reminders] Unexpected error in log_to_channel: {e}")
-                        break
+    def log_to_channel(self, message, department=None, level=logging.INFO):
+        """Buffer a log entry; DEBUG entries only go to the local reminders.log."""
+        self.log_sink.log(message, department, level)
 
-    LOG_CHANNEL_ID = 1374924175000469625  
+    LOG_CHANNEL_ID = 1374924175000469625
 
-    @tasks.loop(hours=24)
+    @tasks.loop(time=dt_time(hour=0, minute=0, tzinfo=timezone.utc))
     async def send_quota_reminders(self):
+        await self._run_quota_reminders()
+
+    async def _run_quota_reminders(self):
         today = datetime.now(pytz.UTC)
+        run_date = today.strftime('%Y-%m-%d')
         day_of_month = today.day
         days_in_month = (today.replace(month=today.month % 12 + 1, day=1) - timedelta(days=1)).day
         days_left = days_in_month - day_of_month
-        await self.log_to_channel(f"🗓️ Loop start: day_of_month={day_of_month}, days_left={days_left}")
+        self.log_to_channel(f"🗓️ Loop start: day_of_month={day_of_month}, days_left={days_left}")
         if day_of_month not in [7, 11] and days_left not in [7, 3]:
-            await self.log_to_channel(f"🗓️ Skipping: Not a reminder day.")
+            self.log_to_channel(f"🗓️ Skipping: Not a reminder day.")
+            self.reminder_store.mark_run('quota', run_date)
+            return
+        users = await get_user_directory().all()
+        self.log_to_channel(f"🗓️ Fetching quota info for {len(users)} users on {datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+        # Every department list is scanned once for the whole run instead of once per user and department
+        snapshot = await get_quota_snapshot()
+        if snapshot.errors:
+            # An incomplete snapshot undercounts; rescan once rather than DM people who may be on track
+            self.log_to_channel(f"🗓️ [Error] Quota snapshot had {len(snapshot.errors)} failed page(s), rescanning", level=logging.ERROR)
+            snapshot = await get_quota_snapshot(max_age=0)
+        if snapshot.errors:
+            # Not marked as run, so the start-up catch-up tries again
+            self.log_to_channel(f"🗓️ [Error] Quota snapshot still incomplete ({snapshot.errors[0]}); no reminders sent for {run_date}", level=logging.ERROR)
             return
-        connection = self.get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT discord_id, primary_department, secondary_department, roblox_username, clickup_email, timezone, reminder_preferences FROM users")
-        users = cursor.fetchall()
-        connection.close()
-        await self.log_to_channel(f"🗓️ Fetching quota info for {len(users)} users on {datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+        self.log_to_channel(f"\U0001F5D3 [Fetch] Quota snapshot for {snapshot.year}-{snapshot.month:02d} built from {snapshot.source}", level=logging.DEBUG)
         for user in users:
             if any(user.get(field) in (None, 'Not set') for field in [
                 'primary_department', 'roblox_username', 'clickup_email', 'timezone', 'reminder_preferences']):
-                await self.log_to_channel(f"🗓️ Skipping user {user.get('discord_id')} due to missing data.")
+                self.log_to_channel(f"🗓️ Skipping user {user.get('discord_id')} due to missing data.", level=logging.DEBUG)
                 continue
             if 'quota' not in user.get('reminder_preferences', '').lower():
-                await self.log_to_channel(f"🗓️ Skipping user {user.get('discord_id')} (no 'quota' in preferences)")
+                self.log_to_channel(f"🗓️ Skipping user {user.get('discord_id')} (no 'quota' in preferences)", level=logging.DEBUG)
                 continue
             discord_id = user['discord_id']
             departments = [user['primary_department']]
             if user['secondary_department'] and user['secondary_department'] != 'None':
                 departments.append(user['secondary_department'])
             for department in departments:
-                pref = await self.get_user_reminder_pref(discord_id)
-                if not pref or 'quota' not in pref.lower():
-                    await self.log_to_channel(f"🗓️ Skipping user {discord_id} for {department} (no 'quota' in pref)")
-                    continue
-                headers = {
-                    "Authorization": os.getenv('CLICKUP_API_TOKEN'),
-                    "accept": "application/json"
-                }
                 list_id_env_key = f"CLICKUP_LIST_ID_{department.upper().replace(' ', '_')}"
                 list_id = os.getenv(list_id_env_key)
                 if not list_id:
-                    await self.log_to_channel(f"🗓️ No list_id for department {department}")
+                    self.log_to_channel(f"🗓️ No list_id for department {department}")
                     continue
-                now = datetime.now(timezone.utc)
-                first_of_month = datetime(year=now.year, month=now.month, day=1, tzinfo=timezone.utc)
-                first_of_month_unix_ms = int(first_of_month.timestamp() * 1000)
-                # Calculate last moment of the month (11:59:59.999 PM UTC)
-                if now.month == 12:
-                    next_month = datetime(year=now.year+1, month=1, day=1, tzinfo=timezone.utc)
-                else:
-                    next_month = datetime(year=now.year, month=now.month+1, day=1, tzinfo=timezone.utc)
-                last_of_month = next_month - timedelta(milliseconds=1)
-                last_of_month_unix_ms = int(last_of_month.timestamp() * 1000)
                 roblox_username = user['roblox_username']
                 clickup_email = user['clickup_email']
-                concluded_username = 0
-                concluded_total = 0
-                for archived_value in ["false", "true"]:
-                    page = 0
-                    while True:
-                        url_with_params = (
-                            f"https://api.clickup.com/api/v2/list/{list_id}/task?"
-                            f"archived={archived_value}&"
-                            f"statuses=concluded&"
-                            f"statuses=concluded&"
-                            f"include_closed=true&"
-                            f"due_date_gt={first_of_month_unix_ms}&"
-                            f"due_date_lt={last_of_month_unix_ms}&"
-                            f"page={page}"
-                        )
-                        response = requests.get(url_with_params, headers=headers)
-                        # Logging for each task fetch and result
-                        await self.log_to_channel(f"\U0001F5D3 [Fetch] {department} | archived={archived_value} | page={page} | status={response.status_code}")
-                        if response.status_code != 200:
-                            await self.log_to_channel(f"\U0001F5D3 [Error] {department} | Could not fetch tasks: {response.text}")
-                            break
-                        data = response.json()
-                        tasks = data.get("tasks", [])
-                        if not tasks:
-                            await self.log_to_channel(f"\U0001F5D3 [NoTasks] {department} | archived={archived_value} | page={page} | No tasks found.")
-                            break
-                        for task in tasks:
-                            assignees = [assignee['email'] for assignee in task.get('assignees', [])]
-                            if clickup_email in assignees:
-                                due_date = task.get('due_date')
-                                if due_date and int(due_date) >= first_of_month_unix_ms:
-                                    concluded_total += 1
-                                    # Log if username is in task name (Host/CoHost credit)
-                                    if roblox_username in task['name']:
-                                        concluded_username += 1
-                                        await self.log_to_channel(f"\U0001F5D3 [HostMatch] User {discord_id} | {department} | Task '{task['name']}' | Host/CoHost credit given (username found in task name)")
-                                    else:
-                                        await self.log_to_channel(f"\U0001F5D3 [CoHostOnly] User {discord_id} | {department} | Task '{task['name']}' | CoHost credit only (username NOT found in task name)")
-                        if data.get("last_page", False):
-                            break
-                        page += 1
-                await self.log_to_channel(f"\U0001F5D3 [Summary] User {discord_id} | {department} | Total Host/CoHost: {concluded_total} | Host: {concluded_username}")
+                counts = snapshot.user_counts(clickup_email, roblox_username, department)
+                concluded_username = counts['concluded_host']
+                concluded_total = counts['concluded_total']
+                for task in counts['concluded_tasks']:
+                    # Log if username is in task name (Host/CoHost credit)
+                    if roblox_username in task.name:
+                        self.log_to_channel(f"\U0001F5D3 [HostMatch] User {discord_id} | {department} | Task '{task.name}' | Host/CoHost credit given (username found in task name)", level=logging.DEBUG)
+                    else:
+                        self.log_to_channel(f"\U0001F5D3 [CoHostOnly] User {discord_id} | {department} | Task '{task.name}' | CoHost credit only (username NOT found in task name)", level=logging.DEBUG)
+                self.log_to_channel(f"\U0001F5D3 [Summary] User {discord_id} | {department} | Total Host/CoHost: {concluded_total} | Host: {concluded_username}")
                 host_required = 3 if department == "Driving Department" else 2
                 found_to_send = False
                 if day_of_month in [7, 11]:
                     if concluded_total < 1:
                         found_to_send = True
-                        await self.log_to_channel(f"\U0001F5D3 [Trigger] User {discord_id} | {department} | Day {day_of_month}: <1 Host/CoHost completed. Sending reminder.")
-                        await self.send_reminder(discord_id, department)
+                        self.log_to_channel(f"\U0001F5D3 [Trigger] User {discord_id} | {department} | Day {day_of_month}: <1 Host/CoHost completed. Sending reminder.")
                 elif days_left in [7, 3]:
                     if concluded_total < 8 or concluded_username < host_required:
                         found_to_send = True
-                        await self.log_to_channel(f"\U0001F5D3 [Trigger] User {discord_id} | {department} | {days_left} days left: <8 Host/CoHost or <{host_required} Host completed. Sending reminder.")
-                        await self.send_reminder(discord_id, department)
+                        self.log_to_channel(f"\U0001F5D3 [Trigger] User {discord_id} | {department} | {days_left} days left: <8 Host/CoHost or <{host_required} Host completed. Sending reminder.")
                 if found_to_send:
-                    await self.log_to_channel(f"\U0001F5D3 [DM] Reminder sent to user {discord_id} for {department} (criteria met)")
+                    # A run repeated after a restart doesn't DM anyone twice for the same day
+                    if not self.reminder_store.claim_key(discord_id, f"quota:{run_date}", department):
+                        self.log_to_channel(f"\U0001F5D3 [Duplicate] User {discord_id} | {department} | Already reminded today")
+                        continue
+                    await self.send_reminder(discord_id, department)
+                    self.log_to_channel(f"\U0001F5D3 [DM] Reminder sent to user {discord_id} for {department} (criteria met)")
+        self.reminder_store.mark_run('quota', run_date)
 
     async def send_reminder(self, discord_id, department):
-        user = self.bot.get_user(discord_id)
-        if not user:
-            try:
-                user = await self.bot.fetch_user(discord_id)
-                await self.log_to_channel(f"🗓️ fetch_user succeeded for {discord_id}")
-            except Exception as e:
-                await self.log_to_channel(f"🗓️ Could not fetch user {discord_id}: {e}")
-                return
         today = datetime.now(pytz.UTC)
         day_of_month = today.day
         days_in_month = (today.replace(month=today.month % 12 + 1, day=1) - timedelta(days=1)).day
@@ -214,15 +149,63 @@ class Reminders(commands.Cog):
             embed = discord.Embed(title=f"Quota Reminder: 3 Days Left ({department})", description=f"You are receiving this reminder because you have not completed at least {host_required} hosts and/or 8 total Hosts/CoHosts yet!\n\n- Run `/check` to get more specifics on your quota situation\n- Note that these do NOT account for LOAs\n\nYou can disable these reminders in `/settings`", color=discord.Color.blue())
         else:
             embed = discord.Embed(title=f"Quota Reminder ({department})", description="How did we get here? The bot has no idea why it's sending you this, but you should probably run `/check` to see whats up.", color=discord.Color.blue())
-        try:
-            await user.send(embed=embed)
-            await self.log_to_channel(f"🗓️ DM sent to user {discord_id} for {department}")
-        except Exception as e:
-            await self.log_to_channel(f"🗓️ Failed to DM user {discord_id} for {department}: {e}")
+        future = self.dms.enqueue(discord_id, embed=embed, tag=department)
+        future.add_done_callback(self._log_quota_dm)
 
+    def _log_quota_dm(self, future):
+        if future.cancelled():
+            # The dispatcher was stopped before this DM went out
+            self.log_to_channel("🗓️ Quota reminder DM cancelled before it was sent", level=logging.DEBUG)
+            return
+        result = future.result()
+        if result.ok:
+            message = f"🗓️ DM sent to user {result.discord_id} for {result.tag}"
+        else:
+            message = f"🗓️ Failed to DM user {result.discord_id} for {result.tag}: {result.reason}"
+        self.log_to_channel(message)
 
-    async def _run_training_reminders_once(self):
+
+    def _training_jobs(self, task, dept_name, user_lookup, now_ms):
+        """Build the pending reminder jobs for one scheduled task."""
+        due_date = int(task.get('due_date') or 0)
+        task_id = task.get('id', 'Unknown')
+        task_name = task.get('name', '')
+        if dept_name == "Driving Department" and '•' in task_name:
+            host = task_name.split('•')[-1].strip()
+        elif ' - ' in task_name:
+            host = task_name.split(' - ')[-1].strip()
+        else:
+            host = ''
+        jobs = []
+        for email in [a['email'] for a in task.get('assignees', [])]:
+            user = user_lookup.get(email)
+            if not user or any(user.get(field) in (None, 'Not set') for field in ['discord_id', 'roblox_username', 'clickup_email', 'reminder_preferences']):
+                continue
+            discord_id = user['discord_id']
+            if 'training' not in user.get('reminder_preferences', '').lower():
+                if (task_id, discord_id) not in self._opted_out_logged:
+                    self._opted_out_logged.add((task_id, discord_id))
+                    message = f":gear: **[OptedOut]** {dept_name}\n\n## Task\nID: {task_id}\n\n## Reminder\nResult: 'training' not in reminder preferences for <@{discord_id}>. Skipping."
+                    self.log_to_channel(message, department=dept_name)
+                continue
+            # Host: 30m, Co-Host: 15m
+            if user['roblox_username'] == host:
+                last_minute = (30 * 60 * 1000, 4, '30m')
+            else:
+                last_minute = (15 * 60 * 1000, 5, '15m')
+            for ms, embed_num, label in self.TRAINING_INTERVALS + [last_minute]:
+                fire_at = due_date - ms
+                # Deadlines that passed before we ever saw the task are not sent late
+                if fire_at + CATCH_UP_GRACE_MS < now_ms or due_date <= now_ms:
+                    continue
+                jobs.append(ReminderJob(fire_at, task_id, discord_id, label, embed_num, dept_name, task))
+        return jobs
+
+    @tasks.loop(minutes=5)
+    async def refresh_training_reminders(self):
+        """Reconcile the reminder schedule with the scheduled tasks due in the next 25 hours."""
         now = datetime.now(pytz.UTC)
+        now_ms = int(now.timestamp() * 1000)
         unix_25h_away = int((now + timedelta(hours=25)).timestamp() * 1000)
         department_keys = [
             'CLICKUP_LIST_ID_DRIVING_DEPARTMENT',
@@ -230,116 +213,96 @@ class Reminders(commands.Cog):
             'CLICKUP_LIST_ID_GUARDING_DEPARTMENT',
             'CLICKUP_LIST_ID_SIGNALLING_DEPARTMENT',
         ]
-        sent_last_minute_reminder = set()  # Track (discord_id, task_id) pairs for last-minute reminders
-        connection = self.get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT discord_id, roblox_username, clickup_email, reminder_preferences FROM users")
-        users = cursor.fetchall()
-        connection.close()
+        users = await get_user_directory().all()
         user_lookup = {u['clickup_email']: u for u in users if u['clickup_email'] not in (None, 'Not set')}
-        london_tz = pytz.timezone('Europe/London')
+        seen_task_ids = set()
+        complete = True
         for dept_key in department_keys:
             list_id = os.getenv(dept_key)
             if not list_id:
                 continue
-            url = f"https://api.clickup.com/api/v2/list/{list_id}/task?archived=false&statuses=scheduled&statuses=scheduled&due_date_lt={unix_25h_away}"
-            headers = {"Authorization": os.getenv('CLICKUP_API_TOKEN'), "accept": "application/json"}
-            response = requests.get(url, headers=headers)
-            if response.status_code != 200:
-                await self.log_to_channel(f"⚙️ [Error] {dept_key.replace('CLICKUP_LIST_ID_', '').replace('_', ' ').title()} | Could not fetch scheduled tasks: {response.text}")
+            dept_name = dept_key.replace('CLICKUP_LIST_ID_', '').replace('_', ' ').title()
+            try:
+                scheduled_tasks = await fetch_list_tasks(list_id, statuses=['scheduled'], due_date_lt=unix_25h_away)
+            except ClickUpError as e:
+                complete = False
+                self.log_to_channel(f"⚙️ [Error] {dept_name} | Could not fetch scheduled tasks: {e.text}", level=logging.ERROR)
                 continue
-            data = response.json()
-            for task in data.get('tasks', []):
-                due_date = int(task.get('due_date', 0))
-                assignees = [a['email'] for a in task.get('assignees', [])]
-                now_ms = int(now.timestamp() * 1000)
-                intervals = [
-                    (24 * 60 * 60 * 1000, 1, '24h'),
-                    (10 * 60 * 60 * 1000, 2, '10h'),
-                    (2 * 60 * 60 * 1000, 3, '2h'),
-                ]
-                # Always set these for the task, so they're available for all code paths
-                task_id = task.get('id', 'Unknown')
-                task_name = task.get('name', '')
-                dept_name = dept_key.replace('CLICKUP_LIST_ID_', '').replace('_', ' ').title()
-                if dept_name == "Driving Department" and '•' in task_name:
-                    host = task_name.split('•')[-1].strip()
-                elif ' - ' in task_name:
-                    host = task_name.split(' - ')[-1].strip()
-                else:
-                    host = ''
-                dt_utc = datetime.fromtimestamp(due_date/1000, tz=timezone.utc)
-                dt_local = dt_utc.astimezone(london_tz)
-                date_str = dt_local.strftime('%d/%m/%Y (%A)')
-                time_str = dt_local.strftime('%H:%M %Z')
-                unix_ts = int(dt_local.timestamp())
-                task_url = task.get('url') or f"https://app.clickup.com/t/{task_id}"
-                # --- FIX: Always loop over assignees for last-minute reminders ---
-                for email in assignees:
-                    user = user_lookup.get(email)
-                    if not user or any(user.get(field) == 'Not set' for field in ['discord_id', 'roblox_username', 'clickup_email', 'reminder_preferences']):
-                        continue
-                    if 'training' not in user.get('reminder_preferences', '').lower():
-                        await self.log_to_channel(
-                            f":gear: **[OptedOut]** {dept_name}\n\n## Task\nID: {task_id}\nDate: {date_str}\nTime: {time_str}\nAdjusted Time: <t:{unix_ts}:f> (<t:{unix_ts}:R>)\n\n## Reminder\nInterval: last-minute\nResult: 'training' not in reminder preferences. Skipping.\n\n## People\nHost:\n- {host if host else 'N/A'}\n\nAssignees:\n- " + "\n- ".join(assignees),
-                            department=dept_name
-                        )
-                        continue
-                    discord_id = user['discord_id']
-                    roblox_username = user['roblox_username']
-                    key = (discord_id, task_id)
-                    is_host = roblox_username and roblox_username == host
-                    # Only send one last-minute reminder per user per task
-                    if key in sent_last_minute_reminder:
-                        continue
-                    # Host: 30m, Co-Host: 15m
-                    if is_host:
-                        ms, embed_num, label = (30 * 60 * 1000, 4, '30m')
-                    else:
-                        ms, embed_num, label = (15 * 60 * 1000, 5, '15m')
-                    if due_date - ms <= now_ms < due_date - ms + 60000:
-                        sent_last_minute_reminder.add(key)
-                        await self.log_to_channel(
-                            f":gear: **[Send]** {dept_name}\n\n## Task\nID: {task_id}\nDate: {date_str}\nTime: {time_str}\nAdjusted Time: <t:{unix_ts}:f> (<t:{unix_ts}:R>)\n\n## Reminder\nInterval: {label}\nResult: DM will be sent.\n\n## People\nHost:\n- {host if host else 'N/A'}\n\nAssignees:\n- " + "\n- ".join(assignees),
-                            department=dept_name
-                        )
-                        await self.send_training_embed(discord_id, embed_num, task, dept_name)
-                # Handle other intervals (24h, 10h, 2h)
-                for ms, embed_num, label in intervals:
-                    if due_date - ms <= now_ms < due_date - ms + 60000:
-                        await self.log_to_channel(f"Processing reminders for interval: {label} ({dept_name})")
-                        found_user = False
-                        processed_discord_ids = set()
-                        for email in assignees:
-                            user = user_lookup.get(email)
-                            if not user or any(user.get(field) == 'not set' for field in ['discord_id', 'roblox_username', 'clickup_email', 'reminder_preferences']):
-                                continue
-                            if 'training' not in user.get('reminder_preferences', '').lower():
-                                continue
-                            discord_id = user['discord_id']
-                            if discord_id in processed_discord_ids:
-                                continue
-                            processed_discord_ids.add(discord_id)
-                            found_user = True
-                            roblox_username = user['roblox_username']
-                            await self.send_training_embed(discord_id, embed_num, task, dept_name)
-            continue  # Go to next task, do not break out of department loop
+            for task in scheduled_tasks:
+                task_id = task.get('id')
+                seen_task_ids.add(task_id)
+                jobs = self._training_jobs(task, dept_name, user_lookup, now_ms)
+                self.reminder_store.cancel_task(task_id, keep={(job.discord_id, job.label) for job in jobs})
+                # Only jobs not yet delivered come back from the store
+                self.training_schedule.set_task_jobs(task_id, self.reminder_store.schedule(jobs))
+        # A failed list keeps its previous jobs rather than dropping them
+        if complete:
+            for task_id in self.training_schedule.retain_tasks(seen_task_ids):
+                self.reminder_store.cancel_task(task_id)
+            self._opted_out_logged = {key for key in self._opted_out_logged if key[0] in seen_task_ids}
 
-    async def send_training_embed(self, discord_id, embed_num, task, department=None, rate_limit_delay=2):
-        user = self.bot.get_user(discord_id)
-        if not user:
-            try:
-                user = await self.bot.fetch_user(discord_id)
-            except Exception as e:
-                await self.log_to_channel(f"⚙️ [Error] Could not fetch user with discord_id {discord_id} for training reminder: {e}")
-                return None
+    @commands.Cog.listener()
+    async def on_clickup_task_changed(self, task_id, task):
+        """Reconcile one task's reminders as soon as a ClickUp webhook reports it changed."""
+        if not self._training_task_started:
+            return
+        now = datetime.now(pytz.UTC)
+        now_ms = int(now.timestamp() * 1000)
+        unix_25h_away = int((now + timedelta(hours=25)).timestamp() * 1000)
+        task = task or {}
+        departments = {str(list_id): dept for dept, list_id in department_list_ids().items()}
+        dept_name = departments.get(str((task.get('list') or {}).get('id', '')))
+        status = (task.get('status') or {}).get('status', '').lower()
+        due_date = int(task.get('due_date') or 0)
+        # Same window as refresh_training_reminders; anything outside it (or deleted) loses its pending jobs
+        if dept_name is None or task.get('archived') or status != 'scheduled' or not due_date or due_date >= unix_25h_away:
+            self.training_schedule.set_task_jobs(task_id, [])
+            self.reminder_store.cancel_task(task_id)
+            return
+        users = await get_user_directory().all()
+        user_lookup = {u['clickup_email']: u for u in users if u['clickup_email'] not in (None, 'Not set')}
+        jobs = self._training_jobs(task, dept_name, user_lookup, now_ms)
+        self.reminder_store.cancel_task(task_id, keep={(job.discord_id, job.label) for job in jobs})
+        self.training_schedule.set_task_jobs(task_id, self.reminder_store.schedule(jobs))
+
+    def _recover_training_reminders(self):
+        """Reload reminders scheduled before a restart; any that came due meanwhile fire right away."""
+        by_task = {}
+        for job in self.reminder_store.recover():
+            by_task.setdefault(job.task_id, []).append(job)
+        for task_id, jobs in by_task.items():
+            self.training_schedule.set_task_jobs(task_id, jobs)
+        if by_task:
+            print(f"[Reminders] Recovered {sum(len(jobs) for jobs in by_task.values())} pending training reminders")
+
+    async def _fire_training_reminder(self, job):
+        now_ms = int(datetime.now(pytz.UTC).timestamp() * 1000)
+        due_date = int(job.task.get('due_date') or 0)
+        if now_ms - job.fire_at > CATCH_UP_GRACE_MS or due_date <= now_ms:
+            print(f"[Reminders] Skipping {job.label} reminder for {job.discord_id} on task {job.task_id}: {(now_ms - job.fire_at) // 1000}s late")
+            self.reminder_store.skip(job)
+            return
+        # Preferences may have changed since the job was scheduled
+        user = await get_user_directory().get(job.discord_id)
+        if not user or 'training' not in (user.get('reminder_preferences') or '').lower():
+            self.reminder_store.skip(job)
+            return
+        # The idempotency check: whoever flips the job to delivered sends it, nobody else
+        if not self.reminder_store.claim(job):
+            return
+        dt_local = datetime.fromtimestamp(due_date / 1000, tz=timezone.utc).astimezone(pytz.timezone('Europe/London'))
+        unix_ts = int(dt_local.timestamp())
+        assignees = [a['email'] for a in job.task.get('assignees', [])]
+        self.log_to_channel(
+            f":gear: **[Send]** {job.department}\n\n## Task\nID: {job.task_id}\nDate: {dt_local.strftime('%d/%m/%Y (%A)')}\nTime: {dt_local.strftime('%H:%M %Z')}\nAdjusted Time: <t:{unix_ts}:f> (<t:{unix_ts}:R>)\n\n## Reminder\nInterval: {job.label}\nResult: DM will be sent to <@{job.discord_id}>.\n\n## People\nAssignees:\n- " + "\n- ".join(assignees),
+            department=job.department
+        )
+        await self.send_training_embed(job.discord_id, job.embed_num, job.task, job.department)
+
+    async def send_training_embed(self, discord_id, embed_num, task, department=None):
         task_name = task.get('name', '')
         # Extract host from task_name using correct separator based on department
-        connection = self.get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT roblox_username, timezone FROM users WHERE discord_id = %s", (discord_id,))
-        row = cursor.fetchone()
-        connection.close()
+        row = await get_user_directory().get(discord_id)
         roblox_username = row['roblox_username'] if row and row['roblox_username'] else ''
         user_tz = pytz.timezone(row['timezone']) if row and row['timezone'] else pytz.UTC
         # Extract host from task_name using correct separator based on department
@@ -399,43 +362,37 @@ class Reminders(commands.Cog):
         else:
             embed = discord.Embed(title="Training Reminder", description="Unknown timing (but there is a training occuring in 24 hours that you are apart of). Please contact a bot administrator", color=discord.Color.light_grey())
             view = None
-        try:
-            if view:
-                await user.send(embed=embed, view=view)
-            else:
-                await user.send(embed=embed)
-            await asyncio.sleep(rate_limit_delay)  # Add rate limit delay after sending each DM
-        except Exception as e:
-            print(f"[Reminders] Failed to DM user {discord_id}: {e}")
-            return None
+        future = self.dms.enqueue(discord_id, embed=embed, view=view, tag=task.get('id'))
+        future.add_done_callback(self._log_training_dm)
+
+    def _log_training_dm(self, future):
+        if future.cancelled():
+            self.log_to_channel("⚙️ Training reminder DM cancelled before it was sent", level=logging.DEBUG)
+            return
+        result = future.result()
+        if not result.ok:
+            self.log_to_channel(
+                f"⚙️ [Error] Could not DM user {result.discord_id} training reminder for task {result.tag}: {result.reason}",
+                level=logging.ERROR)
 
     @send_quota_reminders.before_loop
     async def before_quota_reminders(self):
-        now = datetime.now(pytz.UTC)
-        # Calculate next midnight UTC
-        next_run = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        if now >= next_run:
-            next_run += timedelta(days=1)
-        print(f"[Reminders] send_quota_reminders will start at {next_run.strftime('%Y-%m-%d %H:%M:%S UTC')}")
-        await discord.utils.sleep_until(next_run)
-        print(f"[Reminders] send_quota_reminders actually started at {datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S UTC')}")
-
-    @tasks.loop(minutes=15)
-    async def send_training_reminders(self):
-        await self._run_training_reminders_once()
+        # The loop itself waits for the next midnight; catch up first if today's run was missed
+        today = datetime.now(pytz.UTC).strftime('%Y-%m-%d')
+        if self.reminder_store.last_run('quota') != today:
+            print(f"[Reminders] Quota reminders for {today} have not run yet, running them now")
+            try:
+                await self._run_quota_reminders()
+            except Exception as e:
+                print(f"[Reminders] Catch-up quota reminders failed: {e}")
+        print(f"[Reminders] send_quota_reminders scheduled daily at 00:00 UTC")
 
-    @send_training_reminders.before_loop
-    async def before_training_reminders(self):
-        now = datetime.now(pytz.UTC)
-        # Calculate next 15-minute interval
-        minute = (now.minute // 15 + 1) * 15
-        if minute == 60:
-            next_run = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
-        else:
-            next_run = now.replace(minute=0, second=0, microsecond=0) + timedelta(minutes=minute)
-        print(f"[Reminders] send_training_reminders will start at {next_run.strftime('%Y-%m-%d %H:%M:%S UTC')}")
-        await discord.utils.sleep_until(next_run)
-        print(f"[Reminders] send_training_reminders actually started at {datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S UTC')}")
+    async def cog_unload(self):
+        self.send_quota_reminders.cancel()
+        self.refresh_training_reminders.cancel()
+        if self._training_runner:
+            self._training_runner.cancel()
+        await self.log_sink.close()
 
 async def setup(bot):
     await bot.add_cog(Reminders(bot))
\ No newline at end of file
@@ -2,7 +2,7 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from discord.ui import Modal, Button, View
-from bot.utils.helpers import get_db_connection
+from bot.utils.user_directory import get_user_directory
 import os
 
 # Add a config variable for the approval channel
@@ -34,11 +34,7 @@ class TimezoneMenuView(View):
             pending_settings_changes[user_id] = {}
         pending_settings_changes[user_id]["timezone"] = selected_timezone
         # Return to main settings embed with orange color
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM users WHERE discord_id = %s", (user_id,))
-        user_data = cursor.fetchone()
-        connection.close()
+        user_data = await get_user_directory().get(user_id)
         pending = pending_settings_changes.get(user_id, {})
         display_data = user_data.copy() if user_data else {}
         display_data.update(pending)
@@ -79,11 +75,7 @@ class DepartmentMenuView(View):
             pending_settings_changes[user_id] = {}
         pending_settings_changes[user_id][self.field] = selected_department
         # Return to main settings embed with orange color
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM users WHERE discord_id = %s", (user_id,))
-        user_data = cursor.fetchone()
-        connection.close()
+        user_data = await get_user_directory().get(user_id)
         pending = pending_settings_changes.get(user_id, {})
         display_data = user_data.copy() if user_data else {}
         display_data.update(pending)
@@ -123,11 +115,7 @@ class ReminderPreferencesMenuView(View):
             pending_settings_changes[user_id] = {}
         pending_settings_changes[user_id]["reminder_preferences"] = selected_preference
         # Return to main settings embed with orange color
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM users WHERE discord_id = %s", (user_id,))
-        user_data = cursor.fetchone()
-        connection.close()
+        user_data = await get_user_directory().get(user_id)
         pending = pending_settings_changes.get(user_id, {})
         display_data = user_data.copy() if user_data else {}
         display_data.update(pending)
@@ -204,11 +192,7 @@ class SettingsMenuView(View):
                 await interaction.response.edit_message(content="No changes to submit for approval.", view=None)
                 return True
             # Fetch current user data for 'before' embed
-            connection = get_db_connection()
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM users WHERE discord_id = %s", (user_id,))
-            before_data = cursor.fetchone()
-            connection.close()
+            before_data = await get_user_directory().get(user_id)
             # Prepare before/after embeds
             before_embed = discord.Embed(title="Settings Before", color=discord.Color.red())
             after_embed = discord.Embed(title="Settings After (Requested)", color=discord.Color.green())
@@ -249,18 +233,10 @@ class ConfirmChangeView(View):
     async def interaction_check(self, interaction: discord.Interaction):
         if interaction.data['custom_id'] == "confirm":
 
-            connection = get_db_connection()
-            cursor = connection.cursor()
-            cursor.execute(f"UPDATE users SET {self.field} = %s WHERE discord_id = %s", (self.value, interaction.user.id))
-            connection.commit()
-            connection.close()
+            await get_user_directory().update(interaction.user.id, {self.field: self.value})
 
             # Fetch updated user data
-            connection = get_db_connection()
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM users WHERE discord_id = %s", (interaction.user.id,))
-            user_data = cursor.fetchone()
-            connection.close()
+            user_data = await get_user_directory().get(interaction.user.id)
 
             # Update the main settings embed
             embed = discord.Embed(title="Settings", description="Select a setting to change:", color=discord.Color.blue())
@@ -283,10 +259,7 @@ class User(commands.Cog):
 
     @app_commands.command(name="settings", description="Configure your user information and preferences.")
     async def settings(self, interaction: discord.Interaction):
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM users WHERE discord_id = %s", (interaction.user.id,))
-        user_data = cursor.fetchone()
+        user_data = await get_user_directory().get(interaction.user.id)
 
         if not user_data:
             
@@ -298,13 +271,7 @@ class User(commands.Cog):
                 'secondary_department': 'Not set',
                 'reminder_preferences': 'Not set'
             }
-            cursor.execute(
-                "INSERT INTO users (discord_id, clickup_email, roblox_username, timezone, primary_department, secondary_department, reminder_preferences) "
-                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                (interaction.user.id, user_data['clickup_email'], user_data['roblox_username'], user_data['timezone'],
-                 user_data['primary_department'], user_data['secondary_department'], user_data['reminder_preferences'])
-            )
-            connection.commit()
+            await get_user_directory().create(interaction.user.id, user_data)
           
             try:
                 welcome_message = os.getenv('WELCOME_MESSAGE', "Error loading welcome message. Please contact the bot administrator.")
@@ -322,8 +289,6 @@ class User(commands.Cog):
             except Exception:
                 pass  
 
-        connection.close()
-
         # Use pending changes if they exist
         pending = pending_settings_changes.get(interaction.user.id, {})
         display_data = user_data.copy() if user_data else {}
@@ -352,11 +317,7 @@ class User(commands.Cog):
         pending_settings_changes[user_id][field] = value
         if return_to_settings:
             # After a change, return to settings with orange embed
-            connection = get_db_connection()
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM users WHERE discord_id = %s", (user_id,))
-            user_data = cursor.fetchone()
-            connection.close()
+            user_data = await get_user_directory().get(user_id)
             pending = pending_settings_changes.get(user_id, {})
             display_data = user_data.copy() if user_data else {}
             display_data.update(pending)
@@ -409,12 +370,7 @@ class SettingsApprovalView(View):
         user_id = self.user_id  # Ensure user_id is available for all branches
         if interaction.data['custom_id'] == "approve":
             # Write changes to DB
-            connection = get_db_connection()
-            cursor = connection.cursor()
-            for field, value in self.changes.items():
-                cursor.execute(f"UPDATE users SET {field} = %s WHERE discord_id = %s", (value, self.user_id))
-            connection.commit()
-            connection.close()
+            await get_user_directory().update(self.user_id, self.changes)
             # Remove from pending
             pending_settings_changes.pop(self.user_id, None)
             # DM user with an embed
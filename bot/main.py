@@ -1,17 +1,27 @@
 import discord
 from discord.ext import commands
 from discord import Intents
+import io
 import os
 import time
 from dotenv import load_dotenv
 import sys
 import pytz
 from datetime import datetime
-from bot.utils.db import get_db_connection
+from bot.utils import db
+from bot.utils.user_directory import get_user_directory
 from bot.utils.quotafetch import get_roblox_user_task_counts
+from bot.utils.quota_store import LeaderboardSource
 from bot.utils.roblox_users import ROBLOX_USERS
-import requests
-from bot.utils.paginator import SimplePaginator
+from bot.utils.paginator import SimplePaginator, LazyPaginator
+from bot.utils.clickup_api import get_client, ClickUpError
+from bot.utils.task_details import get_task_details_cache
+from bot.utils.ratelimit import mark_interactive
+from bot.utils.dm_dispatch import get_dm_dispatcher
+from bot.utils.broadcast import start_broadcast, resume_broadcasts
+from bot.utils.metrics import get_metrics, start_metrics_server
+from bot.utils.loop_watchdog import get_loop_watchdog
+from bot.utils.profiling import get_profiler
 
 load_dotenv()
 
@@ -22,16 +32,40 @@ intents = Intents.all()
 bot = commands.Bot(command_prefix='!', intents=intents)
 tree = bot.tree
 
+COMMAND_SECONDS = get_metrics().histogram('slash_command_seconds', 'Time from a slash command being invoked to its callback finishing or failing', ('command', 'status'))
+
 # Event: Bot is ready
 @bot.event
 async def on_ready():
     print(f'Logged in as {bot.user}')
     activity = discord.Activity(type=discord.ActivityType.watching, name=f"ClickUp 24/7")
     await bot.change_presence(status=discord.Status.online, activity=activity)
+    # Every users lookup after this is served from memory
+    try:
+        await get_user_directory().load()
+    except Exception as e:
+        print(f"Failed to preload the user directory, loading on first use: {e}")
     for filename in os.listdir('./bot/cogs'):
         if filename.endswith('.py') and filename != '__init__.py':  # Skip __init__.py
             await bot.load_extension(f'bot.cogs.{filename[:-3]}')
     print('All cogs loaded and bot is ready!')
+    get_loop_watchdog().start()
+    await start_metrics_server()
+    await resume_broadcasts(bot)
+
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    # Measured from Discord's interaction timestamp, so gateway delivery is included
+    COMMAND_SECONDS.observe((discord.utils.utcnow() - interaction.created_at).total_seconds(), command=command.qualified_name, status='ok')
+
+_default_tree_error = tree.on_error
+
+@tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: discord.app_commands.AppCommandError):
+    # Failed commands are timed too, so slow failures don't vanish from the histogram
+    command = interaction.command.qualified_name if interaction.command else 'unknown'
+    COMMAND_SECONDS.observe((discord.utils.utcnow() - interaction.created_at).total_seconds(), command=command, status='error')
+    await _default_tree_error(interaction, error)
 
 # Ensure the bot has permission to fetch user information
 @bot.event
@@ -64,10 +98,8 @@ async def ping(interaction: discord.Interaction):
     # Database connection test
     db_status = 'Unknown'
     try:
-        conn = get_db_connection()
-        conn.ping(reconnect=True, attempts=1, delay=0)
+        await db.ping()
         db_status = ':green_circle: Connected'
-        conn.close()
     except Exception:
         db_status = ':red_circle: Failed'
     # Bot profile picture
@@ -83,6 +115,12 @@ async def ping(interaction: discord.Interaction):
         embed.add_field(name="Discord Ping (Fallback)", value=f"{fallback_ping}ms", inline=True)
     embed.add_field(name="Active Shards", value=str(shard_count), inline=True)
     embed.add_field(name="Database", value=db_status, inline=True)
+    clickup_stats = get_client().scheduler.stats()
+    embed.add_field(name="ClickUp Requests", value=f"Queued: {clickup_stats['queued']} | In-flight: {clickup_stats['in_flight']} | Throttled: {clickup_stats['throttled']}", inline=True)
+    cache_stats = get_client().list_cache.stats()
+    embed.add_field(name="ClickUp List Cache", value=f"Entries: {cache_stats['entries']} ({cache_stats['bytes'] // 1024} KiB) | Hits: {cache_stats['hits']} | Shared: {cache_stats['coalesced']} | Misses: {cache_stats['misses']}", inline=True)
+    dm_stats = get_dm_dispatcher(bot).stats()
+    embed.add_field(name="DMs", value=f"Queued: {dm_stats['queued']} | Sent: {dm_stats['sent']} | Failed: {dm_stats['failed']} | {dm_stats['per_minute']}/min", inline=True)
     if bot_avatar:
         embed.set_thumbnail(url=bot_avatar)
     embed.set_footer(text=f"Activity: {activity}")
@@ -129,27 +167,9 @@ async def on_message(message):
         if not view.value:
             return
         # Fetch all users registered in the DB, but only those with all required fields set
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT discord_id, roblox_username, clickup_email, primary_department, timezone, reminder_preferences FROM users")
-        users = cursor.fetchall()
-        connection.close()
-        eligible_users = [
-            user for user in users
-            if all(user.get(field) not in (None, 'Not set') for field in [
-                'discord_id', 'roblox_username', 'clickup_email', 'primary_department', 'timezone', 'reminder_preferences']
-            )
-        ]
-        sent = 0
-        for user in eligible_users:
-            try:
-                member = await bot.fetch_user(user['discord_id'])
-                if member:
-                    await member.send(embed=embed)
-                    sent += 1
-            except Exception:
-                continue
-        await message.channel.send(f"Published to {sent} users.")
+        eligible_users = await get_user_directory().registered()
+        # Progress and the final counts are edited into one message as it goes
+        await start_broadcast(bot, message.channel, embed, [user['discord_id'] for user in eligible_users])
         return
     # >pm [user] [content]
     if content.startswith('>pm '):
@@ -163,19 +183,20 @@ async def on_message(message):
         except Exception:
             await message.channel.send('Usage: >pm [user] [content]')
             return
+        dms = get_dm_dispatcher(bot)
         try:
-            member = await bot.fetch_user(user_id)
+            member = await dms.resolve_user(user_id)
         except Exception:
             member = None
         if not member:
             await message.channel.send('User not found.')
             return
         embed = discord.Embed(title="Message from the Bot Administrator:", description=embed_content, color=discord.Color.gold())
-        try:
-            await member.send(embed=embed)
+        result = await dms.enqueue(user_id, embed=embed)
+        if result.ok:
             await message.channel.send(f"PM sent to {member.display_name if hasattr(member, 'display_name') else member.name}.")
-        except Exception:
-            await message.channel.send('Failed to send PM.')
+        else:
+            await message.channel.send(f'Failed to send PM ({result.reason}).')
         return
     # >restart
     if content.strip() == '>restart':
@@ -183,6 +204,9 @@ async def on_message(message):
             await message.channel.send('You do not have permission to use this command.')
             return
         await message.channel.send('Restarting bot process...')
+        await get_dm_dispatcher(bot).stop()
+        await get_client().close()
+        await db.close_pool()
         os.execv(sys.executable, ['python'] + sys.argv)
         return
     # >clear
@@ -209,9 +233,49 @@ async def on_message(message):
             await message.channel.send('You do not have permission to use this command.')
             return
         await message.channel.send('Shutting down bot...')
+        await get_dm_dispatcher(bot).stop()
+        await get_client().close()
+        await db.close_pool()
         await bot.close()
         os._exit(0)
         return
+    # >profile [start [sample|cprofile] | stop | mem start | mem diff [N] | mem stop | status]
+    if content.strip() == '>profile' or content.startswith('>profile '):
+        if not is_owner:
+            await message.channel.send('You do not have permission to use this command.')
+            return
+        profiler = get_profiler()
+        args = content.split()[1:]
+        try:
+            if args[:1] == ['start'] and len(args) <= 2:
+                kind = args[1] if len(args) > 1 else 'sample'
+                profiler.start(kind)
+                await message.channel.send(f"Started a {kind} profiling session. Use `>profile stop` to get the results.")
+                return
+            if args == ['stop']:
+                report = profiler.stop()
+            elif args == ['mem', 'start']:
+                profiler.memory_start()
+                await message.channel.send('Tracing allocations; `>profile mem diff` compares against this point.')
+                return
+            elif args[:2] == ['mem', 'diff'] and len(args) <= 3 and all(a.isdigit() for a in args[2:]):
+                report = profiler.memory_diff(top=int(args[2]) if len(args) > 2 else 15)
+            elif args == ['mem', 'stop']:
+                profiler.memory_stop()
+                await message.channel.send('Stopped tracing allocations.')
+                return
+            elif args in ([], ['status']):
+                await message.channel.send(profiler.status())
+                return
+            else:
+                await message.channel.send('Usage: >profile [start [sample|cprofile] | stop | mem start | mem diff [N] | mem stop | status]')
+                return
+        except (RuntimeError, ValueError) as e:
+            await message.channel.send(str(e))
+            return
+        files = [discord.File(io.BytesIO(data), filename=name) for name, data in report.files]
+        await message.channel.send(f"```\n{report.summary[:1900]}\n```", files=files)
+        return
     # >user [email|roblox_username]
     if content.startswith('>user '):
         if not is_owner:
@@ -223,17 +287,13 @@ async def on_message(message):
             await message.channel.send('Usage: >user [email|roblox_username]')
             return
         # Try to find by email first, then roblox_username
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM users WHERE clickup_email = %s OR roblox_username = %s", (query, query))
-        user = cursor.fetchone()
-        connection.close()
+        user = await get_user_directory().find(query)
         if not user:
             await message.channel.send('No user found with that email or ROBLOX username.')
             return
         roblox_username = user.get('roblox_username')
         # Get task counts for this user
-        task_counts = get_roblox_user_task_counts([roblox_username]) if roblox_username else {roblox_username: {'host': 0, 'cohost': 0, 'total': 0}}
+        task_counts = await get_roblox_user_task_counts([roblox_username]) if roblox_username else {roblox_username: {'host': 0, 'cohost': 0, 'total': 0}}
         counts = task_counts.get(roblox_username, {'host': 0, 'cohost': 0, 'total': 0})
         # Format info as embed fields similar to /settings
         embed = discord.Embed(title=f"User DB Info for `{query}`", color=discord.Color.blurple())
@@ -257,20 +317,16 @@ async def on_message(message):
         except Exception:
             await message.channel.send('Usage: >find [taskID]')
             return
-        # Fetch task from ClickUp API (with markdown)
-        headers = {"Authorization": os.getenv('CLICKUP_API_TOKEN'), "accept": "application/json"}
-        url = f"https://api.clickup.com/api/v2/task/{task_id}?include_markdown_description=true"
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            await message.channel.send(f'Failed to fetch task: {response.text}')
+        # Task, comments and history are fetched together (and cached), ahead of any background traffic
+        mark_interactive()
+        try:
+            details = await get_task_details_cache().get(task_id)
+        except ClickUpError as e:
+            await message.channel.send(f'Failed to fetch task: {e.text}')
             return
-        task = response.json()
+        task = details.task
         # Get user timezone from DB
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT timezone FROM users WHERE discord_id = %s", (message.author.id,))
-        row = cursor.fetchone()
-        connection.close()
+        row = await get_user_directory().get(message.author.id)
         user_tz = pytz.timezone(row['timezone']) if row and row['timezone'] else pytz.UTC
         # Get space info
         space_obj = task.get('space', {})
@@ -313,13 +369,10 @@ async def on_message(message):
             created_str = created_dt.strftime('%A, %B %d, %Y at %I:%M %p %Z')
         else:
             created_str = 'Unknown'
-        # Comments & activity (fetch comments)
-        comments_url = f"https://api.clickup.com/api/v2/task/{task_id}/comment"
-        comments_resp = requests.get(comments_url, headers=headers)
+        # Comments & activity
         comments = []
-        if comments_resp.status_code == 200:
-            comments_data = comments_resp.json()
-            for c in comments_data.get('comments', []):
+        if details.comments is not None:
+            for c in details.comments:
                 author = c.get('user', {}).get('username', 'Unknown')
                 text = c.get('comment_text', '')
                 created = c.get('date')
@@ -329,13 +382,10 @@ async def on_message(message):
                 else:
                     created_str_c = 'Unknown'
                 comments.append(f"**{author}** ({created_str_c}): {text}")
-        # History & events (fetch task history)
-        history_url = f"https://api.clickup.com/api/v2/task/{task_id}/history"
-        history_resp = requests.get(history_url, headers=headers)
+        # History & events
         events = []
-        if history_resp.status_code == 200:
-            history_data = history_resp.json()
-            for e in history_data.get('history', []):
+        if details.history is not None:
+            for e in details.history:
                 event_type = e.get('type', 'Unknown')
                 user = e.get('user', {}).get('username', 'Unknown')
                 date = e.get('date')
@@ -344,9 +394,9 @@ async def on_message(message):
                     event_str = event_dt.strftime('%Y-%m-%d %H:%M')
                 else:
                     event_str = 'Unknown'
-                details = e.get('field', '')
+                field = e.get('field', '')
                 value = e.get('after', '')
-                events.append(f"**{user}** [{event_type}] ({event_str}): {details} {value}")
+                events.append(f"**{user}** [{event_type}] ({event_str}): {field} {value}")
         # Build embed color based on status
         status_lower = status.lower() if status else ''
         if status_lower == 'request':
@@ -369,15 +419,20 @@ async def on_message(message):
         embed.add_field(name="Assignees", value=assignees, inline=True)
         embed.add_field(name="Due Date", value=due_str, inline=True)
         embed.add_field(name="Created", value=created_str, inline=True)
-        if comments:
-            embed.add_field(name="Comments", value='\n'.join(comments), inline=True)
-        if events:
-            embed.add_field(name="History / Events", value='\n'.join(events[:10]), inline=True)
-        embed.add_field(name="Description", value=f"```markdown\n{markdown_desc[:1900]}\n```", inline=False)
+        embed.add_field(name="Comments", value=str(len(comments)) if details.comments is not None else 'Failed to load', inline=True)
+        embed.add_field(name="History / Events", value=str(len(events)) if details.history is not None else 'Failed to load', inline=True)
+        embed.add_field(name="Description", value=f"```markdown\n{markdown_desc[:1000]}\n```", inline=False)
         await message.channel.send(embed=embed)
+        # Every comment and event, a page at a time
+        for title, lines in (("Comments", comments), ("History / Events", events)):
+            if lines:
+                paginator = SimplePaginator([line[:400] for line in lines], page_size=8, title=f"{title}: {name}"[:256],
+                                            line_builder=lambda i, item: item, color=embed_color)
+                await paginator.send(message.channel)
         return
     # >quota [optional: last | YYYY-MM | YYYY MM]
-    if content.startswith('>quota'):
+    # Matched exactly so >quotapast below isn't swallowed by it
+    if content.strip() == '>quota' or content.startswith('>quota '):
         if not is_owner:
             await message.channel.send('You do not have permission to use this command.')
             return
@@ -425,7 +480,7 @@ async def on_message(message):
 
         await message.channel.send(f'Fetching and counting hosts (username in task title) for {title_suffix}, this may take a moment...')
         roblox_users = ROBLOX_USERS
-        task_counts = get_roblox_user_task_counts(roblox_users, year=year, month=month, month_offset=month_offset)
+        task_counts = await get_roblox_user_task_counts(roblox_users, year=year, month=month, month_offset=month_offset)
         # Build list of host counts in the same order as ROBLOX_USERS
         counts = [task_counts.get(u, {}).get('host', 0) for u in roblox_users]
 
@@ -466,7 +521,6 @@ async def on_message(message):
         if not is_owner:
             await message.channel.send('You do not have permission to use this command.')
             return
-        await message.channel.send('Fetching and counting hosts (username in task title) for last month, this may take a moment...')
         roblox_users = ["12321wesee2", "Arkadexus", "AssortedBaklava", "bagg130", "Cecelia312", "colly_oz", "comfled", "DutchVossi", 
                         "EatTaco1", "emallocz", "Ethernel65", "finallybeta", "GL_TongDie", "HoustonPlayzRoblox1", "Iceboy1708", 
                         "idaaa494", "jackli0908_HKer", "Jonedaaa", "mr_fys", "newmannly", "NotOreo9", "Real_SK8R", "RB54d", 
@@ -497,20 +551,51 @@ async def on_message(message):
                         "Legocoderr", "Ferro3003", "Sillygeece", "nathdenpl", "Micro_Develops", "NowReverse", "tihouccido4", 
                         "DaBeast5766", "NoDripDynamo"
         ]
-        # Use host counts for last month
-        task_counts = get_roblox_user_task_counts(roblox_users, month_offset=-1)
-        all_sorted = sorted(((u, task_counts.get(u, {}).get('host', 0)) for u in roblox_users), key=lambda x: x[1], reverse=True)
+        # Host counts for last month, read a page at a time from the quota_monthly table
+        source = LeaderboardSource(roblox_users, month_offset=-1, column='host')
         def line_builder(i, tup):
             name, count = tup
-            # Only show medal emojis on the first page
-            if paginator.page == 0 and i < 3:
+            # Medal emojis for the top three
+            if i < 3:
                 medal_emojis = [":first_place:", ":second_place:", ":third_place:"]
                 return f"{medal_emojis[i]} **{name}** ({count})"
-            return f"{i+1 + paginator.page * paginator.page_size}. {name} ({count})"
-        paginator = SimplePaginator(all_sorted, page_size=10, title="Most Active Supervisors Last Month", line_builder=line_builder)
+            return f"{i+1}. {name} ({count})"
+        paginator = LazyPaginator(source, page_size=10, title="Most Active Supervisors Last Month", line_builder=line_builder)
         await paginator.send(message.channel)
         return
 
+    # >loopstats [reset | N]
+    if content.strip() == '>loopstats' or content.startswith('>loopstats '):
+        if not is_owner:
+            await message.channel.send('You do not have permission to use this command.')
+            return
+        watchdog = get_loop_watchdog()
+        arg = content[len('>loopstats'):].strip()
+        if arg == 'reset':
+            watchdog.reset()
+            await message.channel.send('Event-loop stall statistics cleared.')
+            return
+        offenders = watchdog.worst(10)
+        if arg:
+            # The stack captured during offender N's worst stall
+            if not arg.isdigit() or not 1 <= int(arg) <= len(offenders):
+                await message.channel.send('Usage: >loopstats [reset | N]')
+                return
+            offender = offenders[int(arg) - 1]
+            stack = ''.join(offender.stack.format()) if offender.stack else 'No stack was sampled for this stall.'
+            await message.channel.send(f"**{offender.site}** (worst {offender.worst:.3f}s)\n```\n{stack[-1800:]}\n```")
+            return
+        since = f"<t:{int(watchdog.started_at)}:R>" if watchdog.started_at else 'never (watchdog not running)'
+        header = f"Event-loop stalls over {watchdog.threshold:.2f}s since {since}: {watchdog.stalls} (max lag {watchdog.max_lag:.3f}s)"
+        if not offenders:
+            await message.channel.send(header)
+            return
+        rows = [f"{'#':>2} {'total':>8} {'worst':>7} {'count':>6}  site"]
+        for i, offender in enumerate(offenders, start=1):
+            rows.append(f"{i:>2} {offender.total:>7.2f}s {offender.worst:>6.2f}s {offender.count:>6}  {offender.site[:120]}")
+        await message.channel.send(f"{header}\n```\n" + '\n'.join(rows) + "\n```\nUse `>loopstats N` for a captured stack.")
+        return
+
     await bot.process_commands(message)
 
 # Run the bot
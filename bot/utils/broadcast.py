@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+import discord
+from bot.utils.dm_dispatch import get_dm_dispatcher
+
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+# Recipients being delivered at once; the rest of the DM queue (reminders) keeps moving meanwhile
+BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', '4'))
+
+# Seconds between edits of the progress message
+PROGRESS_INTERVAL = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    embed TEXT NOT NULL,
+    channel_id INTEGER,
+    message_id INTEGER,
+    created_at INTEGER NOT NULL,
+    finished_at INTEGER
+);
+CREATE TABLE IF NOT EXISTS broadcast_recipients (
+    broadcast_id INTEGER NOT NULL,
+    discord_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    reason TEXT,
+    PRIMARY KEY (broadcast_id, discord_id)
+);
+"""
+
+
+class BroadcastStore:
+    """
+    SQLite record of each broadcast and where every recipient stands.
+
+    A recipient is marked `sending` before its DM is queued, so after a restart it is
+    reported rather than sent again: a resumed broadcast never DMs anyone twice.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv('BROADCAST_STORE_PATH', 'broadcasts.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+
+    def create(self, embed: discord.Embed, discord_ids) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO broadcasts (embed, created_at) VALUES (?, ?)", (json.dumps(embed.to_dict()), int(time.time())))
+            broadcast_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO broadcast_recipients (broadcast_id, discord_id, status) VALUES (?, ?, ?)",
+                [(broadcast_id, discord_id, PENDING) for discord_id in discord_ids]
+            )
+            self._conn.commit()
+        return broadcast_id
+
+    def set_message(self, broadcast_id: int, channel_id: int, message_id: int):
+        with self._lock:
+            self._conn.execute("UPDATE broadcasts SET channel_id = ?, message_id = ? WHERE id = ?", (channel_id, message_id, broadcast_id))
+            self._conn.commit()
+
+    def unfinished(self) -> list:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute("SELECT * FROM broadcasts WHERE finished_at IS NULL ORDER BY id")]
+
+    def pending(self, broadcast_id: int) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT discord_id FROM broadcast_recipients WHERE broadcast_id = ? AND status = ?", (broadcast_id, PENDING)).fetchall()
+        return [row['discord_id'] for row in rows]
+
+    def counts(self, broadcast_id: int) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM broadcast_recipients WHERE broadcast_id = ? GROUP BY status", (broadcast_id,)).fetchall()
+        counts = dict.fromkeys((PENDING, SENDING, SENT, FAILED), 0)
+        counts.update({row['status']: row['n'] for row in rows})
+        return counts
+
+    def set_status(self, broadcast_id: int, discord_id: int, status: str, reason: str = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE broadcast_recipients SET status = ?, reason = ? WHERE broadcast_id = ? AND discord_id = ?",
+                (status, reason, broadcast_id, discord_id))
+            self._conn.commit()
+
+    def finish(self, broadcast_id: int):
+        with self._lock:
+            self._conn.execute("UPDATE broadcasts SET finished_at = ? WHERE id = ?", (int(time.time()), broadcast_id))
+            self._conn.commit()
+
+
+_store = None
+
+# Ids of broadcasts being delivered by this process, so a reconnect doesn't resume them twice
+_running = set()
+
+# Resumed deliveries run in the background; holding them here keeps them from being garbage collected
+_resumed_tasks = set()
+
+
+def get_broadcast_store() -> BroadcastStore:
+    """Return the process-wide broadcast store."""
+    global _store
+    if _store is None:
+        _store = BroadcastStore()
+    return _store
+
+
+class Broadcast:
+    """
+    One publication being delivered: at most `concurrency` recipients at a time through the
+    shared DM dispatcher, with a single progress message edited as it goes.
+    """
+
+    def __init__(self, bot, broadcast_id: int, embed: discord.Embed, progress_message=None,
+                 concurrency: int = BROADCAST_CONCURRENCY):
+        self.bot = bot
+        self.id = broadcast_id
+        self.embed = embed
+        self.progress_message = progress_message
+        self.concurrency = concurrency
+        self.store = get_broadcast_store()
+        self.failures = {}
+        self._started = None
+        self._sent_this_run = 0
+
+    def progress_text(self, done: bool = False) -> str:
+        counts = self.store.counts(self.id)
+        elapsed = time.monotonic() - self._started if self._started else 0
+        rate = self._sent_this_run / elapsed * 60 if elapsed > 0 else 0
+        text = (f"{'Published' if done else 'Publishing'}: {counts[SENT]} sent | {counts[FAILED]} failed | "
+                f"{counts[PENDING]} remaining | {rate:.0f}/min")
+        if counts[SENDING]:
+            text += f" | {counts[SENDING]} interrupted by a restart (not resent)"
+        if done and self.failures:
+            text += "\nFailures: " + ", ".join(f"{reason} ×{n}" for reason, n in sorted(self.failures.items()))
+        return text
+
+    async def _update_progress(self, done: bool = False):
+        if self.progress_message is None:
+            return
+        try:
+            await self.progress_message.edit(content=self.progress_text(done))
+        except discord.HTTPException as e:
+            print(f"[Broadcast] Could not update progress for broadcast {self.id}: {e}")
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            await self._update_progress()
+
+    async def _deliver(self, dms, semaphore, discord_id):
+        async with semaphore:
+            self.store.set_status(self.id, discord_id, SENDING)
+            result = await dms.enqueue(discord_id, embed=self.embed, tag=self.id)
+            if result.ok:
+                self._sent_this_run += 1
+                self.store.set_status(self.id, discord_id, SENT)
+            else:
+                self.failures[result.reason] = self.failures.get(result.reason, 0) + 1
+                self.store.set_status(self.id, discord_id, FAILED, result.reason)
+
+    async def run(self) -> dict:
+        """Deliver to every pending recipient and return the final status counts."""
+        _running.add(self.id)
+        dms = get_dm_dispatcher(self.bot)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        self._started = time.monotonic()
+        reporter = asyncio.create_task(self._report_progress())
+        try:
+            await asyncio.gather(*(self._deliver(dms, semaphore, discord_id) for discord_id in self.store.pending(self.id)))
+        finally:
+            _running.discard(self.id)
+            reporter.cancel()
+            await asyncio.gather(reporter, return_exceptions=True)
+        self.store.finish(self.id)
+        await self._update_progress(done=True)
+        return self.store.counts(self.id)
+
+
+async def start_broadcast(bot, channel, embed: discord.Embed, discord_ids) -> dict:
+    """Record a new broadcast, post its progress message in `channel` and deliver it."""
+    store = get_broadcast_store()
+    broadcast_id = store.create(embed, discord_ids)
+    progress_message = await channel.send(f"Publishing to {len(discord_ids)} users...")
+    store.set_message(broadcast_id, channel.id, progress_message.id)
+    return await Broadcast(bot, broadcast_id, embed, progress_message).run()
+
+
+async def resume_broadcasts(bot):
+    """Carry on with broadcasts a restart interrupted, editing their original progress messages."""
+    for row in get_broadcast_store().unfinished():
+        if row['id'] in _running:
+            continue
+        progress_message = None
+        channel = bot.get_channel(row['channel_id']) if row['channel_id'] else None
+        if channel is not None:
+            try:
+                progress_message = await channel.fetch_message(row['message_id'])
+            except discord.HTTPException:
+                progress_message = None
+        embed = discord.Embed.from_dict(json.loads(row['embed']))
+        print(f"[Broadcast] Resuming broadcast {row['id']}")
+        task = asyncio.create_task(Broadcast(bot, row['id'], embed, progress_message).run(), name=f"broadcast-{row['id']}")
+        _resumed_tasks.add(task)
+        task.add_done_callback(_resumed_done)
+
+
+def _resumed_done(task):
+    _resumed_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[Broadcast] Resumed {task.get_name()} failed: {task.exception()!r}")
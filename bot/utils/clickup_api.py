@@ -0,0 +1,191 @@
+import os
+import time
+import json as jsonlib
+from bot.utils.ratelimit import RequestScheduler
+from bot.utils.request_cache import SingleFlightCache
+from bot.utils.clickup_transport import transport_from_env
+from bot.utils.metrics import get_metrics, QUEUE_DEPTH
+
+DEFAULT_API_URL = 'https://api.clickup.com/api/v2'
+
+# Path segments followed by an id; the id is replaced by a placeholder in the endpoint label
+ID_SEGMENTS = {'list', 'task', 'team', 'taskTemplate', 'folder', 'space', 'webhook'}
+
+REQUEST_SECONDS = get_metrics().histogram(
+    'clickup_request_seconds', 'ClickUp API request latency per attempt', ('method', 'endpoint', 'status'))
+
+
+def endpoint_template(path: str) -> str:
+    """`list/901/task` -> `list/{id}/task`, so latency is grouped per endpoint rather than per object."""
+    segments = path.strip('/').split('/')
+    return '/'.join('{id}' if i and segments[i - 1] in ID_SEGMENTS else segment for i, segment in enumerate(segments))
+
+
+def is_last_page(data: dict, tasks: list) -> bool:
+    """Whether a list-task response is the final page of its query."""
+    if not tasks or data.get('last_page', False):
+        return True
+    # Prefer the explicit last_page flag, fall back to a short page when ClickUp reports a limit
+    limit = data.get('limit')
+    return bool(limit and len(tasks) < limit)
+
+
+class ClickUpError(Exception):
+    """Raised when ClickUp answers with anything other than a 200."""
+
+    def __init__(self, status: int, text: str, url: str = None):
+        super().__init__(f"ClickUp API request failed ({status}): {text}")
+        self.status = status
+        self.text = text
+        self.url = url
+
+
+class ClickUpClient:
+    """
+    Async ClickUp API client; requests go out through a pluggable transport, by default a
+    single pooled keep-alive aiohttp session.
+
+    Every cog and util should go through `get_client()` rather than building its own
+    headers and calling `requests`, so that no HTTP round trip blocks the event loop.
+    """
+
+    def __init__(self, token: str = None, base_url: str = None, max_connections: int = 20, scheduler: RequestScheduler = None,
+                 transport=None):
+        self.token = token or os.getenv('CLICKUP_API_TOKEN')
+        # Read lazily so values from .env are picked up even if this module is imported first
+        self.base_url = (base_url or os.getenv('CLICKUP_API_URL', DEFAULT_API_URL)).rstrip('/')
+        self.max_connections = max_connections
+        # Every request is admitted by the scheduler, which tracks ClickUp's per-token rate limit
+        self.scheduler = scheduler or RequestScheduler(
+            limit=int(os.getenv('CLICKUP_RATE_LIMIT', '100')),
+            max_in_flight=max_connections
+        )
+        # List-task pages: identical concurrent queries share one request, results live briefly
+        self.list_cache = SingleFlightCache(
+            ttl=float(os.getenv('CLICKUP_LIST_CACHE_TTL', '30')),
+            max_bytes=int(os.getenv('CLICKUP_LIST_CACHE_MB', '32')) * 1024 * 1024
+        )
+        # Live HTTP by default; a cassette recorder or player when CLICKUP_CASSETTE is set
+        self.transport = transport or transport_from_env(self._headers(), max_connections)
+        QUEUE_DEPTH.set_function(lambda: self.scheduler.queued, queue='clickup_requests')
+
+    def _headers(self):
+        return {
+            "Authorization": self.token or '',
+            "accept": "application/json"
+        }
+
+    async def close(self):
+        await self.transport.close()
+
+    async def request_text(self, method: str, path: str, params=None, json=None) -> str:
+        """
+        Send a request to `path` (relative to the API root) and return the raw response body.
+
+        Goes through the rate-limit scheduler, so 429s and 5xx answers are retried before a
+        ClickUpError is raised. Priority comes from `ratelimit.interactive()`.
+        """
+        path = path.lstrip('/')
+        endpoint = endpoint_template(path)
+
+        async def send():
+            start = time.perf_counter()
+            status = 'error'
+            try:
+                response = await self.transport.send(method, self.base_url, path, params=params, json=json)
+                status = response[0]
+                return response
+            finally:
+                REQUEST_SECONDS.observe(time.perf_counter() - start, method=method, endpoint=endpoint, status=status)
+
+        status, _, body = await self.scheduler.run(send)
+        if status != 200:
+            raise ClickUpError(status, body, f"{self.base_url}/{path}")
+        return body
+
+    async def request(self, method: str, path: str, params=None, json=None) -> dict:
+        """Like `request_text`, returning the decoded JSON body. Writes drop the cached list pages."""
+        body = await self.request_text(method, path, params=params, json=json)
+        if method != 'GET':
+            self.list_cache.clear()
+        return jsonlib.loads(body) if body else {}
+
+    # --- Lists ---
+
+    async def get_list_tasks_page(self, list_id, page: int = 0, archived: bool = False, statuses=None,
+                                  include_closed: bool = False, due_date_gt: int = None, due_date_lt: int = None,
+                                  extra_params=None) -> dict:
+        params = [('archived', 'true' if archived else 'false'), ('page', str(page))]
+        for status in statuses or []:
+            params.append(('statuses[]', status))
+        if include_closed:
+            params.append(('include_closed', 'true'))
+        if due_date_gt is not None:
+            params.append(('due_date_gt', str(due_date_gt)))
+        if due_date_lt is not None:
+            params.append(('due_date_lt', str(due_date_lt)))
+        params.extend(extra_params or [])
+        path = f"list/{list_id}/task"
+        body = await self.list_cache.get(
+            (str(list_id), tuple(sorted(params))),
+            lambda: self.request_text('GET', path, params=params)
+        )
+        return jsonlib.loads(body) if body else {}
+
+    async def iter_list_tasks(self, list_id, max_pages: int = 1000, **filters):
+        """
+        Yield `(page, tasks)` for every page of a list's task query until ClickUp reports the last page.
+
+        Accepts the same filters as `get_list_tasks_page`. Raises ClickUpError if a page fails,
+        so callers decide whether a partial result is acceptable.
+        """
+        page = 0
+        while True:
+            data = await self.get_list_tasks_page(list_id, page=page, **filters)
+            tasks = data.get('tasks', [])
+            if not tasks:
+                break
+            yield page, tasks
+            if is_last_page(data, tasks):
+                break
+            page += 1
+            if page >= max_pages:
+                print(f"Reached max page limit ({max_pages}) for list {list_id}; stopping pagination")
+                break
+
+    # --- Tasks ---
+
+    async def get_task(self, task_id, include_markdown: bool = False) -> dict:
+        params = {'include_markdown_description': 'true'} if include_markdown else None
+        return await self.request('GET', f"task/{task_id}", params=params)
+
+    async def update_task(self, task_id, payload: dict) -> dict:
+        return await self.request('PUT', f"task/{task_id}", json=payload)
+
+    async def create_task_from_template(self, list_id, template_id, name: str) -> dict:
+        return await self.request('POST', f"list/{list_id}/taskTemplate/{template_id}", json={"name": name})
+
+    async def get_task_comments(self, task_id) -> list:
+        data = await self.request('GET', f"task/{task_id}/comment")
+        return data.get('comments', [])
+
+    async def get_task_history(self, task_id) -> list:
+        data = await self.request('GET', f"task/{task_id}/history")
+        return data.get('history', [])
+
+    # --- Workspace ---
+
+    async def get_team_users(self, workspace_id) -> list:
+        data = await self.request('GET', f"team/{workspace_id}/user")
+        return data.get('users', [])
+
+
+_client = None
+
+
+def get_client() -> ClickUpClient:
+    """Return the process-wide ClickUp client."""
+    global _client
+    if _client is None:
+        _client = ClickUpClient()
+    return _client
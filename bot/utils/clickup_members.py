@@ -0,0 +1,72 @@
+import os
+import time
+import asyncio
+from typing import Optional
+from bot.utils.clickup_api import get_client, ClickUpError
+
+# Members rarely change; a miss for a known email also triggers an early refresh (at most once a minute)
+REFRESH_AFTER_SECONDS = int(os.getenv('CLICKUP_MEMBERS_REFRESH_MINUTES', '360')) * 60
+MISS_REFRESH_SECONDS = 60
+
+
+class WorkspaceMembers:
+    """
+    Cached map of ClickUp email -> ClickUp user id for the workspace in CLICKUP_WORKSPACE_ID.
+
+    Loaded from `/team/{id}/user` on first use and refreshed every REFRESH_AFTER_SECONDS, so
+    /create and /check no longer fetch the member list on every invocation. Emails are
+    matched case-insensitively.
+    """
+
+    def __init__(self, workspace_id: str = None):
+        self.workspace_id = workspace_id or os.getenv('CLICKUP_WORKSPACE_ID')
+        self._ids = {}
+        self._loaded_at = None
+        self._lock = asyncio.Lock()
+
+    async def load(self, client=None):
+        users = await (client or get_client()).get_team_users(self.workspace_id)
+        ids = {}
+        for user in users:
+            # Entries are either the user itself or {'user': {...}} depending on the endpoint version
+            user = user.get('user', user)
+            if user.get('email') and user.get('id') is not None:
+                ids[user['email'].casefold()] = user['id']
+        self._ids = ids
+        self._loaded_at = time.monotonic()
+
+    def _age(self) -> float:
+        return float('inf') if self._loaded_at is None else time.monotonic() - self._loaded_at
+
+    async def _refresh(self, older_than: float):
+        async with self._lock:
+            # Another caller may have refreshed while we waited for the lock
+            if self._age() >= older_than:
+                await self.load()
+
+    async def user_id(self, email: str) -> Optional[int]:
+        """The ClickUp user id for `email`, or None if it isn't a workspace member (or the lookup failed)."""
+        if not self.workspace_id or not email:
+            return None
+        try:
+            await self._refresh(REFRESH_AFTER_SECONDS)
+            user_id = self._ids.get(email.casefold())
+            if user_id is None:
+                # Possibly someone who joined since the last load
+                await self._refresh(MISS_REFRESH_SECONDS)
+                user_id = self._ids.get(email.casefold())
+        except ClickUpError as e:
+            print(f"[ClickUpMembers] Could not load workspace members: {e}")
+            return self._ids.get(email.casefold())
+        return user_id
+
+
+_members = None
+
+
+def get_workspace_members() -> WorkspaceMembers:
+    """Return the process-wide workspace member map."""
+    global _members
+    if _members is None:
+        _members = WorkspaceMembers()
+    return _members
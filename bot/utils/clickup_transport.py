@@ -0,0 +1,150 @@
+import os
+import gzip
+import json as jsonlib
+import time
+import asyncio
+from collections import defaultdict, deque
+import aiohttp
+
+# Response headers worth keeping in a cassette (the rate limiter reads the X-RateLimit ones)
+RECORDED_HEADERS = ('Content-Type', 'X-RateLimit-Limit', 'X-RateLimit-Remaining', 'X-RateLimit-Reset', 'Retry-After')
+
+
+class AiohttpTransport:
+    """Sends requests over one pooled keep-alive aiohttp session; what ClickUpClient uses by default."""
+
+    def __init__(self, headers: dict, max_connections: int = 20):
+        self.headers = headers
+        self.max_connections = max_connections
+        self._session = None
+
+    async def session(self) -> aiohttp.ClientSession:
+        # The session has to be created inside a running loop, so build it lazily
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=60)
+            )
+        return self._session
+
+    async def send(self, method: str, base_url: str, path: str, params=None, json=None):
+        """Return (status, headers, body) for one request."""
+        session = await self.session()
+        async with session.request(method, f"{base_url}/{path}", params=params, json=json) as response:
+            return response.status, response.headers, await response.text()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# Query parameters computed from the current time; a replay that misses on them falls back to
+# matching the request with their values ignored
+TIME_PARAMS = ('due_date_gt', 'due_date_lt', 'date_updated_gt')
+
+
+def request_key(method: str, path: str, params=None, json=None, ignore=()) -> str:
+    """Identity of a request in a cassette: method, path, sorted query and JSON body (no host, no credentials)."""
+    if isinstance(params, dict):
+        params = list(params.items())
+    query = sorted((str(k), '' if k in ignore else str(v)) for k, v in (params or []))
+    return jsonlib.dumps([method.upper(), path.lstrip('/'), query, json], sort_keys=True)
+
+
+class RecordingTransport:
+    """
+    Passes requests through to `inner` and writes each exchange to a gzipped JSON-lines cassette.
+
+    Entries hold the request key, status, the RECORDED_HEADERS of the response, the body and
+    how long the real request took. Request headers (the API token) are never written.
+    """
+
+    def __init__(self, inner, path: str):
+        self.inner = inner
+        self.path = path
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+
+    async def send(self, method: str, base_url: str, path: str, params=None, json=None):
+        start = time.perf_counter()
+        status, headers, body = await self.inner.send(method, base_url, path, params=params, json=json)
+        entry = {
+            'key': request_key(method, path, params, json),
+            'loose_key': request_key(method, path, params, json, ignore=TIME_PARAMS),
+            'status': status,
+            'headers': {name: headers[name] for name in RECORDED_HEADERS if name in headers},
+            'body': body,
+            'elapsed': round(time.perf_counter() - start, 4),
+        }
+        self._file.write(jsonlib.dumps(entry) + '\n')
+        return status, headers, body
+
+    async def close(self):
+        self._file.close()
+        await self.inner.close()
+
+
+class ReplayTransport:
+    """
+    Serves the exchanges of a cassette back without a network.
+
+    Identical requests are answered in the order they were recorded, the last answer repeating
+    once they run out. Requests differing only in TIME_PARAMS values (a replay on another day)
+    are answered from the same recording. `latency` is a fixed delay in seconds per request, or 'recorded' to
+    sleep as long as the original request took (times `scale`). A request that isn't in the
+    cassette gets a 404 naming it, which surfaces as a ClickUpError.
+    """
+
+    def __init__(self, path: str, latency='recorded', scale: float = 1.0):
+        self.path = path
+        self.latency = latency
+        self.scale = scale
+        self.served = 0
+        self.misses = 0
+        self._responses = defaultdict(deque)
+        self._loose = defaultdict(deque)
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = jsonlib.loads(line)
+                    self._responses[entry['key']].append(entry)
+                    self._loose[entry['loose_key']].append(entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._responses.values())
+
+    async def send(self, method: str, base_url: str, path: str, params=None, json=None):
+        key = request_key(method, path, params, json)
+        entries = self._responses.get(key) or self._loose.get(request_key(method, path, params, json, ignore=TIME_PARAMS))
+        if not entries:
+            self.misses += 1
+            return 404, {}, jsonlib.dumps({'err': f"Not in cassette: {key}", 'ECODE': 'CASSETTE_MISS'})
+        entry = entries.popleft() if len(entries) > 1 else entries[0]
+        self.served += 1
+        delay = entry.get('elapsed', 0) * self.scale if self.latency == 'recorded' else float(self.latency)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return entry['status'], entry['headers'], entry['body']
+
+    async def close(self):
+        pass
+
+
+def transport_from_env(headers: dict, max_connections: int = 20):
+    """
+    The transport selected by CLICKUP_CASSETTE / CLICKUP_CASSETTE_MODE ('record' or 'replay').
+
+    Replay latency comes from CLICKUP_REPLAY_LATENCY: seconds per request, or 'recorded' (the default).
+    """
+    live = AiohttpTransport(headers, max_connections)
+    cassette = os.getenv('CLICKUP_CASSETTE')
+    mode = os.getenv('CLICKUP_CASSETTE_MODE', 'replay' if cassette else '')
+    if not cassette or not mode:
+        return live
+    if mode == 'record':
+        return RecordingTransport(live, cassette)
+    if mode == 'replay':
+        return ReplayTransport(cassette, latency=os.getenv('CLICKUP_REPLAY_LATENCY', 'recorded'))
+    raise ValueError(f"Unknown CLICKUP_CASSETTE_MODE: {mode}")
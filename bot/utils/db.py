@@ -1,36 +1,141 @@
-import mariadb
 import os
+import asyncio
+from typing import Optional, TypedDict
+import aiomysql
+from bot.utils.metrics import get_metrics
 
-DB_HOST = os.getenv('DB_HOST')
-DB_USER = os.getenv('DB_USER')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_NAME = os.getenv('DB_NAME')
-
-def get_db_connection():
-    return mariadb.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME
-    )
-
-def fetch_all_users():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM users")
-    users = cursor.fetchall()
-    conn.close()
-    return users
-
-def fetch_valid_users():
-    users = fetch_all_users()
-    return [u for u in users if all(u.get(field) not in (None, 'Not set') for field in [
-        'roblox_username', 'discord_id', 'clickup_email', 'primary_department', 'timezone', 'reminder_preferences'])]
-
-def fetch_user_by_query(query):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM users WHERE clickup_email = %s OR roblox_username = %s", (query, query))
-    user = cursor.fetchone()
-    conn.close()
-    return user
+# Columns of `users` a user can change through /settings (and therefore the only ones written by name)
+USER_FIELDS = (
+    'clickup_email',
+    'roblox_username',
+    'timezone',
+    'primary_department',
+    'secondary_department',
+    'reminder_preferences',
+)
+
+# Fields that must be set before a user counts as registered
+REQUIRED_FIELDS = ('roblox_username', 'discord_id', 'clickup_email', 'primary_department', 'timezone', 'reminder_preferences')
+
+
+class UserRow(TypedDict, total=False):
+    discord_id: int
+    clickup_email: str
+    roblox_username: str
+    timezone: str
+    primary_department: str
+    secondary_department: str
+    reminder_preferences: str
+
+
+QUERY_SECONDS = get_metrics().histogram('db_query_seconds', 'Database query latency, pool wait included', ('operation',))
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_pool() -> aiomysql.Pool:
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await aiomysql.create_pool(
+                host=os.getenv('DB_HOST'),
+                port=int(os.getenv('DB_PORT', '3306')),
+                user=os.getenv('DB_USER'),
+                password=os.getenv('DB_PASSWORD'),
+                db=os.getenv('DB_NAME'),
+                minsize=1,
+                maxsize=int(os.getenv('DB_POOL_SIZE', '5')),
+                autocommit=True,
+                # Recycle before MariaDB's wait_timeout drops idle connections
+                pool_recycle=3600,
+                cursorclass=aiomysql.DictCursor
+            )
+        return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+async def fetchall(sql: str, params=None) -> list:
+    with QUERY_SECONDS.time(operation='fetchall'):
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                return list(await cursor.fetchall())
+
+
+async def fetchone(sql: str, params=None) -> Optional[dict]:
+    with QUERY_SECONDS.time(operation='fetchone'):
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                return await cursor.fetchone()
+
+
+async def execute(sql: str, params=None) -> int:
+    """Run a statement and return the number of affected rows."""
+    with QUERY_SECONDS.time(operation='execute'):
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                return await cursor.execute(sql, params)
+
+
+async def ping() -> bool:
+    """Whether a pooled connection answers; used by /ping."""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await conn.ping(reconnect=True)
+    return True
+
+
+# --- users ---
+
+def is_registered(user: UserRow) -> bool:
+    return all(user.get(field) not in (None, 'Not set') for field in REQUIRED_FIELDS)
+
+
+async def fetch_all_users() -> list[UserRow]:
+    return await fetchall("SELECT * FROM users")
+
+
+async def fetch_valid_users() -> list[UserRow]:
+    return [u for u in await fetch_all_users() if is_registered(u)]
+
+
+async def fetch_user(discord_id: int) -> Optional[UserRow]:
+    return await fetchone("SELECT * FROM users WHERE discord_id = %s", (discord_id,))
+
+
+async def fetch_user_by_query(query: str) -> Optional[UserRow]:
+    """Look a user up by ClickUp email or ROBLOX username."""
+    return await fetchone("SELECT * FROM users WHERE clickup_email = %s OR roblox_username = %s", (query, query))
+
+
+async def create_user(discord_id: int, fields: UserRow) -> UserRow:
+    """Insert a new user row with the given settings and return it."""
+    fields = {field: fields[field] for field in USER_FIELDS if field in fields}
+    columns = ', '.join(('discord_id',) + tuple(fields))
+    placeholders = ', '.join('%s' for _ in range(len(fields) + 1))
+    await execute(f"INSERT INTO users ({columns}) VALUES ({placeholders})", (discord_id, *fields.values()))
+    return UserRow(discord_id=discord_id, **fields)
+
+
+async def update_user(discord_id: int, changes: dict) -> int:
+    """Apply {field: value} settings changes to one user. Only USER_FIELDS may be written."""
+    unknown = set(changes) - set(USER_FIELDS)
+    if unknown:
+        raise ValueError(f"Not a user setting: {', '.join(sorted(unknown))}")
+    if not changes:
+        return 0
+    assignments = ', '.join(f"{field} = %s" for field in changes)
+    return await execute(f"UPDATE users SET {assignments} WHERE discord_id = %s", (*changes.values(), discord_id))
@@ -0,0 +1,141 @@
+import time
+import asyncio
+from collections import namedtuple, Counter, deque
+import discord
+from bot.utils.metrics import get_metrics, QUEUE_DEPTH
+
+# Outcome of one queued DM; `reason` is None on success
+DMResult = namedtuple('DMResult', ['discord_id', 'ok', 'reason', 'tag'])
+
+# Seconds of history the throughput figure is computed over
+RATE_WINDOW = 60
+
+SEND_SECONDS = get_metrics().histogram('dm_send_seconds', 'Time to resolve a user and deliver one DM', ('outcome',))
+
+
+def _reason(error: Exception) -> str:
+    if isinstance(error, discord.Forbidden):
+        return 'dms_closed'
+    if isinstance(error, discord.NotFound):
+        return 'not_found'
+    if isinstance(error, discord.HTTPException):
+        return f'http_{error.status}'
+    return type(error).__name__
+
+
+class DMDispatcher:
+    """
+    Outbound DM queue drained by a small pool of workers.
+
+    Pacing is left to discord.py, which already holds each request until its route's
+    rate-limit bucket (and the global limit) allows it, so workers never sleep on a
+    fixed delay. Resolved `User` objects are cached, and each recipient's last outcome
+    is kept (e.g. 'dms_closed') along with overall counters and a one-minute send rate.
+    """
+
+    def __init__(self, bot, workers: int = 4):
+        self.bot = bot
+        self.workers = workers
+        self._queue = asyncio.Queue()
+        self._tasks = []
+        self._users = {}
+        # discord_id -> (unix time, ok, reason) of the latest attempt
+        self.outcomes = {}
+        self.sent = 0
+        self.failed = 0
+        self.fetched = 0
+        self.failures = Counter()
+        self._recent = deque()
+        QUEUE_DEPTH.set_function(self._queue.qsize, queue='dms')
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, discord_id: int, content: str = None, embed: discord.Embed = None,
+                view: discord.ui.View = None, tag=None) -> asyncio.Future:
+        """Queue a DM and return a future resolving to its DMResult; it never raises."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((discord_id, content, embed, view, tag, future))
+        return future
+
+    async def join(self):
+        """Wait until every queued DM has been attempted."""
+        await self._queue.join()
+
+    async def resolve_user(self, discord_id: int):
+        """The cached user or guild member; the REST API is only asked on a cache miss."""
+        user = self._users.get(discord_id) or self.bot.get_user(discord_id)
+        if user is None:
+            user = await self.bot.fetch_user(discord_id)
+            self.fetched += 1
+        self._users[discord_id] = user
+        return user
+
+    async def _deliver(self, discord_id, content, embed, view):
+        user = await self.resolve_user(discord_id)
+        kwargs = {'content': content, 'embed': embed}
+        if view is not None:
+            kwargs['view'] = view
+        await user.send(**kwargs)
+
+    async def _work(self):
+        while True:
+            discord_id, content, embed, view, tag, future = await self._queue.get()
+            start = time.perf_counter()
+            try:
+                await self._deliver(discord_id, content, embed, view)
+                result = DMResult(discord_id, True, None, tag)
+                self.sent += 1
+                self._recent.append(time.monotonic())
+                SEND_SECONDS.observe(time.perf_counter() - start, outcome='sent')
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result = DMResult(discord_id, False, _reason(e), tag)
+                SEND_SECONDS.observe(time.perf_counter() - start, outcome=result.reason)
+                self.failed += 1
+                self.failures[result.reason] += 1
+                print(f"[DMs] Failed to DM user {discord_id}: {e}")
+            finally:
+                self._queue.task_done()
+            self.outcomes[discord_id] = (int(time.time()), result.ok, result.reason)
+            if not future.done():
+                future.set_result(result)
+
+    def rate(self) -> float:
+        """DMs delivered per second over the last RATE_WINDOW seconds."""
+        cutoff = time.monotonic() - RATE_WINDOW
+        while self._recent and self._recent[0] < cutoff:
+            self._recent.popleft()
+        return len(self._recent) / RATE_WINDOW
+
+    def stats(self) -> dict:
+        return {
+            'queued': self._queue.qsize(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'failures': dict(self.failures),
+            'fetched': self.fetched,
+            'per_minute': round(self.rate() * 60, 1),
+        }
+
+
+_dispatcher = None
+
+
+def get_dm_dispatcher(bot=None) -> DMDispatcher:
+    """Return the process-wide DM dispatcher; the first call must pass the bot."""
+    global _dispatcher
+    if _dispatcher is None:
+        if bot is None:
+            raise RuntimeError("The DM dispatcher has not been created yet")
+        _dispatcher = DMDispatcher(bot)
+    return _dispatcher
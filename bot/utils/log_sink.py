@@ -0,0 +1,154 @@
+import io
+import os
+import time
+import asyncio
+import logging
+from logging.handlers import RotatingFileHandler
+import discord
+from bot.utils.metrics import QUEUE_DEPTH
+
+# Discord's limit on a message's content
+MESSAGE_LIMIT = 2000
+
+# Flush when this many entries are waiting, even before the timer
+FLUSH_ENTRIES = 50
+
+# Above this many messages' worth of text, one flush becomes a single .log attachment
+ATTACH_AFTER_MESSAGES = 3
+
+DEPARTMENT_EMOJI = (
+    ('driving', '\U0001F534'),  # Red circle
+    ('dispatch', '\U0001F7E0'),  # Orange circle
+    ('guard', '\U0001F7E1'),  # Yellow circle
+    ('signal', '\U0001F7E2'),  # Green circle
+)
+
+
+def _department_emoji(department) -> str:
+    dept = (department or '').lower()
+    for needle, emoji in DEPARTMENT_EMOJI:
+        if needle in dept:
+            return emoji
+    return ''
+
+
+def _file_logger(name: str, path: str) -> logging.Logger:
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = RotatingFileHandler(path, maxBytes=5 * 1024 * 1024, backupCount=5, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+    return logger
+
+
+def pack(lines, limit: int = MESSAGE_LIMIT) -> list:
+    """Join lines into as few chunks of at most `limit` characters as possible, in order."""
+    chunks = []
+    current = ''
+    for line in lines:
+        while len(line) > limit:
+            # A single oversized entry is split rather than rejected
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + 1 + len(line) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class ChannelLogSink:
+    """
+    Buffered log for a Discord channel.
+
+    Every entry goes to a local rotating file. Entries at `channel_level` or above are also
+    buffered and flushed to the channel every `interval` seconds (or once FLUSH_ENTRIES are
+    waiting), packed into as few messages as fit. A flush too large for a few messages is
+    sent as one `.log` attachment instead. Logging never waits on Discord.
+    """
+
+    def __init__(self, bot, channel_id: int, name: str, interval: float = 5.0,
+                 channel_level: int = logging.INFO, path: str = None):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.name = name
+        self.interval = interval
+        self.channel_level = channel_level
+        self.file = _file_logger(f"bot.{name}", path or os.path.join(os.getenv('LOG_DIR', '.'), f"{name}.log"))
+        self._buffer = []
+        self._wake = asyncio.Event()
+        self._task = None
+        self._closing = False
+        QUEUE_DEPTH.set_function(lambda: len(self._buffer), queue=f"log_{name}")
+
+    def log(self, message: str, department=None, level: int = logging.INFO):
+        emoji = _department_emoji(department)
+        line = f"{emoji} {message}" if emoji else message
+        self.file.log(level, line)
+        if level < self.channel_level:
+            return
+        self._buffer.append(line)
+        if self._task is None and not self._closing:
+            self._task = asyncio.create_task(self._run())
+        if len(self._buffer) >= FLUSH_ENTRIES:
+            self._wake.set()
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        channel = self.bot.get_channel(self.channel_id)
+        if channel is None:
+            return
+        chunks = pack(lines)
+        if len(chunks) > ATTACH_AFTER_MESSAGES:
+            attachment = (f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}.log", '\n'.join(lines).encode('utf-8'))
+            await self._send(channel, content=f"{len(lines)} log entries", attachment=attachment)
+            return
+        for chunk in chunks:
+            await self._send(channel, content=chunk)
+
+    async def _send(self, channel, content, attachment=None, max_retries=3):
+        for attempt in range(1, max_retries + 1):
+            try:
+                if attachment is not None:
+                    filename, data = attachment
+                    await channel.send(content, file=discord.File(io.BytesIO(data), filename=filename))
+                else:
+                    await channel.send(content)
+                return
+            except discord.errors.DiscordServerError as e:
+                print(f"[{self.name}] Discord server error sending logs (attempt {attempt}): {e}")
+                if attempt < max_retries:
+                    await asyncio.sleep(2 ** attempt)
+                else:
+                    print(f"[{self.name}] Giving up after {max_retries} attempts to send logs.")
+            except Exception as e:
+                print(f"[{self.name}] Unexpected error sending logs: {e}")
+                return
+
+    async def close(self):
+        """Stop the timer and send whatever is still buffered."""
+        self._closing = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
@@ -0,0 +1,182 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from bot.utils.metrics import LOOP_LAG, get_metrics
+
+# Stalls longer than this are attributed and reported (Discord interactions expire after 3s)
+STALL_THRESHOLD = float(os.getenv('LOOP_STALL_THRESHOLD', '0.25'))
+
+# Frames from these files are where the loop is running, not who blocked it
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STALLS = get_metrics().counter('bot_event_loop_stalls_total', 'Event-loop stalls over the watchdog threshold')
+
+
+def _blame(stack: traceback.StackSummary):
+    """The innermost frame in the bot's own code, or the innermost non-asyncio frame if there is none."""
+    for frame in reversed(stack):
+        if frame.filename.startswith(_PROJECT_DIR):
+            return frame
+    for frame in reversed(stack):
+        if not frame.filename.startswith(_ASYNCIO_DIR):
+            return frame
+    return stack[-1] if stack else None
+
+
+def _site(frame) -> str:
+    if frame is None:
+        return '<unknown>'
+    filename = frame.filename
+    if filename.startswith(_PROJECT_DIR):
+        filename = os.path.relpath(filename, os.path.dirname(_PROJECT_DIR))
+    return f"{filename}:{frame.lineno} ({frame.name})"
+
+
+class Offender:
+    """Accumulated stalls blamed on one file:line."""
+
+    def __init__(self, site: str):
+        self.site = site
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.stack = None
+
+    def add(self, duration: float, stack):
+        self.count += 1
+        self.total += duration
+        if duration >= self.worst:
+            self.worst = duration
+            self.stack = stack
+
+
+class _SlowCallbackHandler(logging.Handler):
+    # asyncio's debug mode logs "Executing <Handle ...> took 0.312 seconds" for slow callbacks
+    def __init__(self, watchdog):
+        super().__init__(logging.WARNING)
+        self.watchdog = watchdog
+
+    def emit(self, record):
+        if record.msg.startswith('Executing') and len(record.args or ()) == 2:
+            handle, duration = record.args
+            self.watchdog.record(f"callback {handle!r}"[:300], duration, None)
+
+
+class LoopWatchdog:
+    """
+    Detects event-loop stalls and records what was blocking.
+
+    A heartbeat task sleeps `interval` in a loop and publishes how late it woke up as the
+    loop lag gauge. A daemon thread watches the heartbeat; once it is `threshold` overdue,
+    the thread samples the loop thread's stack, so the blocked frame (a `requests` call, a
+    sync DB query...) is captured while it is still running. When the loop comes back, the
+    stall's duration is charged to the innermost frame of the bot's own code.
+
+    With LOOP_DEBUG=1, asyncio's debug mode also runs and its slow-callback warnings are
+    recorded too. Debug mode slows every callback, so it is off by default.
+    """
+
+    def __init__(self, threshold: float = STALL_THRESHOLD, interval: float = 0.05):
+        self.threshold = threshold
+        self.interval = interval
+        self.offenders = {}
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.started_at = None
+        self._loop = None
+        self._loop_thread = None
+        self._beat = 0
+        self._beat_at = time.monotonic()
+        self._sample = None  # (beat number, stack) taken by the watcher during the current stall
+        self._task = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._log_handler = None
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self.started_at = time.time()
+        self._beat_at = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+        if os.getenv('LOOP_DEBUG') == '1':
+            self._loop.set_debug(True)
+            self._loop.slow_callback_duration = self.threshold
+            self._log_handler = _SlowCallbackHandler(self)
+            logging.getLogger('asyncio').addHandler(self._log_handler)
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._log_handler is not None:
+            logging.getLogger('asyncio').removeHandler(self._log_handler)
+            self._loop.set_debug(False)
+            self._log_handler = None
+
+    async def _heartbeat(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - start - self.interval, 0.0)
+            sample, self._sample = self._sample, None
+            self._beat += 1
+            self._beat_at = now
+            LOOP_LAG.set(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                stack = sample[1] if sample is not None and sample[0] == self._beat - 1 else None
+                self.record(_site(_blame(stack)) if stack else '<not sampled>', lag, stack)
+
+    def _watch(self):
+        # Runs in its own thread, so it keeps going while the loop thread is stuck
+        while not self._stopping.wait(self.interval):
+            beat = self._beat
+            overdue = time.monotonic() - self._beat_at - self.interval
+            if overdue < self.threshold or (self._sample is not None and self._sample[0] == beat):
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                self._sample = (beat, traceback.extract_stack(frame))
+
+    def record(self, site: str, duration: float, stack):
+        self.stalls += 1
+        STALLS.inc()
+        offender = self.offenders.get(site)
+        if offender is None:
+            offender = self.offenders[site] = Offender(site)
+        offender.add(duration, stack)
+
+    def worst(self, limit: int = 10) -> list:
+        """Offenders ordered by total time they held the loop."""
+        return sorted(self.offenders.values(), key=lambda o: o.total, reverse=True)[:limit]
+
+    def reset(self):
+        self.offenders.clear()
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.started_at = time.time()
+
+
+_watchdog = None
+
+
+def get_loop_watchdog() -> LoopWatchdog:
+    """Return the process-wide loop watchdog."""
+    global _watchdog
+    if _watchdog is None:
+        _watchdog = LoopWatchdog()
+    return _watchdog
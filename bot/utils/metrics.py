@@ -0,0 +1,237 @@
+import os
+import time
+import contextlib
+from aiohttp import web
+
+# Seconds; covers a cached lookup up to a slow paginated ClickUp scan
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self):
+        """Yield (suffix, label values, extra label pairs, value) for the exposition."""
+        for key, value in sorted(self._values.items()):
+            yield '', key, (), value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.label_names, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """A value that goes up and down; `set_function` makes it read a callable at scrape time instead."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, labels=()):
+        super().__init__(name, help, labels)
+        self._functions = {}
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+    def set_function(self, function, **labels):
+        self._functions[self._key(labels)] = function
+
+    def value(self, **labels):
+        key = self._key(labels)
+        return self._functions[key]() if key in self._functions else self._values.get(key, 0)
+
+    def samples(self):
+        values = dict(self._values)
+        for key, function in self._functions.items():
+            try:
+                values[key] = function()
+            except Exception:
+                # A dead source (e.g. an unloaded cog) just drops out of the exposition
+                continue
+        for key, value in sorted(values.items()):
+            yield '', key, (), value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # [per-bucket counts, sum, count]
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[0][i] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Observe how long the `with` block took, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield '_bucket', key, (('le', _format_value(float(bound))),), cumulative
+            yield '_sum', key, (), total
+            yield '_count', key, (), count
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of named counters, gauges and histograms.
+
+    Modules declare their instruments at import time through `counter()`, `gauge()` and
+    `histogram()`, which return the existing metric when the name is already registered
+    (so reloading a cog doesn't fail). `render()` produces the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, help, labels, **kwargs)
+        elif not isinstance(metric, cls) or metric.label_names != tuple(labels):
+            raise ValueError(f"Metric {name} is already registered as a different {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels=()) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return '\n'.join(lines) + '\n'
+
+
+_registry = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
+
+
+# Queue depths, one gauge labelled by queue; owners register a function reading their queue
+QUEUE_DEPTH = get_metrics().gauge('bot_queue_depth', 'Items waiting in an internal queue', ('queue',))
+
+# Set by the loop watchdog's heartbeat
+LOOP_LAG = get_metrics().gauge('bot_event_loop_lag_seconds', 'How late the last event-loop heartbeat woke up')
+
+
+class MetricsServer:
+    """Serves the registry at `/metrics` on a local port."""
+
+    def __init__(self, registry: MetricsRegistry = None, path: str = '/metrics'):
+        self.registry = registry or get_metrics()
+        self.path = path
+        self._runner = None
+
+    async def handle(self, request: web.Request):
+        return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    async def start(self, host: str = '127.0.0.1', port: int = 9180):
+        app = web.Application()
+        app.router.add_get(self.path, self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        print(f"[Metrics] Serving metrics on {host}:{port}{self.path}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+_server = None
+
+
+async def start_metrics_server() -> MetricsServer:
+    """
+    Start the metrics endpoint once per process, on METRICS_HOST:METRICS_PORT
+    (127.0.0.1:9180 by default; METRICS_PORT=0 disables it).
+    """
+    global _server
+    port = int(os.getenv('METRICS_PORT', '9180'))
+    if _server is None and port:
+        server = MetricsServer()
+        try:
+            await server.start(host=os.getenv('METRICS_HOST', '127.0.0.1'), port=port)
+        except OSError as e:
+            print(f"[Metrics] Could not start the metrics endpoint: {e}")
+            return None
+        _server = server
+    return _server
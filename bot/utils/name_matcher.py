@@ -0,0 +1,91 @@
+from collections import deque
+from functools import lru_cache
+
+
+def _is_word(char: str) -> bool:
+    # Same character class as `\w` in a str regex
+    return char.isalnum() or char == '_'
+
+
+def _fold(text: str) -> str:
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # A few characters lower to more than one code point; keep offsets aligned with the original
+    return ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class NameMatcher:
+    """
+    Aho-Corasick automaton over a roster of names.
+
+    `find(text)` returns every roster name that occurs in `text` in one pass over the text,
+    with the same meaning as searching `\\bname\\b` with re.IGNORECASE for each name.
+    """
+
+    def __init__(self, names):
+        self.names = tuple(sorted({name for name in names if name}))
+        # Node 0 is the root; each node has its transitions, failure link and the names ending there
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for name in self.names:
+            node = 0
+            for char in _fold(name):
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._out[node] += ((name, len(name)),)
+        self._build_links()
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                # Names ending at the failure node also end here
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> set:
+        """Return the set of roster names found in `text` as whole words, ignoring case."""
+        found = set()
+        if not text or not self.names:
+            return found
+        folded = _fold(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        length = len(folded)
+        node = 0
+        for end, char in enumerate(folded, 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for name, size in out[node]:
+                if name in found:
+                    continue
+                start = end - size
+                # `\b` on both sides: a word/non-word transition at each edge of the match
+                before = start > 0 and _is_word(folded[start - 1])
+                after = end < length and _is_word(folded[end])
+                if before != _is_word(folded[start]) and after != _is_word(folded[end - 1]):
+                    found.add(name)
+        return found
+
+
+@lru_cache(maxsize=8)
+def _matcher_for(names: frozenset) -> NameMatcher:
+    return NameMatcher(names)
+
+
+def get_matcher(names) -> NameMatcher:
+    """Return the cached matcher for this roster, building it only the first time the roster is seen."""
+    return _matcher_for(frozenset(names))
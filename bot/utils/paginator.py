@@ -1,3 +1,4 @@
+import asyncio
 import discord
 
 class SimplePaginator(discord.ui.View):
@@ -59,3 +60,140 @@ class SimplePaginator(discord.ui.View):
             color=self.color
         )
         self.message = await channel.send(embed=embed, view=self)
+
+
+def _log_task_error(task):
+    # Prefetches and debounced edits are fire-and-forget; surface their failures instead of losing them
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[Paginator] Background page update failed: {task.exception()!r}")
+
+
+class LazyPaginator(discord.ui.View):
+    """
+    Paginator that asks an async page source for one page at a time instead of slicing everything up front.
+
+    A source has `async get_page(index, size) -> list` and `async count() -> int | None`
+    (None while the total is unknown). Only the visible page and the next one are fetched,
+    renders are cached per page (in flight or finished, so a prefetch and a click share one
+    `get_page`), and rapid button presses are debounced into one edit of the message.
+    `line_builder(i, item)` gets the item's index in the whole list.
+    """
+
+    # Seconds to wait for further clicks before editing the message
+    DEBOUNCE = 0.4
+
+    def __init__(self, source, page_size=25, title=None, line_builder=None, color=discord.Color.blurple(), timeout=120):
+        super().__init__(timeout=timeout)
+        self.source = source
+        self.page_size = page_size
+        self.title = title or "Paginated List"
+        self.line_builder = line_builder or (lambda i, item: f"{i+1}. {item}")
+        self.color = color
+        self.page = 0
+        self.message = None
+        self.total = None
+        self._renders = {}  # page index -> task rendering its embed
+        self._pages = {}
+        self._edit_task = None
+        self._prefetch_task = None
+
+    @property
+    def max_page(self):
+        if self.total is None:
+            return None
+        return max((self.total - 1) // self.page_size, 0)
+
+    async def _load(self, index):
+        if index not in self._pages:
+            self._pages[index] = await self.source.get_page(index, self.page_size)
+            if self.total is None:
+                self.total = await self.source.count()
+        return self._pages[index]
+
+    async def _render(self, index) -> discord.Embed:
+        items = await self._load(index)
+        offset = index * self.page_size
+        lines = [self.line_builder(offset + i, item) for i, item in enumerate(items)]
+        return discord.Embed(title=self.title, description='\n'.join(lines) or 'None', color=self.color)
+
+    def _render_task(self, index) -> asyncio.Task:
+        task = self._renders.get(index)
+        # A failed render is retried by the next caller rather than cached
+        if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+            task = self._renders[index] = asyncio.create_task(self._render(index))
+            task.add_done_callback(_log_task_error)
+        return task
+
+    async def render(self, index) -> discord.Embed:
+        # shield: an edit being abandoned mustn't cancel a render another caller shares
+        return await asyncio.shield(self._render_task(index))
+
+    def _prefetch(self, index):
+        if index in self._renders or (self.max_page is not None and index > self.max_page):
+            return
+        if self._prefetch_task is None or self._prefetch_task.done():
+            self._prefetch_task = self._render_task(index)
+
+    def refresh_page_label(self):
+        last = self.max_page
+        self.children[1].label = f"Page {self.page+1}/{last+1}" if last is not None else f"Page {self.page+1}"
+        # With an unknown total, stop at the first short page
+        at_end = last is None and len(self._pages.get(self.page, ())) < self.page_size
+        self.children[2].disabled = at_end and self.page > 0
+        self.children[0].disabled = last is None and self.page == 0
+
+    async def _show(self):
+        page = self.page
+        embed = await self.render(page)
+        self.refresh_page_label()
+        await self.message.edit(embed=embed, view=self)
+        self._prefetch(page + 1)
+        return page
+
+    async def _debounced_show(self):
+        await asyncio.sleep(self.DEBOUNCE)
+        # Clicks that land during an edit are picked up by one more edit afterwards
+        while await self._show() != self.page:
+            pass
+
+    async def _turn(self, interaction, step):
+        last = self.max_page
+        page = self.page + step
+        if last is not None:
+            page %= last + 1
+        elif page < 0 or (step > 0 and len(self._pages.get(self.page, ())) < self.page_size):
+            page = self.page
+        self.page = page
+        await interaction.response.defer()
+        # Further clicks only move self.page; the pending edit shows wherever it ends up
+        if self._edit_task is None or self._edit_task.done():
+            self._edit_task = asyncio.create_task(self._debounced_show())
+            self._edit_task.add_done_callback(_log_task_error)
+
+    @discord.ui.button(emoji='⬅️', style=discord.ButtonStyle.secondary)
+    async def prev(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, -1)
+
+    @discord.ui.button(label='Page', style=discord.ButtonStyle.secondary, disabled=True)
+    async def page_display(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+
+    @discord.ui.button(emoji='➡️', style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, 1)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.NotFound:
+                pass  # Message was deleted, nothing to update
+
+    async def send(self, channel):
+        """Post a placeholder right away, then fill in the first page once the source returns it."""
+        self.refresh_page_label()
+        loading = discord.Embed(title=self.title, description='Loading...', color=self.color)
+        self.message = await channel.send(embed=loading, view=self)
+        await self._show()
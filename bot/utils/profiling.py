@@ -0,0 +1,201 @@
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import marshal
+import threading
+import tracemalloc
+from collections import namedtuple, Counter
+
+# What a finished session hands back: a short text summary and (filename, bytes) attachments
+ProfileReport = namedtuple('ProfileReport', ['summary', 'files'])
+
+# Seconds between stack samples of the loop thread
+SAMPLE_INTERVAL = 0.005
+
+# Frames kept per tracemalloc allocation; more frames cost more memory while tracing
+TRACE_FRAMES = 10
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class CpuProfile:
+    """Deterministic cProfile session of the thread it is started from (the event loop)."""
+
+    kind = 'cprofile'
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self, stamp: str, top: int = 25) -> ProfileReport:
+        self._profile.disable()
+        out = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=out)
+        stats.sort_stats('cumulative').print_stats(top)
+        return ProfileReport(
+            summary=f"{stats.total_calls} calls in {stats.total_tt:.2f}s of CPU",
+            # Same format as pstats' dump_stats, so the file opens in pstats / snakeviz
+            files=[(f"profile-{stamp}.pstats", marshal.dumps(stats.stats)),
+                   (f"profile-{stamp}.txt", out.getvalue().encode())]
+        )
+
+
+class SamplingProfile:
+    """
+    Samples the event loop thread's stack every SAMPLE_INTERVAL from a background thread.
+
+    Cheap enough to leave on during a real quota run, and it sees time spent blocked in
+    C calls (sockets, sqlite) that cProfile only attributes to the caller. The result is in
+    the collapsed-stack format flamegraph.pl and speedscope read.
+    """
+
+    kind = 'sample'
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self._thread_id = None
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self, stamp: str, top: int = 25) -> ProfileReport:
+        self._stopping.set()
+        self._thread.join()
+        total = sum(self.samples.values())
+        collapsed = '\n'.join(f"{stack} {count}" for stack, count in self.samples.most_common())
+        # Leaf frames by share of samples
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        lines = [f"{'samples':>8} {'share':>6}  frame"]
+        lines += [f"{count:>8} {count / total:>6.1%}  {frame}" for frame, count in leaves.most_common(top)] if total else []
+        return ProfileReport(
+            summary=f"{total} samples every {self.interval * 1000:.0f}ms",
+            files=[(f"profile-{stamp}.collapsed", (collapsed + '\n').encode()),
+                   (f"profile-{stamp}-top.txt", ('\n'.join(lines) + '\n').encode())]
+        )
+
+
+class Profiler:
+    """
+    Runtime profiling controlled by owner commands: one CPU session (cProfile or sampling)
+    and one tracemalloc session at a time, each ending in a ProfileReport.
+    """
+
+    def __init__(self):
+        self.session = None
+        self.session_started = None
+        self._baseline = None
+        self._tracing_started = None
+        self._started_tracemalloc = False
+
+    # --- CPU ---
+
+    def start(self, kind: str = 'sample'):
+        if self.session is not None:
+            raise RuntimeError(f"A {self.session.kind} session is already running")
+        if kind not in ('cprofile', 'sample'):
+            raise ValueError(f"Unknown profiler: {kind}")
+        self.session = CpuProfile() if kind == 'cprofile' else SamplingProfile()
+        self.session_started = time.monotonic()
+        self.session.start()
+
+    def stop(self) -> ProfileReport:
+        if self.session is None:
+            raise RuntimeError("No profiling session is running")
+        session, self.session = self.session, None
+        elapsed = time.monotonic() - self.session_started
+        report = session.stop(time.strftime('%Y%m%d-%H%M%S'))
+        return report._replace(summary=f"{session.kind} over {elapsed:.1f}s: {report.summary}")
+
+    # --- Memory ---
+
+    @staticmethod
+    def _snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+
+    def memory_start(self):
+        """Start tracing allocations (if nothing else is) and take the baseline snapshot."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._started_tracemalloc = True
+        self._baseline = self._snapshot()
+        self._tracing_started = time.monotonic()
+
+    def memory_diff(self, top: int = 15, rebase: bool = False) -> ProfileReport:
+        """Allocations that grew since the baseline, grouped by line; `rebase` makes this the new baseline."""
+        if self._baseline is None:
+            raise RuntimeError("Memory tracing is not running")
+        snapshot = self._snapshot()
+        diff = snapshot.compare_to(self._baseline, 'lineno')
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"{'size':>10} {'growth':>11} {'count':>8}  location"]
+        for stat in diff[:top]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size / 1024:>8.1f}Ki {stat.size_diff / 1024:>+9.1f}Ki {stat.count:>8}  {frame.filename}:{frame.lineno}")
+        full = [str(stat) for stat in diff[:200]]
+        # Full call stacks of the biggest growers, outermost call first
+        for stat in snapshot.compare_to(self._baseline, 'traceback')[:5]:
+            full += ['', f"{stat.size_diff / 1024:+.1f} KiB in {stat.count_diff:+} blocks:", *stat.traceback.format()]
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        elapsed = time.monotonic() - self._tracing_started
+        if rebase:
+            self._baseline = snapshot
+            self._tracing_started = time.monotonic()
+        return ProfileReport(
+            summary=f"Traced {current / 2 ** 20:.1f} MiB now, peak {peak / 2 ** 20:.1f} MiB; growth over {elapsed:.0f}s:\n"
+                    + '\n'.join(lines),
+            files=[(f"memory-{stamp}.txt", ('\n'.join(full) + '\n').encode())]
+        )
+
+    def memory_stop(self):
+        self._baseline = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def status(self) -> str:
+        parts = []
+        if self.session is not None:
+            parts.append(f"{self.session.kind} session running for {time.monotonic() - self.session_started:.0f}s")
+        if self._baseline is not None:
+            parts.append(f"tracemalloc running for {time.monotonic() - self._tracing_started:.0f}s")
+        return '; '.join(parts) or 'No profiling running'
+
+
+_profiler = None
+
+
+def get_profiler() -> Profiler:
+    """Return the process-wide profiler."""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
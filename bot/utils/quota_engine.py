@@ -0,0 +1,289 @@
+import time
+import asyncio
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from bot.utils.name_matcher import get_matcher
+from bot.utils.roblox_users import ROBLOX_USERS
+from bot.utils.task_mirror import get_mirror, department_list_ids
+from bot.utils.task_streams import iter_task_streams
+from bot.utils.task_records import TaskRecord
+from bot.utils.metrics import get_metrics
+
+CONCLUDED = 'concluded'
+SCHEDULED_STATUSES = ('pending staff', 'scheduled')
+
+# How long a computed month is reused before the next caller triggers a fresh scan
+SNAPSHOT_TTL_SECONDS = 120
+
+PAGES_FETCHED = get_metrics().counter('quota_pages_fetched_total', 'ClickUp task pages fetched for quota snapshots', ('source',))
+TASKS_SCANNED = get_metrics().counter('quota_tasks_scanned_total', 'Tasks examined while building quota snapshots', ('source',))
+
+
+def month_window(year: int = None, month: int = None, month_offset: int = 0):
+    """
+    Resolve a target month to (year, month, first_ms, next_first_ms), all UTC.
+
+    If year/month are not given, `month_offset` is applied to the current month
+    (0 = this month, -1 = last month).
+    """
+    if year is None or month is None:
+        now = datetime.now(timezone.utc)
+        # Apply month_offset, adjusting year/month to the valid range
+        total = now.year * 12 + (now.month - 1) + month_offset
+        year, month = divmod(total, 12)
+        month += 1
+    first_of_month = datetime(year=year, month=month, day=1, tzinfo=timezone.utc)
+    if month == 12:
+        next_month = datetime(year=year + 1, month=1, day=1, tzinfo=timezone.utc)
+    else:
+        next_month = datetime(year=year, month=month + 1, day=1, tzinfo=timezone.utc)
+    return year, month, int(first_of_month.timestamp() * 1000), int(next_month.timestamp() * 1000)
+
+
+async def quota_roster():
+    """ROBLOX_USERS plus every registered user's ROBLOX username, the names quota counts are kept for."""
+    roster = set(ROBLOX_USERS)
+    try:
+        # Imported here so the engine (and the benchmarks) load without a database driver
+        from bot.utils.user_directory import get_user_directory
+        users = await get_user_directory().all()
+    except Exception as e:
+        print(f"[QuotaEngine] Could not load registered users, using ROBLOX_USERS only: {e}")
+        return sorted(roster)
+    roster.update(u['roblox_username'] for u in users if u.get('roblox_username') not in (None, '', 'Not set'))
+    return sorted(roster)
+
+
+class QuotaSnapshot:
+    """
+    Everything quota-related for one month, built from a single scan of each department list.
+
+    - Per assignee email and department: the concluded and scheduled tasks they are assigned to.
+      Host counts use the caller's ROBLOX username against the task name, as /check always has.
+    - Per roster username and department: host (name in title) and co-host (name only in
+      description) counts, summed across departments for >quota as it always has.
+
+    Tasks are held as TaskRecords, projected from each page as it arrives.
+    """
+
+    def __init__(self, year: int, month: int, first_ms: int, end_ms: int, roster):
+        self.year = year
+        self.month = month
+        self.first_ms = first_ms
+        self.end_ms = end_ms
+        self.roster = list(roster)
+        self.computed_at = time.monotonic()
+        self.source = None
+        # Pages that failed to load; a snapshot with errors undercounts
+        self.errors = []
+        # email -> department -> {'concluded': [TaskRecord], 'scheduled': [TaskRecord]}
+        self.tasks_by_email = defaultdict(lambda: defaultdict(lambda: {CONCLUDED: [], 'scheduled': []}))
+        self.host_counts = Counter()
+        self.cohost_counts = Counter()
+        # task id -> [(username, department, host, cohost)] for each concluded task that credits someone
+        self.task_credits = {}
+        self._matcher = get_matcher(self.roster)
+        self._by_lower = defaultdict(list)
+        for username in self.roster:
+            self._by_lower[username.lower()].append(username)
+
+    def project(self, task: dict, list_id, archived: bool) -> TaskRecord:
+        """Reduce an API task to a TaskRecord whose mentions are names from this roster."""
+        return TaskRecord.from_clickup(task, list_id, archived, self._matcher)
+
+    def project_mirrored(self, task: dict) -> TaskRecord:
+        """Wrap a mirrored task, mapping the mirror's mentions onto this roster's spelling of each name."""
+        record = TaskRecord.from_mirror(task)
+        record.mentions = tuple(username for m in record.mentions for username in self._by_lower.get(m.lower(), ()))
+        return record
+
+    def add(self, department: str, task: TaskRecord):
+        if task.status == CONCLUDED:
+            bucket = CONCLUDED
+        elif task.status in SCHEDULED_STATUSES and not task.archived:
+            bucket = 'scheduled'
+        else:
+            return
+        for email in task.emails:
+            self.tasks_by_email[email][department][bucket].append(task)
+        if bucket == CONCLUDED:
+            self._count_usernames(department, task)
+
+    def _count_usernames(self, department: str, task: TaskRecord):
+        # Only count hosts when the username appears in the task title
+        hosts = self._matcher.find(task.name)
+        in_desc = set(task.mentions)
+        self.host_counts.update((username, department) for username in hosts)
+        # If username appears in the description but not the title, count as cohost
+        self.cohost_counts.update((username, department) for username in in_desc - hosts)
+        credits = [(username, department, 1, 0) for username in hosts] + [(username, department, 0, 1) for username in in_desc - hosts]
+        if credits:
+            self.task_credits[task.id] = credits
+
+    def user_tasks(self, clickup_email: str, department: str) -> dict:
+        departments = self.tasks_by_email.get(clickup_email)
+        if not departments or department not in departments:
+            return {CONCLUDED: [], 'scheduled': []}
+        return departments[department]
+
+    def user_counts(self, clickup_email: str, roblox_username: str, department: str) -> dict:
+        """Counts for one user in one department, in the terms /check and the quota reminders use."""
+        tasks = self.user_tasks(clickup_email, department)
+        concluded = tasks[CONCLUDED]
+        scheduled = tasks['scheduled']
+        scheduled_hosts = [t for t in scheduled if roblox_username and roblox_username in t.name]
+        return {
+            'concluded_total': len(concluded),
+            'concluded_host': sum(1 for t in concluded if roblox_username and roblox_username in t.name),
+            'scheduled_total': len(scheduled),
+            'scheduled_host': len(scheduled_hosts),
+            'concluded_tasks': concluded,
+            'scheduled_tasks': scheduled,
+            'scheduled_host_tasks': scheduled_hosts,
+        }
+
+    def username_counts(self, usernames) -> dict:
+        """Map username -> {'host', 'cohost', 'total'} for names from the snapshot's roster."""
+        result = {username: {'host': 0, 'cohost': 0, 'total': 0} for username in usernames}
+        for username, department, host, cohost in self.department_counts():
+            if username in result:
+                result[username]['host'] += host
+                result[username]['cohost'] += cohost
+                result[username]['total'] += host + cohost
+        return result
+
+    def department_counts(self):
+        """Yield (username, department, host, cohost) for every pair with at least one credit."""
+        for key in self.host_counts.keys() | self.cohost_counts.keys():
+            yield key[0], key[1], self.host_counts.get(key, 0), self.cohost_counts.get(key, 0)
+
+
+async def build_snapshot(year: int, month: int, first_ms: int, end_ms: int, roster, concurrency: int = 4) -> QuotaSnapshot:
+    """Scan every department list once for the month and return the resulting snapshot."""
+    snapshot = QuotaSnapshot(year, month, first_ms, end_ms, roster)
+    lists = department_list_ids()
+    department_by_list = {str(list_id): dept for dept, list_id in lists.items()}
+    statuses = [CONCLUDED, *SCHEDULED_STATUSES]
+    seen_task_ids = set()
+    mirror = get_mirror()
+    if mirror.is_ready(lists.values()) and mirror.covers(snapshot.roster):
+        snapshot.source = 'mirror'
+        for task in mirror.query(lists.values(), statuses=statuses, due_date_gt=first_ms, due_date_lt=end_ms):
+            TASKS_SCANNED.inc(source=snapshot.source)
+            if task['id'] not in seen_task_ids:
+                seen_task_ids.add(task['id'])
+                snapshot.add(department_by_list[task['list_id']], snapshot.project_mirrored(task))
+        return snapshot
+    snapshot.source = 'clickup'
+    streams = [(list_id, archived) for list_id in lists.values() for archived in (False, True)]
+    async for result in iter_task_streams(
+        streams,
+        concurrency=concurrency,
+        statuses=statuses,
+        include_closed=True,
+        due_date_gt=first_ms,
+        due_date_lt=end_ms
+    ):
+        if result.error is not None:
+            print(f"[QuotaEngine] ClickUp API request failed for list {result.list_id} (archived={result.archived}, page={result.page}): {result.error}")
+            snapshot.errors.append(result.error)
+            continue
+        PAGES_FETCHED.inc(source=snapshot.source)
+        TASKS_SCANNED.inc(len(result.tasks), source=snapshot.source)
+        department = department_by_list[str(result.list_id)]
+        for task in result.tasks:
+            task_id = task.get('id')
+            if task_id in seen_task_ids:
+                continue
+            seen_task_ids.add(task_id)
+            snapshot.add(department, snapshot.project(task, result.list_id, result.archived))
+    return snapshot
+
+
+async def build_user_snapshot(year: int, month: int, first_ms: int, end_ms: int, clickup_user_id, departments,
+                              concurrency: int = 4) -> QuotaSnapshot:
+    """
+    Scan only the tasks assigned to one ClickUp user (`assignees[]`) in the given departments' lists.
+
+    The result answers `user_counts` for that user; it holds nobody else's tasks and no roster counts.
+    """
+    snapshot = QuotaSnapshot(year, month, first_ms, end_ms, [])
+    snapshot.source = 'clickup-assignee'
+    lists = department_list_ids()
+    department_by_list = {str(lists[dept]): dept for dept in departments if dept in lists}
+    streams = [(list_id, archived) for list_id in department_by_list for archived in (False, True)]
+    seen_task_ids = set()
+    async for result in iter_task_streams(
+        streams,
+        concurrency=concurrency,
+        statuses=[CONCLUDED, *SCHEDULED_STATUSES],
+        include_closed=True,
+        due_date_gt=first_ms,
+        due_date_lt=end_ms,
+        extra_params=[('assignees[]', str(clickup_user_id))]
+    ):
+        if result.error is not None:
+            print(f"[QuotaEngine] ClickUp API request failed for list {result.list_id} (archived={result.archived}, page={result.page}): {result.error}")
+            snapshot.errors.append(result.error)
+            continue
+        PAGES_FETCHED.inc(source=snapshot.source)
+        TASKS_SCANNED.inc(len(result.tasks), source=snapshot.source)
+        for task in result.tasks:
+            if task.get('id') in seen_task_ids:
+                continue
+            seen_task_ids.add(task.get('id'))
+            snapshot.add(department_by_list[str(result.list_id)], snapshot.project(task, result.list_id, result.archived))
+    return snapshot
+
+
+_snapshots = {}
+_locks = defaultdict(asyncio.Lock)
+
+
+def cached_quota_snapshot(month_offset: int = 0, max_age: float = SNAPSHOT_TTL_SECONDS):
+    """The month's snapshot if one was computed within `max_age`, without scanning anything."""
+    year, month, _, _ = month_window(month_offset=month_offset)
+    snapshot = _snapshots.get((year, month))
+    if snapshot is not None and time.monotonic() - snapshot.computed_at <= max_age:
+        return snapshot
+    return None
+
+
+async def get_user_quota_snapshot(departments, clickup_user_id=None) -> QuotaSnapshot:
+    """
+    A snapshot that answers `user_counts` for one user this month in `departments`.
+
+    A fresh shared snapshot or the task mirror is used when available since neither costs a
+    ClickUp request. Otherwise, if the user's ClickUp id is known, only their own tasks are
+    fetched; without it this falls back to the full month scan.
+    """
+    snapshot = cached_quota_snapshot()
+    if snapshot is not None:
+        return snapshot
+    if get_mirror().is_ready(department_list_ids().values()) or clickup_user_id is None:
+        return await get_quota_snapshot()
+    year, month, first_ms, end_ms = month_window()
+    return await build_user_snapshot(year, month, first_ms, end_ms, clickup_user_id, departments)
+
+
+async def get_quota_snapshot(year: int = None, month: int = None, month_offset: int = 0, roster=None,
+                             max_age: float = SNAPSHOT_TTL_SECONDS, concurrency: int = 4) -> QuotaSnapshot:
+    """
+    Return the quota snapshot for a month, scanning ClickUp (or the task mirror) at most once per `max_age`.
+
+    Concurrent callers asking for the same month share one scan. `roster` defaults to
+    ROBLOX_USERS; a cached snapshot is reused only if its roster includes every requested name.
+    """
+    year, month, first_ms, end_ms = month_window(year, month, month_offset)
+    roster = set(roster if roster is not None else ROBLOX_USERS)
+    key = (year, month)
+    async with _locks[key]:
+        snapshot = _snapshots.get(key)
+        fresh = snapshot is not None and time.monotonic() - snapshot.computed_at <= max_age
+        if not fresh or not roster.issubset(snapshot.roster):
+            if fresh:
+                # Widen rather than replace, so callers with different rosters don't thrash the cache
+                roster |= set(snapshot.roster)
+            snapshot = await build_snapshot(year, month, first_ms, end_ms, sorted(roster), concurrency=concurrency)
+            _snapshots[key] = snapshot
+        return snapshot
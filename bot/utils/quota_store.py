@@ -0,0 +1,381 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from datetime import datetime, timezone, timedelta
+from bot.utils.quota_engine import QuotaSnapshot, SNAPSHOT_TTL_SECONDS, get_quota_snapshot, month_window
+from bot.utils.task_mirror import get_mirror, department_list_ids
+
+# Late status changes (a training marked concluded a day after it ran) still land in the closing month
+FINALIZE_AFTER = timedelta(days=3)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota_monthly (
+    roblox_username TEXT NOT NULL,
+    department TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    host INTEGER NOT NULL DEFAULT 0,
+    cohost INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    finalized INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (year, month, roblox_username, department)
+);
+CREATE INDEX IF NOT EXISTS quota_monthly_by_host ON quota_monthly (year, month, host);
+CREATE TABLE IF NOT EXISTS quota_months (
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    finalized INTEGER NOT NULL DEFAULT 0,
+    roster TEXT NOT NULL,
+    computed_at INTEGER,
+    PRIMARY KEY (year, month)
+);
+CREATE TABLE IF NOT EXISTS quota_task_credits (
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    task_id TEXT NOT NULL,
+    roblox_username TEXT NOT NULL,
+    department TEXT NOT NULL,
+    host INTEGER NOT NULL DEFAULT 0,
+    cohost INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (year, month, task_id, roblox_username, department)
+);
+CREATE INDEX IF NOT EXISTS quota_task_credits_by_name ON quota_task_credits (year, month, roblox_username, department);
+CREATE TABLE IF NOT EXISTS quota_month_tasks (
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    task_id TEXT NOT NULL,
+    date_updated INTEGER,
+    PRIMARY KEY (year, month, task_id)
+);
+CREATE TABLE IF NOT EXISTS quota_mirror_state (
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    roster_hash TEXT NOT NULL,
+    PRIMARY KEY (year, month)
+);
+"""
+
+
+def month_is_final(end_ms: int) -> bool:
+    """Whether a month ending at `end_ms` (exclusive) is closed for good."""
+    end = datetime.fromtimestamp(end_ms / 1000, tz=timezone.utc)
+    return datetime.now(timezone.utc) >= end + FINALIZE_AFTER
+
+
+class QuotaStore:
+    """
+    SQLite table of host/co-host/total counts per (roblox_username, department, year, month).
+
+    Rows only exist for pairs with at least one credit. `quota_months` records which names a
+    month was computed for and whether it is finalized; finalized months are never recomputed
+    unless a name outside their roster is asked for.
+
+    An open month computed from the task mirror also keeps each task's credits and
+    date_updated (`quota_task_credits`, `quota_month_tasks`), so later refreshes only re-count
+    the tasks that changed since (`apply_task_changes`).
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv('QUOTA_STORE_PATH', 'quota.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+        # (year, month) -> the snapshot last written, so a cached snapshot isn't diffed twice
+        self._saved = {}
+
+    def month_state(self, year: int, month: int):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM quota_months WHERE year = ? AND month = ?", (year, month)).fetchone()
+        if not row:
+            return None
+        return {'finalized': bool(row['finalized']), 'roster': set(json.loads(row['roster'])), 'computed_at': row['computed_at']}
+
+    def save(self, snapshot, finalized: bool, task_updates: dict = None, roster_hash: str = None):
+        """
+        Write a month's snapshot, touching only the rows whose counts changed.
+
+        `task_updates` (task id -> date_updated of every mirrored task in the month, taken before
+        the snapshot was built) and the mirror's `roster_hash` make the open month incremental.
+        """
+        key = (snapshot.year, snapshot.month)
+        if self._saved.get(key) is snapshot:
+            return
+        new = {
+            (username, department): (host, cohost)
+            for username, department, host, cohost in snapshot.department_counts()
+        }
+        with self._lock:
+            old = {
+                (row['roblox_username'], row['department']): (row['host'], row['cohost'])
+                for row in self._conn.execute(
+                    "SELECT roblox_username, department, host, cohost FROM quota_monthly WHERE year = ? AND month = ?", key)
+            }
+            changed = [
+                (username, department, snapshot.year, snapshot.month, host, cohost, host + cohost, int(finalized))
+                for (username, department), (host, cohost) in new.items()
+                if old.get((username, department)) != (host, cohost)
+            ]
+            removed = [(snapshot.year, snapshot.month, username, department) for username, department in old.keys() - new.keys()]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO quota_monthly (roblox_username, department, year, month, host, cohost, total, finalized) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", changed)
+            self._conn.executemany(
+                "DELETE FROM quota_monthly WHERE year = ? AND month = ? AND roblox_username = ? AND department = ?", removed)
+            if finalized:
+                self._conn.execute("UPDATE quota_monthly SET finalized = 1 WHERE year = ? AND month = ?", key)
+            self._clear_tasks(key)
+            if task_updates is not None and not finalized:
+                self._conn.executemany(
+                    "INSERT INTO quota_task_credits (year, month, task_id, roblox_username, department, host, cohost) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(*key, task_id, *credit) for task_id, credits in snapshot.task_credits.items() for credit in credits])
+                self._conn.executemany(
+                    "INSERT INTO quota_month_tasks (year, month, task_id, date_updated) VALUES (?, ?, ?, ?)",
+                    [(*key, task_id, updated) for task_id, updated in task_updates.items()])
+                self._conn.execute("INSERT INTO quota_mirror_state (year, month, roster_hash) VALUES (?, ?, ?)", (*key, roster_hash))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO quota_months (year, month, finalized, roster, computed_at) VALUES (?, ?, ?, ?, ?)",
+                (snapshot.year, snapshot.month, int(finalized), json.dumps(sorted(snapshot.roster)), int(time.time()))
+            )
+            self._conn.commit()
+        self._saved[key] = snapshot
+
+    def _clear_tasks(self, key):
+        # Caller holds the lock
+        for table in ('quota_task_credits', 'quota_month_tasks', 'quota_mirror_state'):
+            self._conn.execute(f"DELETE FROM {table} WHERE year = ? AND month = ?", key)
+
+    def mirror_roster_hash(self, year: int, month: int):
+        """The mirror roster hash the month's per-task state was built with, or None if it has none."""
+        with self._lock:
+            row = self._conn.execute("SELECT roster_hash FROM quota_mirror_state WHERE year = ? AND month = ?", (year, month)).fetchone()
+        return row['roster_hash'] if row else None
+
+    def month_tasks(self, year: int, month: int) -> dict:
+        """Map task id -> date_updated as of the month's last computation."""
+        with self._lock:
+            return {row['task_id']: row['date_updated'] for row in self._conn.execute(
+                "SELECT task_id, date_updated FROM quota_month_tasks WHERE year = ? AND month = ?", (year, month))}
+
+    def apply_task_changes(self, year: int, month: int, credits: dict, updates: dict, finalized: bool):
+        """
+        Replace the credits of changed tasks and re-sum only the (username, department) rows they touch.
+
+        `credits` maps every changed or removed task id to its new [(username, department, host, cohost)];
+        `updates` holds the new date_updated of the tasks still in the month (removed ones are absent).
+        """
+        key = (year, month)
+        with self._lock:
+            affected = set()
+            for task_id, task_credits in credits.items():
+                affected.update((row['roblox_username'], row['department']) for row in self._conn.execute(
+                    "SELECT roblox_username, department FROM quota_task_credits WHERE year = ? AND month = ? AND task_id = ?",
+                    (*key, task_id)))
+                affected.update((username, department) for username, department, _, _ in task_credits)
+                self._conn.execute("DELETE FROM quota_task_credits WHERE year = ? AND month = ? AND task_id = ?", (*key, task_id))
+                self._conn.executemany(
+                    "INSERT INTO quota_task_credits (year, month, task_id, roblox_username, department, host, cohost) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", [(*key, task_id, *credit) for credit in task_credits])
+                if task_id in updates:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO quota_month_tasks (year, month, task_id, date_updated) VALUES (?, ?, ?, ?)",
+                        (*key, task_id, updates[task_id]))
+                else:
+                    self._conn.execute("DELETE FROM quota_month_tasks WHERE year = ? AND month = ? AND task_id = ?", (*key, task_id))
+            for username, department in affected:
+                host, cohost = self._conn.execute(
+                    "SELECT COALESCE(SUM(host), 0), COALESCE(SUM(cohost), 0) FROM quota_task_credits "
+                    "WHERE year = ? AND month = ? AND roblox_username = ? AND department = ?", (*key, username, department)).fetchone()
+                if host or cohost:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO quota_monthly (roblox_username, department, year, month, host, cohost, total, finalized) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (username, department, *key, host, cohost, host + cohost, int(finalized)))
+                else:
+                    self._conn.execute(
+                        "DELETE FROM quota_monthly WHERE year = ? AND month = ? AND roblox_username = ? AND department = ?",
+                        (*key, username, department))
+            if finalized:
+                self._conn.execute("UPDATE quota_monthly SET finalized = 1 WHERE year = ? AND month = ?", key)
+                self._clear_tasks(key)
+            self._conn.execute("UPDATE quota_months SET finalized = ?, computed_at = ? WHERE year = ? AND month = ?",
+                               (int(finalized), int(time.time()), *key))
+            self._conn.commit()
+        # The stored month no longer matches whichever snapshot was saved last
+        self._saved.pop(key, None)
+
+    def counts(self, year: int, month: int, usernames) -> dict:
+        """Map username -> {'host', 'cohost', 'total'} summed over departments."""
+        result = {username: {'host': 0, 'cohost': 0, 'total': 0} for username in usernames}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT roblox_username, SUM(host) AS host, SUM(cohost) AS cohost, SUM(total) AS total "
+                "FROM quota_monthly WHERE year = ? AND month = ? GROUP BY roblox_username", (year, month)
+            ).fetchall()
+        for row in rows:
+            if row['roblox_username'] in result:
+                result[row['roblox_username']] = {'host': row['host'], 'cohost': row['cohost'], 'total': row['total']}
+        return result
+
+    def leaderboard(self, year: int, month: int, usernames=None, column: str = 'host', limit: int = None, offset: int = 0) -> list:
+        """
+        Return [(username, count)] for a month ordered by `column` ('host', 'cohost' or 'total'), highest first.
+
+        `limit`/`offset` select one slice of the ranking, as a paginator asks for it.
+        """
+        if column not in ('host', 'cohost', 'total'):
+            raise ValueError(f"Unknown quota column: {column}")
+        sql = f"SELECT roblox_username, SUM({column}) AS count FROM quota_monthly WHERE year = ? AND month = ?"
+        params = [year, month]
+        if usernames is not None:
+            usernames = list(usernames)
+            sql += f" AND roblox_username IN ({', '.join('?' for _ in usernames)})"
+            params.extend(usernames)
+        sql += " GROUP BY roblox_username ORDER BY count DESC, roblox_username"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+        with self._lock:
+            return [(row['roblox_username'], row['count']) for row in self._conn.execute(sql, params)]
+
+    def ranked_usernames(self, year: int, month: int, usernames=None) -> set:
+        """Names with at least one row in the month."""
+        sql = "SELECT DISTINCT roblox_username FROM quota_monthly WHERE year = ? AND month = ?"
+        params = [year, month]
+        if usernames is not None:
+            usernames = list(usernames)
+            sql += f" AND roblox_username IN ({', '.join('?' for _ in usernames)})"
+            params.extend(usernames)
+        with self._lock:
+            return {row['roblox_username'] for row in self._conn.execute(sql, params)}
+
+
+_store = None
+
+
+def get_quota_store() -> QuotaStore:
+    """Return the process-wide quota store."""
+    global _store
+    if _store is None:
+        _store = QuotaStore()
+    return _store
+
+
+def _apply_mirror_changes(store: QuotaStore, year: int, month: int, first_ms: int, end_ms: int, roster) -> bool:
+    """
+    Bring an open month up to date from the mirror tasks whose date_updated changed (or that
+    appeared or disappeared) since it was last computed. Returns False when the month has no
+    per-task state matching the ready mirror, and needs a full recompute instead.
+    """
+    mirror = get_mirror()
+    lists = department_list_ids()
+    if (store.mirror_roster_hash(year, month) != mirror.roster_hash or not mirror.is_ready(lists.values())
+            or not mirror.covers(roster)):
+        return False
+    current = mirror.updated_ids(lists.values(), due_date_gt=first_ms, due_date_lt=end_ms)
+    known = store.month_tasks(year, month)
+    changed = [task_id for task_id, updated in current.items() if task_id not in known or known[task_id] != updated]
+    removed = known.keys() - current.keys()
+    finalized = month_is_final(end_ms)
+    if not changed and not removed and not finalized:
+        return True
+    # A throwaway snapshot of just the changed tasks, so they're credited exactly as a full scan would
+    snapshot = QuotaSnapshot(year, month, first_ms, end_ms, roster)
+    department_by_list = {str(list_id): dept for dept, list_id in lists.items()}
+    for task in mirror.get_tasks(changed):
+        snapshot.add(department_by_list[task['list_id']], snapshot.project_mirrored(task))
+    credits = {task_id: snapshot.task_credits.get(task_id, []) for task_id in [*changed, *removed]}
+    store.apply_task_changes(year, month, credits, {task_id: current[task_id] for task_id in changed}, finalized)
+    return True
+
+
+async def materialize_month(usernames, year: int = None, month: int = None, month_offset: int = 0, concurrency: int = 4):
+    """
+    Make sure the month's aggregates cover `usernames` and return its (year, month).
+
+    Finalized months that already cover every name are served as stored. An open month already
+    computed from the task mirror for these names only re-counts the tasks changed since.
+    Anything else (the first computation, new names, or a mirror that isn't ready) is recomputed
+    from the shared quota snapshot and written back.
+    """
+    year, month, first_ms, end_ms = month_window(year, month, month_offset)
+    store = get_quota_store()
+    state = store.month_state(year, month)
+    usernames = set(usernames)
+    if state and usernames.issubset(state['roster']):
+        if state['finalized'] or _apply_mirror_changes(store, year, month, first_ms, end_ms, sorted(state['roster'])):
+            return year, month
+    roster = usernames | (state['roster'] if state else set())
+    mirror = get_mirror()
+    lists = department_list_ids().values()
+    task_updates = None
+    max_age = SNAPSHOT_TTL_SECONDS
+    if mirror.is_ready(lists) and mirror.covers(roster):
+        # Taken before the scan: a task edited in between is just re-counted next time
+        task_updates = mirror.updated_ids(lists, due_date_gt=first_ms, due_date_lt=end_ms)
+        # A cached snapshot may predate task_updates, so rebuild it (from the mirror, no API calls)
+        max_age = 0
+    snapshot = await get_quota_snapshot(year, month, roster=roster, max_age=max_age, concurrency=concurrency)
+    if snapshot.source != 'mirror':
+        task_updates = None
+    # A month is only frozen from a complete scan
+    store.save(snapshot, finalized=month_is_final(end_ms) and not snapshot.errors,
+               task_updates=task_updates, roster_hash=mirror.roster_hash)
+    return year, month
+
+
+async def get_monthly_counts(usernames, year: int = None, month: int = None, month_offset: int = 0, concurrency: int = 4) -> dict:
+    usernames = list(usernames)
+    year, month = await materialize_month(usernames, year, month, month_offset, concurrency)
+    return get_quota_store().counts(year, month, usernames)
+
+
+async def get_monthly_leaderboard(usernames, year: int = None, month: int = None, month_offset: int = 0, column: str = 'host') -> list:
+    """[(username, count)] highest first; names without any credit that month are listed last with 0."""
+    usernames = list(usernames)
+    year, month = await materialize_month(usernames, year, month, month_offset)
+    ranked = get_quota_store().leaderboard(year, month, usernames, column=column)
+    ranked_names = {username for username, _ in ranked}
+    return ranked + [(username, 0) for username in usernames if username not in ranked_names]
+
+
+class LeaderboardSource:
+    """
+    Page source for a LazyPaginator over a month's leaderboard, read a page at a time from the table.
+
+    The month is materialized once, on the first page asked for. As with `get_monthly_leaderboard`,
+    names without any credit follow the ranked ones with 0.
+    """
+
+    def __init__(self, usernames, year: int = None, month: int = None, month_offset: int = 0, column: str = 'host'):
+        self.usernames = list(dict.fromkeys(usernames))
+        self.year, self.month, self.month_offset = year, month, month_offset
+        self.column = column
+        self._unranked = None
+        self._lock = asyncio.Lock()
+
+    async def _ready(self):
+        async with self._lock:
+            if self._unranked is None:
+                self.year, self.month = await materialize_month(self.usernames, self.year, self.month, self.month_offset)
+                ranked = get_quota_store().ranked_usernames(self.year, self.month, self.usernames)
+                self._unranked = [username for username in self.usernames if username not in ranked]
+
+    async def count(self):
+        await self._ready()
+        return len(self.usernames)
+
+    async def get_page(self, index: int, size: int) -> list:
+        await self._ready()
+        start = index * size
+        ranked_total = len(self.usernames) - len(self._unranked)
+        rows = []
+        if start < ranked_total:
+            rows = get_quota_store().leaderboard(self.year, self.month, self.usernames, column=self.column, limit=size, offset=start)
+        zero_start = max(start - ranked_total, 0)
+        return rows + [(username, 0) for username in self._unranked[zero_start:zero_start + size - len(rows)]]
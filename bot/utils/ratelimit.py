@@ -0,0 +1,200 @@
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import contextlib
+import contextvars
+import aiohttp
+
+# Lower value is served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Priority for ClickUp requests made from the current task; interactive handlers opt in with `interactive()`
+request_priority = contextvars.ContextVar('request_priority', default=BACKGROUND)
+
+
+def mark_interactive():
+    """Treat the rest of the current task's ClickUp requests as user-facing (each command runs in its own task)."""
+    request_priority.set(INTERACTIVE)
+
+
+@contextlib.contextmanager
+def interactive():
+    """Mark ClickUp requests made inside this block (and tasks spawned from it) as user-facing."""
+    token = request_priority.set(INTERACTIVE)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+def _header_int(headers, name):
+    try:
+        return int(float(headers.get(name)))
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """
+    Token-bucket scheduler that every ClickUp request goes through.
+
+    The bucket starts from `limit` requests per `period` seconds and is corrected from the
+    X-RateLimit-Limit/Remaining/Reset headers of each response. Waiting requests are granted
+    in priority order (interactive before background), then FIFO. 429 and 5xx answers, as
+    well as connection errors, are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, limit: int = 100, period: float = 60.0, max_in_flight: int = 10,
+                 max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.capacity = float(limit)
+        self.period = period
+        self.rate = limit / period
+        self.tokens = float(limit)
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiting = []
+        self._seq = itertools.count()
+        self._cond = asyncio.Condition()
+        # Counters
+        self.in_flight = 0
+        self.completed = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failed = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiting)
+
+    def stats(self) -> dict:
+        return {
+            'queued': self.queued,
+            'queued_interactive': sum(1 for priority, _ in self._waiting if priority == INTERACTIVE),
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'throttled': self.throttled,
+            'retries': self.retries,
+            'failed': self.failed,
+            'tokens': round(self.tokens, 2),
+            'limit': int(self.capacity),
+        }
+
+    # --- Token bucket ---
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take_token(self) -> float:
+        """Take a token and return 0, or return how many seconds until one is available."""
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def feedback(self, headers):
+        """Correct the bucket from ClickUp's X-RateLimit-* response headers."""
+        if not headers:
+            return
+        limit = _header_int(headers, 'X-RateLimit-Limit')
+        remaining = _header_int(headers, 'X-RateLimit-Remaining')
+        reset = _header_int(headers, 'X-RateLimit-Reset')
+        now = time.monotonic()
+        self._refill(now)
+        if limit:
+            self.capacity = float(limit)
+            self.rate = limit / self.period
+        if remaining is not None:
+            self.tokens = min(self.tokens, float(remaining))
+            if remaining <= 0 and reset:
+                # Reset is a unix timestamp; hold every request until the window rolls over
+                self._blocked_until = max(self._blocked_until, now + max(0.0, reset - time.time()))
+
+    # --- Admission ---
+
+    async def acquire(self, priority: int = BACKGROUND):
+        async with self._cond:
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    delay = None
+                    if self._waiting[0] == entry and self.in_flight < self.max_in_flight:
+                        delay = self._try_take_token()
+                        if delay == 0:
+                            heapq.heappop(self._waiting)
+                            self.in_flight += 1
+                            # The next waiter in line may be able to go too
+                            self._cond.notify_all()
+                            return
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                self._cond.notify_all()
+                raise
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+    async def run(self, send, priority: int = None):
+        """
+        Run `send()` under the scheduler, retrying throttled and failed attempts.
+
+        `send` is a coroutine function returning (status, headers, body). The last attempt's
+        result is returned even if it is still a 429/5xx; connection errors from the last
+        attempt are raised.
+        """
+        priority = request_priority.get() if priority is None else priority
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(priority)
+            try:
+                status, headers, body = await send()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    raise
+                status = None
+            finally:
+                # Release before any backoff so a sleeping retry doesn't hold a slot
+                await self.release()
+            if status is None:
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            self.feedback(headers)
+            if status == 429 or status >= 500:
+                if status == 429:
+                    self.throttled += 1
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    return status, headers, body
+                self.retries += 1
+                delay = self._backoff(attempt)
+                reset = _header_int(headers, 'X-RateLimit-Reset') if status == 429 else None
+                if reset:
+                    delay = max(delay, reset - time.time())
+                await asyncio.sleep(min(delay, self.max_delay))
+                continue
+            self.completed += 1
+            return status, headers, body
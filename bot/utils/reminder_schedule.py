@@ -0,0 +1,115 @@
+import time
+import heapq
+import asyncio
+import itertools
+from collections import namedtuple, defaultdict
+
+# One DM to one user about one task at one interval ('24h', '10h', '2h', '30m' or '15m')
+ReminderJob = namedtuple('ReminderJob', ['fire_at', 'task_id', 'discord_id', 'label', 'embed_num', 'department', 'task'])
+
+
+def job_key(job: ReminderJob) -> tuple:
+    return job.discord_id, job.task_id, job.label
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+class ReminderSchedule:
+    """
+    Min-heap of reminder jobs keyed by (discord_id, task_id, label), run by a single task
+    that sleeps until the earliest deadline.
+
+    Jobs are replaced per task with `set_task_jobs`, so a rescheduled or cancelled training
+    only touches its own entries. Superseded heap entries are skipped lazily when they
+    reach the top, which keeps every change O(log n).
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._jobs = {}
+        self._by_task = defaultdict(set)
+        # key -> fire_at of jobs already run, so a refresh doesn't schedule them again
+        self._done = {}
+        self._seq = itertools.count()
+        self._changed = asyncio.Event()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def _push(self, job: ReminderJob):
+        earliest = self._peek()
+        heapq.heappush(self._heap, (job.fire_at, next(self._seq), job_key(job)))
+        if earliest is None or job.fire_at < earliest[0]:
+            # The runner is sleeping towards a later deadline
+            self._changed.set()
+
+    def _is_current(self, entry) -> bool:
+        job = self._jobs.get(entry[2])
+        return job is not None and job.fire_at == entry[0]
+
+    def _peek(self):
+        while self._heap and not self._is_current(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def set_task_jobs(self, task_id, jobs):
+        """Make `jobs` the complete set of pending reminders for `task_id`."""
+        new = {}
+        for job in jobs:
+            key = job_key(job)
+            if self._done.get(key) == job.fire_at:
+                continue
+            new[key] = job
+        for key in self._by_task.pop(task_id, set()) - new.keys():
+            self._jobs.pop(key, None)
+        for key, job in new.items():
+            previous = self._jobs.get(key)
+            self._jobs[key] = job
+            if previous is None or previous.fire_at != job.fire_at:
+                self._push(job)
+        if new:
+            self._by_task[task_id] = set(new)
+
+    def retain_tasks(self, task_ids) -> list:
+        """Drop every task not in `task_ids` (no longer scheduled, or outside the window) and return the dropped ids."""
+        task_ids = set(task_ids)
+        dropped = [task_id for task_id in self._by_task if task_id not in task_ids]
+        for task_id in dropped:
+            self.set_task_jobs(task_id, [])
+        self._done = {key: fire_at for key, fire_at in self._done.items() if key[1] in task_ids}
+        return dropped
+
+    def _take(self, entry) -> ReminderJob:
+        heapq.heappop(self._heap)
+        key = entry[2]
+        job = self._jobs.pop(key)
+        task_keys = self._by_task.get(job.task_id)
+        if task_keys is not None:
+            task_keys.discard(key)
+            if not task_keys:
+                del self._by_task[job.task_id]
+        self._done[key] = job.fire_at
+        return job
+
+    async def run(self, fire):
+        """Call `await fire(job)` for each job when its time comes. Runs until cancelled."""
+        while True:
+            self._changed.clear()
+            entry = self._peek()
+            if entry is None:
+                await self._changed.wait()
+                continue
+            delay = (entry[0] - _now_ms()) / 1000
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            job = self._take(entry)
+            try:
+                await fire(job)
+            except Exception as e:
+                print(f"[Reminders] Reminder {job.label} for {job.discord_id} on task {job.task_id} failed: {e}")
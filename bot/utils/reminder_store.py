@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from bot.utils.reminder_schedule import ReminderJob
+
+SCHEDULED = 'scheduled'
+DELIVERED = 'delivered'
+SKIPPED = 'skipped'
+
+# How late a reminder may still be sent, e.g. after a restart; never past the training itself
+CATCH_UP_GRACE_MS = int(os.getenv('REMINDER_CATCH_UP_GRACE_MINUTES', '30')) * 60 * 1000
+
+# Delivered/skipped rows are kept this long so a late refresh can't schedule them again
+RETAIN_MS = 3 * 24 * 60 * 60 * 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminder_jobs (
+    discord_id INTEGER NOT NULL,
+    task_id TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    fire_at INTEGER NOT NULL,
+    due_date INTEGER,
+    status TEXT NOT NULL,
+    embed_num INTEGER,
+    department TEXT,
+    task TEXT,
+    updated_at INTEGER,
+    PRIMARY KEY (discord_id, task_id, interval)
+);
+CREATE INDEX IF NOT EXISTS reminder_jobs_status_fire_at ON reminder_jobs (status, fire_at);
+CREATE TABLE IF NOT EXISTS reminder_runs (
+    name TEXT PRIMARY KEY,
+    last_run TEXT
+);
+"""
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+class ReminderStore:
+    """
+    SQLite record of every reminder the bot has scheduled or delivered.
+
+    Rows are keyed by (discord_id, task_id, interval), which doubles as the idempotency key:
+    `claim` flips a row from scheduled to delivered exactly once, and only the caller that
+    wins the claim sends the DM. A training whose due date moves gets its reminders back.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv('REMINDER_STORE_PATH', 'reminders.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+
+    @staticmethod
+    def _row_to_job(row) -> ReminderJob:
+        return ReminderJob(row['fire_at'], row['task_id'], row['discord_id'], row['interval'],
+                           row['embed_num'], row['department'], json.loads(row['task'] or '{}'))
+
+    def schedule(self, jobs):
+        """
+        Record jobs as scheduled and return the ones that still need sending.
+
+        Jobs already delivered or skipped at the same fire time are left alone; a different
+        fire time means the training moved, so the job is scheduled again.
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return []
+        pending = []
+        now_ms = _now_ms()
+        with self._lock:
+            for job in jobs:
+                row = self._conn.execute(
+                    "SELECT fire_at, status FROM reminder_jobs WHERE discord_id = ? AND task_id = ? AND interval = ?",
+                    (job.discord_id, job.task_id, job.label)
+                ).fetchone()
+                if row and row['status'] != SCHEDULED and row['fire_at'] == job.fire_at:
+                    continue
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO reminder_jobs (discord_id, task_id, interval, fire_at, due_date, status, embed_num, department, task, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job.discord_id, job.task_id, job.label, job.fire_at, int(job.task.get('due_date') or 0) or None,
+                     SCHEDULED, job.embed_num, job.department, json.dumps(job.task), now_ms)
+                )
+                pending.append(job)
+            self._conn.commit()
+        return pending
+
+    def cancel_task(self, task_id, keep=()):
+        """Drop scheduled (not delivered) jobs of a task, except the (discord_id, interval) pairs in `keep`."""
+        keep = set(keep)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT discord_id, interval FROM reminder_jobs WHERE task_id = ? AND status = ?", (task_id, SCHEDULED)).fetchall()
+            self._conn.executemany(
+                "DELETE FROM reminder_jobs WHERE discord_id = ? AND task_id = ? AND interval = ?",
+                [(row['discord_id'], task_id, row['interval']) for row in rows if (row['discord_id'], row['interval']) not in keep]
+            )
+            self._conn.commit()
+
+    def claim(self, job: ReminderJob) -> bool:
+        """Mark a job delivered. Returns False if it was already delivered, skipped or cancelled."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE reminder_jobs SET status = ?, updated_at = ? WHERE discord_id = ? AND task_id = ? AND interval = ? AND fire_at = ? AND status = ?",
+                (DELIVERED, _now_ms(), job.discord_id, job.task_id, job.label, job.fire_at, SCHEDULED)
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def claim_key(self, discord_id, task_id, interval) -> bool:
+        """Record a one-off delivery (no scheduled job) once per key; False if it was already recorded."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO reminder_jobs (discord_id, task_id, interval, fire_at, status, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (discord_id, task_id, interval, _now_ms(), DELIVERED, _now_ms())
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def skip(self, job: ReminderJob):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE reminder_jobs SET status = ?, updated_at = ? WHERE discord_id = ? AND task_id = ? AND interval = ? AND status = ?",
+                (SKIPPED, _now_ms(), job.discord_id, job.task_id, job.label, SCHEDULED)
+            )
+            self._conn.commit()
+
+    def recover(self, grace_ms: int = CATCH_UP_GRACE_MS):
+        """
+        Return scheduled jobs to load after a restart. Jobs missed by more than `grace_ms`,
+        or whose training already started, are marked skipped instead.
+        """
+        now_ms = _now_ms()
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM reminder_jobs WHERE status = ?", (SCHEDULED,)).fetchall()
+            stale = [row for row in rows
+                     if row['fire_at'] + grace_ms < now_ms or (row['due_date'] and row['due_date'] <= now_ms)]
+            self._conn.executemany(
+                "UPDATE reminder_jobs SET status = ?, updated_at = ? WHERE discord_id = ? AND task_id = ? AND interval = ?",
+                [(SKIPPED, now_ms, row['discord_id'], row['task_id'], row['interval']) for row in stale]
+            )
+            self._conn.execute("DELETE FROM reminder_jobs WHERE status != ? AND updated_at < ?", (SCHEDULED, now_ms - RETAIN_MS))
+            self._conn.commit()
+        stale_keys = {(row['discord_id'], row['task_id'], row['interval']) for row in stale}
+        return [self._row_to_job(row) for row in rows if (row['discord_id'], row['task_id'], row['interval']) not in stale_keys]
+
+    # --- Daily runs ---
+
+    def last_run(self, name: str):
+        with self._lock:
+            row = self._conn.execute("SELECT last_run FROM reminder_runs WHERE name = ?", (name,)).fetchone()
+        return row['last_run'] if row else None
+
+    def mark_run(self, name: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO reminder_runs (name, last_run) VALUES (?, ?)", (name, value))
+            self._conn.commit()
+
+
+_store = None
+
+
+def get_reminder_store() -> ReminderStore:
+    """Return the process-wide reminder store."""
+    global _store
+    if _store is None:
+        _store = ReminderStore()
+    return _store
@@ -0,0 +1,102 @@
+import time
+import asyncio
+from collections import OrderedDict
+
+
+class SingleFlightCache:
+    """
+    Short-lived cache of response bodies with request coalescing.
+
+    Concurrent `get` calls for the same key share one in-flight fetch; the body it returns is
+    kept for `ttl` seconds. Entries are evicted least-recently-used once their combined size
+    passes `max_bytes`. Values are stored as the raw text so every caller decodes its own copy
+    and can't change what the next caller sees. Failed fetches are not cached.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_bytes: int = 32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, body)
+        self._in_flight = {}
+        # Bumped by clear(); a fetch started under an older generation doesn't store its body
+        self._generation = 0
+        self.size = 0
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _discard(self, key):
+        _, body = self._entries.pop(key)
+        self.size -= len(body)
+
+    def _store(self, key, body: str):
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._discard(key)
+        self._entries[key] = (time.monotonic() + self.ttl, body)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+
+    async def _fetch(self, key, fetch, generation: int) -> str:
+        try:
+            body = await fetch()
+            if self.ttl > 0 and generation == self._generation:
+                self._store(key, body)
+            return body
+        finally:
+            if generation == self._generation:
+                del self._in_flight[key]
+
+    async def get(self, key, fetch) -> str:
+        """Return the cached body for `key`, or `await fetch()` once on behalf of every caller waiting on it."""
+        if self.ttl > 0:
+            body = self._lookup(key)
+            if body is not None:
+                self.hits += 1
+                return body
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # Its own task (copying the caller's context, so its priority too), which keeps
+            # running for the other waiters if the caller that started it is cancelled
+            task = self._in_flight[key] = asyncio.create_task(self._fetch(key, fetch, self._generation))
+            # Mark a failure retrieved so one nobody is left waiting on isn't reported as unhandled
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        # shield: a caller being cancelled, the first one included, must not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    def clear(self):
+        """
+        Drop every cached body. In-flight fetches still complete for their waiters, but may have
+        read the data from before a write, so they aren't cached and later callers fetch afresh.
+        """
+        self._generation += 1
+        self._entries.clear()
+        self._in_flight.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'hits': self.hits,
+            'coalesced': self.coalesced,
+            'misses': self.misses,
+        }
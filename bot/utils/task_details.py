@@ -0,0 +1,85 @@
+import time
+import asyncio
+from collections import namedtuple, OrderedDict
+from bot.utils.clickup_api import get_client
+from bot.utils.task_mirror import get_mirror
+
+# Everything >find shows for a task. `comments`/`history` are None when their request failed.
+TaskDetails = namedtuple('TaskDetails', ['task', 'comments', 'history'])
+
+# Served without asking ClickUp at all within this window
+FRESH_SECONDS = 60
+
+MAX_ENTRIES = 256
+
+
+def _updated(task) -> int:
+    try:
+        return int(task.get('date_updated') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class TaskDetailsCache:
+    """
+    Per-task cache of a task with its comments and history, revalidated against `date_updated`.
+
+    A miss fetches the three in parallel. Past FRESH_SECONDS a cached entry is checked first
+    against the task mirror (no request, only while the task's list is synced and fresh) and
+    then against a fresh `/task/{id}`; comments and history are only fetched again when
+    `date_updated` moved.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # task_id -> (checked_at, TaskDetails)
+
+    async def _fetch_extras(self, client, task_id):
+        comments, history = await asyncio.gather(
+            client.get_task_comments(task_id), client.get_task_history(task_id), return_exceptions=True)
+        return (None if isinstance(comments, Exception) else comments,
+                None if isinstance(history, Exception) else history)
+
+    def _remember(self, task_id, details: TaskDetails) -> TaskDetails:
+        self._entries[task_id] = (time.monotonic(), details)
+        self._entries.move_to_end(task_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return details
+
+    async def get(self, task_id: str, client=None) -> TaskDetails:
+        """Raises ClickUpError if the task itself can't be fetched."""
+        client = client or get_client()
+        entry = self._entries.get(task_id)
+        if entry is not None:
+            checked_at, cached = entry
+            if time.monotonic() - checked_at < FRESH_SECONDS:
+                return cached
+            mirror = get_mirror()
+            mirrored = mirror.get_task(task_id)
+            # Only a recently synced mirror can vouch for the task not having changed
+            if (mirrored is not None and mirror.is_ready([mirrored['list_id']])
+                    and _updated(mirrored) == _updated(cached.task)):
+                return self._remember(task_id, cached)
+            task = await client.get_task(task_id, include_markdown=True)
+            if _updated(task) == _updated(cached.task) and cached.comments is not None and cached.history is not None:
+                return self._remember(task_id, cached._replace(task=task))
+            comments, history = await self._fetch_extras(client, task_id)
+            return self._remember(task_id, TaskDetails(task, comments, history))
+        task, (comments, history) = await asyncio.gather(
+            client.get_task(task_id, include_markdown=True), self._fetch_extras(client, task_id))
+        return self._remember(task_id, TaskDetails(task, comments, history))
+
+    def invalidate(self, task_id: str):
+        self._entries.pop(task_id, None)
+
+
+_cache = None
+
+
+def get_task_details_cache() -> TaskDetailsCache:
+    """Return the process-wide task details cache."""
+    global _cache
+    if _cache is None:
+        _cache = TaskDetailsCache()
+    return _cache
@@ -0,0 +1,323 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from bot.utils.clickup_api import get_client
+from bot.utils.name_matcher import get_matcher
+from bot.utils.roblox_users import ROBLOX_USERS
+from bot.utils.task_streams import iter_task_streams
+
+DEPARTMENT_LIST_KEYS = {
+    "Driving Department": 'CLICKUP_LIST_ID_DRIVING_DEPARTMENT',
+    "Dispatching Department": 'CLICKUP_LIST_ID_DISPATCHING_DEPARTMENT',
+    "Guarding Department": 'CLICKUP_LIST_ID_GUARDING_DEPARTMENT',
+    "Signalling Department": 'CLICKUP_LIST_ID_SIGNALLING_DEPARTMENT',
+}
+
+# A list whose last successful sync is older than this is not trusted, callers fall back to the API
+STALE_AFTER_MS = 30 * 60 * 1000
+
+# Incremental syncs ask for tasks updated since this long before the watermark, so an update
+# ClickUp made visible late (or stamped with a skewed clock) isn't skipped; re-upserting is harmless
+WATERMARK_OVERLAP_MS = 5 * 60 * 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    list_id TEXT NOT NULL,
+    status TEXT,
+    archived INTEGER NOT NULL DEFAULT 0,
+    due_date INTEGER,
+    date_closed INTEGER,
+    date_created INTEGER,
+    date_updated INTEGER,
+    name TEXT,
+    url TEXT,
+    assignee_emails TEXT,
+    description_hash TEXT,
+    description_mentions TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_list_status_due ON tasks (list_id, status, due_date);
+CREATE TABLE IF NOT EXISTS sync_state (
+    list_id TEXT PRIMARY KEY,
+    watermark INTEGER,
+    roster_hash TEXT,
+    last_sync INTEGER,
+    last_full_sync INTEGER
+);
+"""
+
+_COLUMNS = ('id', 'list_id', 'status', 'archived', 'due_date', 'date_closed', 'date_created', 'date_updated',
+            'name', 'url', 'assignee_emails', 'description_hash', 'description_mentions')
+
+
+def department_list_ids():
+    """Map department name -> ClickUp list id for every configured department."""
+    return {dept: os.getenv(key) for dept, key in DEPARTMENT_LIST_KEYS.items() if os.getenv(key)}
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+class TaskMirror:
+    """
+    Local SQLite copy of the department lists holding a compact projection of each task.
+
+    Descriptions are not stored; only their hash and the roster names they mention, which is
+    all quota counting needs. Changing the roster forces a full resync of every list.
+    """
+
+    def __init__(self, path: str = None, roster=None):
+        self.path = path or os.getenv('TASK_MIRROR_PATH', 'task_mirror.sqlite3')
+        self.set_roster(roster if roster is not None else ROBLOX_USERS)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+        self._sync_lock = asyncio.Lock()
+
+    def set_roster(self, roster):
+        """Set the names description mentions are computed for; a changed roster makes the next sync a full one."""
+        roster = sorted({username for username in roster if username})
+        self.roster = roster
+        self.roster_hash = hashlib.sha1('\n'.join(roster).encode()).hexdigest()
+        self._matcher = get_matcher(roster)
+
+    def covers(self, usernames) -> bool:
+        """Whether description mentions were computed for every one of `usernames`."""
+        roster = {u.lower() for u in self.roster}
+        return all(u and u.lower() in roster for u in usernames)
+
+    # --- Projection ---
+
+    def mentions(self, text: str):
+        if not text:
+            return []
+        return sorted(self._matcher.find(text))
+
+    def project(self, task: dict, list_id, archived: bool) -> tuple:
+        description = task.get('description') or ''
+        emails = [a.get('email') for a in task.get('assignees', []) if a.get('email')]
+        status = task.get('status')
+        status = status.get('status') if isinstance(status, dict) else status
+        return (
+            task.get('id'),
+            str(list_id),
+            (status or '').lower(),
+            1 if archived else 0,
+            _int_or_none(task.get('due_date')),
+            _int_or_none(task.get('date_closed')),
+            _int_or_none(task.get('date_created')),
+            _int_or_none(task.get('date_updated')),
+            task.get('name') or '',
+            task.get('url'),
+            json.dumps(emails),
+            hashlib.sha1(description.encode()).hexdigest() if description else None,
+            json.dumps(self.mentions(description)),
+        )
+
+    @staticmethod
+    def _row_to_task(row) -> dict:
+        # Shaped like the ClickUp fields callers already read, so they work on either source
+        due_date = row['due_date']
+        return {
+            'id': row['id'],
+            'list_id': row['list_id'],
+            'name': row['name'],
+            'url': row['url'],
+            'status': {'status': row['status']},
+            'archived': bool(row['archived']),
+            'due_date': str(due_date) if due_date is not None else None,
+            'date_closed': row['date_closed'],
+            'date_created': row['date_created'],
+            'date_updated': row['date_updated'],
+            'assignees': [{'email': email} for email in json.loads(row['assignee_emails'] or '[]')],
+            'description_hash': row['description_hash'],
+            'description_mentions': json.loads(row['description_mentions'] or '[]'),
+        }
+
+    # --- Storage ---
+
+    def upsert(self, rows):
+        if not rows:
+            return
+        placeholders = ', '.join('?' for _ in _COLUMNS)
+        with self._lock:
+            self._conn.executemany(f"INSERT OR REPLACE INTO tasks ({', '.join(_COLUMNS)}) VALUES ({placeholders})", rows)
+            self._conn.commit()
+
+    def delete(self, task_ids):
+        with self._lock:
+            self._conn.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in task_ids])
+            self._conn.commit()
+
+    def get_task(self, task_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._row_to_task(row) if row else None
+
+    def get_tasks(self, task_ids) -> list:
+        """The mirrored tasks among `task_ids`, as ClickUp-shaped dicts."""
+        task_ids = list(task_ids)
+        rows = []
+        with self._lock:
+            for i in range(0, len(task_ids), 500):
+                chunk = task_ids[i:i + 500]
+                rows += self._conn.execute(
+                    f"SELECT * FROM tasks WHERE id IN ({', '.join('?' for _ in chunk)})", chunk).fetchall()
+        return [self._row_to_task(row) for row in rows]
+
+    def updated_ids(self, list_ids, due_date_gt=None, due_date_lt=None) -> dict:
+        """Map task id -> date_updated for the lists' tasks due within the (exclusive) bounds, whatever their status."""
+        list_ids = [str(list_id) for list_id in list_ids if list_id]
+        if not list_ids:
+            return {}
+        sql = f"SELECT id, date_updated FROM tasks WHERE list_id IN ({', '.join('?' for _ in list_ids)})"
+        params = list(list_ids)
+        if due_date_gt is not None:
+            sql += " AND due_date > ?"
+            params.append(int(due_date_gt))
+        if due_date_lt is not None:
+            sql += " AND due_date < ?"
+            params.append(int(due_date_lt))
+        with self._lock:
+            return {row['id']: row['date_updated'] for row in self._conn.execute(sql, params)}
+
+    def query(self, list_ids, statuses=None, archived=None, due_date_gt=None, due_date_lt=None):
+        """Return mirrored tasks as ClickUp-shaped dicts. Due date bounds are exclusive, as in the API."""
+        list_ids = [str(list_id) for list_id in list_ids if list_id]
+        if not list_ids:
+            return []
+        sql = f"SELECT * FROM tasks WHERE list_id IN ({', '.join('?' for _ in list_ids)})"
+        params = list(list_ids)
+        if statuses:
+            sql += f" AND status IN ({', '.join('?' for _ in statuses)})"
+            params.extend(status.lower() for status in statuses)
+        if archived is not None:
+            sql += " AND archived = ?"
+            params.append(1 if archived else 0)
+        if due_date_gt is not None:
+            sql += " AND due_date > ?"
+            params.append(int(due_date_gt))
+        if due_date_lt is not None:
+            sql += " AND due_date < ?"
+            params.append(int(due_date_lt))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_to_task(row) for row in rows]
+
+    def _state(self, list_id):
+        with self._lock:
+            return self._conn.execute("SELECT * FROM sync_state WHERE list_id = ?", (str(list_id),)).fetchone()
+
+    def is_ready(self, list_ids=None) -> bool:
+        """Whether every list has been fully synced with the current roster and recently refreshed."""
+        list_ids = list_ids if list_ids is not None else department_list_ids().values()
+        now_ms = _now_ms()
+        for list_id in list_ids:
+            if not list_id:
+                continue
+            state = self._state(list_id)
+            if (not state or not state['last_full_sync'] or state['roster_hash'] != self.roster_hash
+                    or now_ms - (state['last_sync'] or 0) > STALE_AFTER_MS):
+                return False
+        return True
+
+    # --- Sync ---
+
+    async def sync_list(self, list_id, full: bool = False, client=None):
+        """
+        Pull tasks changed since the list's watermark (`date_updated_gt`, less WATERMARK_OVERLAP_MS) into the mirror.
+
+        A full sync also happens on first run or when the roster changed; it refetches the
+        whole list and drops rows ClickUp no longer returns (deleted or moved tasks).
+        """
+        state = self._state(list_id)
+        full = full or not state or not state['last_full_sync'] or state['roster_hash'] != self.roster_hash
+        watermark = None if full else state['watermark']
+        extra_params = [('date_updated_gt', str(max(watermark - WATERMARK_OVERLAP_MS, 0)))] if watermark else []
+        started_ms = _now_ms()
+        seen_ids = set()
+        new_watermark = watermark or 0
+        async for result in iter_task_streams(
+            [(list_id, False), (list_id, True)],
+            client=client,
+            include_closed=True,
+            extra_params=extra_params
+        ):
+            if result.error is not None:
+                raise result.error
+            # Matching the roster against descriptions is CPU work, keep it off the loop
+            rows = await asyncio.to_thread(lambda r=result: [self.project(task, list_id, r.archived) for task in r.tasks])
+            self.upsert(rows)
+            for row in rows:
+                seen_ids.add(row[0])
+                new_watermark = max(new_watermark, row[7] or 0)
+        with self._lock:
+            if full:
+                known = {r['id'] for r in self._conn.execute("SELECT id FROM tasks WHERE list_id = ?", (str(list_id),))}
+                self._conn.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in known - seen_ids])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (list_id, watermark, roster_hash, last_sync, last_full_sync) VALUES (?, ?, ?, ?, ?)",
+                (str(list_id), new_watermark or None, self.roster_hash, started_ms,
+                 started_ms if full else state['last_full_sync'])
+            )
+            self._conn.commit()
+        return len(seen_ids)
+
+    async def sync(self, full: bool = False, client=None):
+        """Sync every configured department list. Returns {list_id: tasks pulled or the exception}."""
+        async with self._sync_lock:
+            list_ids = list(department_list_ids().values())
+            results = await asyncio.gather(
+                *(self.sync_list(list_id, full=full, client=client) for list_id in list_ids),
+                return_exceptions=True
+            )
+            return dict(zip(list_ids, results))
+
+
+_mirror = None
+
+
+def get_mirror() -> TaskMirror:
+    """Return the process-wide task mirror."""
+    global _mirror
+    if _mirror is None:
+        _mirror = TaskMirror()
+    return _mirror
+
+
+async def fetch_list_tasks(list_id, archived: bool = False, statuses=None, include_closed: bool = False,
+                           due_date_gt: int = None, due_date_lt: int = None) -> list:
+    """
+    Return a list's tasks matching the filters, from the mirror when it is ready, otherwise from ClickUp.
+
+    Raises ClickUpError when the API fallback fails.
+    """
+    mirror = get_mirror()
+    if mirror.is_ready([list_id]):
+        return mirror.query([list_id], statuses=statuses, archived=archived, due_date_gt=due_date_gt, due_date_lt=due_date_lt)
+    tasks = []
+    async for _, page_tasks in get_client().iter_list_tasks(
+        list_id,
+        archived=archived,
+        statuses=statuses,
+        include_closed=include_closed,
+        due_date_gt=due_date_gt,
+        due_date_lt=due_date_lt
+    ):
+        tasks.extend(page_tasks)
+    return tasks
@@ -0,0 +1,70 @@
+def _int_or_none(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _status(task: dict) -> str:
+    status = task.get('status')
+    status = status.get('status') if isinstance(status, dict) else status
+    return (status or '').lower()
+
+
+class TaskRecord:
+    """
+    Compact projection of a ClickUp task: only the fields quota counting, /check and the
+    reminders read.
+
+    The description is reduced to the roster names it mentions, so a month of tasks no longer
+    keeps every description, custom field, checklist and watcher alive until counting ends.
+    Built from an API page with `from_clickup` (the page can be dropped right after) or from a
+    task mirror row with `from_mirror`.
+    """
+
+    __slots__ = ('id', 'list_id', 'status', 'archived', 'due_date', 'name', 'url', 'emails', 'mentions')
+
+    def __init__(self, id, list_id, status: str, archived: bool, due_date, name: str, url, emails: tuple, mentions: tuple):
+        self.id = id
+        self.list_id = list_id
+        self.status = status
+        self.archived = archived
+        self.due_date = due_date
+        self.name = name
+        self.url = url
+        self.emails = emails
+        self.mentions = mentions
+
+    @classmethod
+    def from_clickup(cls, task: dict, list_id, archived: bool, matcher) -> 'TaskRecord':
+        """Project an API task; `matcher` (a NameMatcher) finds the roster names in its description."""
+        description = task.get('description') or ''
+        return cls(
+            task.get('id'),
+            str(list_id),
+            _status(task),
+            bool(task.get('archived', archived)),
+            _int_or_none(task.get('due_date')),
+            task.get('name') or '',
+            task.get('url'),
+            tuple(a['email'] for a in task.get('assignees', ()) if a.get('email')),
+            tuple(sorted(matcher.find(description))) if description else (),
+        )
+
+    @classmethod
+    def from_mirror(cls, task: dict) -> 'TaskRecord':
+        """Wrap a task from `TaskMirror.query`, whose mentions were computed when it was mirrored."""
+        return cls(
+            task['id'],
+            task['list_id'],
+            _status(task),
+            bool(task.get('archived')),
+            _int_or_none(task.get('due_date')),
+            task.get('name') or '',
+            task.get('url'),
+            tuple(a['email'] for a in task.get('assignees', ()) if a.get('email')),
+            tuple(task.get('description_mentions') or ()),
+        )
+
+    def __repr__(self):
+        return f"TaskRecord(id={self.id!r}, status={self.status!r}, name={self.name!r})"
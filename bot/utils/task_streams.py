@@ -0,0 +1,67 @@
+import asyncio
+from collections import namedtuple
+from bot.utils.clickup_api import get_client, is_last_page
+
+# One page of one (list, archived) stream. `error` is set instead of `tasks` when the stream failed.
+StreamPage = namedtuple('StreamPage', ['list_id', 'archived', 'page', 'tasks', 'error'])
+
+_DONE = object()
+
+
+async def iter_task_streams(streams, concurrency: int = 4, prefetch: int = 1, max_pages: int = 1000, client=None, **filters):
+    """
+    Page through several (list_id, archived) task queries at once and yield pages as they arrive.
+
+    Parameters
+    - streams: iterable of (list_id, archived) pairs, each paged independently
+    - concurrency: maximum number of ClickUp requests in flight across all streams
+    - prefetch: pages each stream may fetch ahead of the consumer
+    - filters: passed through to `ClickUpClient.get_list_tasks_page` (statuses, due_date_gt, ...)
+
+    Pages from different streams interleave, so callers that care about duplicates across
+    streams must dedup by task id themselves. A failing stream yields one StreamPage with
+    `error` set and stops; the others carry on.
+    """
+    client = client or get_client()
+    streams = [(list_id, archived) for list_id, archived in streams if list_id]
+    if not streams:
+        return
+    semaphore = asyncio.Semaphore(concurrency)
+    # Bounded so a slow consumer holds every stream at most `prefetch` pages ahead
+    queue = asyncio.Queue(maxsize=len(streams) * max(prefetch, 1))
+
+    async def produce(list_id, archived):
+        page = 0
+        try:
+            while True:
+                async with semaphore:
+                    data = await client.get_list_tasks_page(list_id, page=page, archived=archived, **filters)
+                tasks = data.get('tasks', [])
+                if tasks:
+                    await queue.put(StreamPage(list_id, archived, page, tasks, None))
+                if is_last_page(data, tasks):
+                    break
+                page += 1
+                if page >= max_pages:
+                    print(f"Reached max page limit ({max_pages}) for list {list_id}; stopping pagination")
+                    break
+        except asyncio.CancelledError:
+            # The consumer went away, nobody is waiting for the sentinel
+            raise
+        except Exception as e:
+            await queue.put(StreamPage(list_id, archived, page, None, e))
+        await queue.put(_DONE)
+
+    producers = [asyncio.create_task(produce(list_id, archived)) for list_id, archived in streams]
+    remaining = len(producers)
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is _DONE:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        for producer in producers:
+            producer.cancel()
+        await asyncio.gather(*producers, return_exceptions=True)
@@ -0,0 +1,135 @@
+import time
+import asyncio
+from typing import Optional
+from bot.utils import db
+from bot.utils.db import UserRow, is_registered
+
+# Safety net for rows edited outside the bot; the bot's own writes update the directory in place
+REFRESH_AFTER_SECONDS = 15 * 60
+
+
+def _fold(value) -> Optional[str]:
+    if not isinstance(value, str) or value in ('', 'Not set'):
+        return None
+    return value.casefold()
+
+
+class UserDirectory:
+    """
+    In-memory copy of the `users` table, indexed by discord_id, ClickUp email and ROBLOX username.
+
+    Loaded once and kept current by routing the bot's writes through `create` and `update`.
+    Email and username lookups are case-insensitive, like the database's collation. Reads
+    return copies, so callers can't modify the cached rows by accident.
+    """
+
+    def __init__(self):
+        self._by_id = {}
+        self._by_email = {}
+        self._by_roblox = {}
+        self._loaded_at = None
+        self._lock = asyncio.Lock()
+
+    # --- Loading ---
+
+    async def load(self):
+        rows = await db.fetch_all_users()
+        by_id = {row['discord_id']: dict(row) for row in rows}
+        self._by_id = by_id
+        self._reindex()
+        self._loaded_at = time.monotonic()
+
+    async def ensure_loaded(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < REFRESH_AFTER_SECONDS:
+            return
+        async with self._lock:
+            # Another caller may have loaded while we waited for the lock
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= REFRESH_AFTER_SECONDS:
+                await self.load()
+
+    def invalidate(self):
+        """Force the next read to reload the table."""
+        self._loaded_at = None
+
+    def _reindex(self):
+        self._by_email = {}
+        self._by_roblox = {}
+        for row in self._by_id.values():
+            self._index(row)
+
+    def _index(self, row):
+        email = _fold(row.get('clickup_email'))
+        if email:
+            self._by_email[email] = row
+        username = _fold(row.get('roblox_username'))
+        if username:
+            self._by_roblox[username] = row
+
+    def _unindex(self, row):
+        email = _fold(row.get('clickup_email'))
+        if email and self._by_email.get(email) is row:
+            del self._by_email[email]
+        username = _fold(row.get('roblox_username'))
+        if username and self._by_roblox.get(username) is row:
+            del self._by_roblox[username]
+
+    # --- Reads ---
+
+    async def get(self, discord_id: int) -> Optional[UserRow]:
+        await self.ensure_loaded()
+        row = self._by_id.get(discord_id)
+        return dict(row) if row else None
+
+    async def by_email(self, email: str) -> Optional[UserRow]:
+        await self.ensure_loaded()
+        row = self._by_email.get(_fold(email))
+        return dict(row) if row else None
+
+    async def by_roblox_username(self, roblox_username: str) -> Optional[UserRow]:
+        await self.ensure_loaded()
+        row = self._by_roblox.get(_fold(roblox_username))
+        return dict(row) if row else None
+
+    async def find(self, query: str) -> Optional[UserRow]:
+        """Look a user up by ClickUp email or ROBLOX username, as >user does."""
+        return await self.by_email(query) or await self.by_roblox_username(query)
+
+    async def all(self) -> list:
+        await self.ensure_loaded()
+        return [dict(row) for row in self._by_id.values()]
+
+    async def registered(self) -> list:
+        """Users with every required field set."""
+        return [row for row in await self.all() if is_registered(row)]
+
+    # --- Writes (database first, then the directory) ---
+
+    async def create(self, discord_id: int, fields: UserRow) -> UserRow:
+        row = await db.create_user(discord_id, fields)
+        await self.ensure_loaded()
+        self._by_id[discord_id] = dict(row)
+        self._index(self._by_id[discord_id])
+        return dict(row)
+
+    async def update(self, discord_id: int, changes: dict):
+        await db.update_user(discord_id, changes)
+        await self.ensure_loaded()
+        row = self._by_id.get(discord_id)
+        if row is None:
+            # Not known yet (created elsewhere); pick it up on the next load
+            self.invalidate()
+            return
+        self._unindex(row)
+        row.update(changes)
+        self._index(row)
+
+
+_directory = None
+
+
+def get_user_directory() -> UserDirectory:
+    """Return the process-wide user directory."""
+    global _directory
+    if _directory is None:
+        _directory = UserDirectory()
+    return _directory
@@ -0,0 +1,131 @@
+import hmac
+import json
+import asyncio
+import hashlib
+from aiohttp import web
+from bot.utils.clickup_api import get_client, ClickUpError
+from bot.utils.task_mirror import get_mirror, department_list_ids
+from bot.utils.metrics import QUEUE_DEPTH
+
+TASK_EVENTS = {'taskCreated', 'taskUpdated', 'taskStatusUpdated', 'taskDueDateUpdated', 'taskDeleted'}
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    """The X-Signature ClickUp sends: a hex HMAC-SHA256 of the raw body keyed with the webhook secret."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, signature: str) -> bool:
+    if not secret or not signature:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body), signature)
+
+
+class WebhookReceiver:
+    """
+    Embedded aiohttp endpoint that applies ClickUp task webhooks to the task mirror.
+
+    Events are acknowledged as soon as the signature checks out and applied in arrival
+    order by one background worker: deletions drop the mirrored row, every other event
+    refetches the task so the mirror always holds ClickUp's current projection.
+
+    `on_change(task_id, task)` is called after each applied event with the fetched task, or
+    None when it was deleted or left the department lists, so consumers of the mirror
+    (the training reminders) can react to the change without waiting for their next poll.
+    """
+
+    def __init__(self, secret: str, path: str = '/clickup/webhook', mirror=None, client=None, on_change=None):
+        self.secret = secret
+        self.path = path
+        self.mirror = mirror or get_mirror()
+        self.client = client or get_client()
+        self.on_change = on_change
+        self.events_applied = 0
+        self.events_rejected = 0
+        self._queue = asyncio.Queue()
+        self._worker = None
+        self._runner = None
+        QUEUE_DEPTH.set_function(self._queue.qsize, queue='webhooks')
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        return app
+
+    async def handle(self, request: web.Request):
+        body = await request.read()
+        if not verify_signature(self.secret, body, request.headers.get('X-Signature')):
+            self.events_rejected += 1
+            return web.Response(status=401, text='Invalid signature')
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return web.Response(status=400, text='Invalid JSON')
+        if payload.get('event') in TASK_EVENTS and payload.get('task_id'):
+            self._ensure_worker()
+            self._queue.put_nowait(payload)
+        return web.Response(text='OK')
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._work())
+
+    async def _work(self):
+        # One worker, so a refetch for an older event can never land after a later deletion
+        while True:
+            payload = await self._queue.get()
+            try:
+                await self.apply(payload)
+            except Exception as e:
+                print(f"[Webhooks] Failed to apply {payload.get('event')} for {payload.get('task_id')}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def apply(self, payload: dict):
+        event = payload['event']
+        task_id = payload['task_id']
+        if event == 'taskDeleted':
+            self.mirror.delete([task_id])
+            self.events_applied += 1
+            self._changed(task_id, None)
+            return
+        try:
+            task = await self.client.get_task(task_id)
+        except ClickUpError as e:
+            print(f"[Webhooks] Could not fetch task {task_id} for {event}: {e}")
+            return
+        list_id = str((task.get('list') or {}).get('id', ''))
+        if list_id not in {str(lid) for lid in department_list_ids().values()}:
+            # Not one of the department lists; make sure it doesn't linger if it was moved out
+            self.mirror.delete([task_id])
+            self._changed(task_id, None)
+            return
+        self.mirror.upsert([self.mirror.project(task, list_id, bool(task.get('archived')))])
+        self.events_applied += 1
+        self._changed(task_id, task)
+
+    def _changed(self, task_id, task):
+        if self.on_change is None:
+            return
+        try:
+            self.on_change(task_id, task)
+        except Exception as e:
+            print(f"[Webhooks] on_change failed for {task_id}: {e}")
+
+    async def drain(self):
+        """Wait for every acknowledged event to be applied."""
+        await self._queue.join()
+
+    async def start(self, host: str = '0.0.0.0', port: int = 8080):
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        print(f"[Webhooks] Listening for ClickUp webhooks on {host}:{port}{self.path}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._worker:
+            self._worker.cancel()
+            self._worker = None
@@ -0,0 +1,40 @@
+"""
+Replay recorded ClickUp webhook payloads against a running webhook receiver.
+
+Each line of the input file is one JSON payload as ClickUp delivered it. Payloads are
+re-signed with the given secret, so recordings from any workspace can be replayed.
+
+Usage: python -m scripts.replay_webhooks payloads.jsonl --url http://127.0.0.1:8080/clickup/webhook --secret <secret> [--delay 0.1]
+"""
+import argparse
+import asyncio
+import json
+import aiohttp
+from bot.utils.webhooks import sign_payload
+
+
+async def replay(path, url, secret, delay, bad_signature):
+    with open(path, encoding='utf-8') as f:
+        payloads = [json.loads(line) for line in f if line.strip()]
+    statuses = {}
+    async with aiohttp.ClientSession() as session:
+        for payload in payloads:
+            body = json.dumps(payload).encode()
+            signature = 'invalid' if bad_signature else sign_payload(secret, body)
+            async with session.post(url, data=body, headers={'X-Signature': signature, 'content-type': 'application/json'}) as response:
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+                print(f"{payload.get('event')} {payload.get('task_id')} -> {response.status}")
+            if delay:
+                await asyncio.sleep(delay)
+    print(f"Replayed {len(payloads)} payloads: " + ', '.join(f"{count}x {status}" for status, count in sorted(statuses.items())))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('payloads')
+    parser.add_argument('--url', default='http://127.0.0.1:8080/clickup/webhook')
+    parser.add_argument('--secret', required=True)
+    parser.add_argument('--delay', type=float, default=0.0)
+    parser.add_argument('--bad-signature', action='store_true', help='send an invalid signature to check rejection')
+    args = parser.parse_args()
+    asyncio.run(replay(args.payloads, args.url, args.secret, args.delay, args.bad_signature))